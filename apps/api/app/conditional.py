@@ -0,0 +1,106 @@
+"""
+Conditional GET for job polling (GET /v1/jobs/{id}, GET /v1/jobs).
+
+Responses carry a weak ETag built from what they depend on: the job's status + updated_at (every
+worker/API write to a job bumps updated_at), or for the list, the count / newest update / oldest
+creation over the listed rows. A response embedding signed download URLs also depends on time: its
+tag includes the current half of the URL lifetime, so a client revalidating with a cached body
+always holds URLs with at least half their validity left. An If-None-Match hit is answered with
+304 right after one indexed lookup, before any signing or serialization.
+
+Tags end with the updated_at they were built from (microseconds since the epoch; the newest update for
+the list), so a read from a lagging replica can tell that the client already saw a newer version
+(seen_newer) and re-read from the primary instead of going backwards.
+
+Cache-Control is "private, no-cache": browsers keep the body and revalidate on every poll.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.config import settings
+from app.observability import CONDITIONAL_GETS
+
+
+# Bump when the response shape changes, so cached bodies from the previous build aren't revalidated.
+_ETAG_VERSION = "1"
+
+CACHE_CONTROL = "private, no-cache"
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _micros(dt: datetime) -> int:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return (dt - _EPOCH) // timedelta(microseconds=1)
+
+
+def _tag(*parts: object, stamp: datetime | None) -> str:
+    digest = hashlib.blake2b("|".join(str(p) for p in (_ETAG_VERSION, *parts)).encode("utf-8"), digest_size=12)
+    return f'W/"{digest.hexdigest()}.{_micros(stamp) if stamp else 0}"'
+
+
+def signed_url_window(now: float | None = None) -> int:
+    """Index of the current half signed-URL lifetime."""
+    half = max(1.0, settings.gcs_signed_url_exp_minutes * 60.0 / 2.0)
+    return int((time.time() if now is None else now) // half)
+
+
+def job_etag(*, job_id: uuid.UUID, status: str, updated_at: datetime, signs_urls: bool) -> str:
+    return _tag(
+        "job", job_id, status, updated_at.isoformat(), signed_url_window() if signs_urls else "-", stamp=updated_at
+    )
+
+
+def job_list_etag(*, user_id: uuid.UUID, count: int, newest_update: datetime | None, oldest_created: datetime | None) -> str:
+    return _tag(
+        "jobs",
+        user_id,
+        count,
+        newest_update.isoformat() if newest_update else "-",
+        oldest_created.isoformat() if oldest_created else "-",
+        stamp=newest_update,
+    )
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match (weak comparison, RFC 9110 13.1.2) against our tag."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(t.strip().removeprefix("W/") == opaque for t in header.split(","))
+
+
+def seen_newer(request: Request, updated_at: datetime | None) -> bool:
+    """Whether If-None-Match holds a tag built from a later updated_at than this read found."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    current = _micros(updated_at) if updated_at else 0
+    for t in header.split(","):
+        _, dot, stamp = t.strip().removeprefix("W/").strip('"').rpartition(".")
+        if dot and stamp.isdigit() and int(stamp) > current:
+            return True
+    return False
+
+
+def not_modified(route: str, etag: str) -> Response:
+    CONDITIONAL_GETS.labels(route, "not_modified").inc()
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def cache_headers(route: str, request: Request, etag: str) -> dict[str, str]:
+    CONDITIONAL_GETS.labels(route, "modified" if request.headers.get("if-none-match") else "unconditional").inc()
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
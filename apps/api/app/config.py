@@ -10,6 +10,8 @@ class Settings(BaseSettings):
     env: str = "dev"
     api_base_url: str = "http://localhost:8080"
     cors_origins: str = "*"  # comma-separated list or "*"
+    # Background DB/SDK warm-up after startup; delay lets uvicorn bind the port first. <0 disables.
+    warmup_delay_seconds: float = 0.5
 
     # Auth
     jwt_secret: str = "dev-insecure"
@@ -22,11 +24,26 @@ class Settings(BaseSettings):
     gcs_bucket: str = "solidgen-uploads"
 
     pubsub_topic: str = "solidgen-jobs"
+    # Draft-quality jobs go here when set (a faster lane: workers subscribed to this topic only); else pubsub_topic.
+    pubsub_draft_topic: str | None = None
 
     # Signed URL signing (Cloud Run / Workload Identity)
     gcs_signer_service_account_email: str | None = None
     gcs_signed_url_exp_minutes: int = 15
 
+    # Content-addressed upload dedup (app.uploads)
+    upload_dedup_verify_max_bytes: int = 50 * 1024 * 1024  # larger objects are never hashed / reused
+    upload_dedup_reverify_days: int = 0  # >0: re-hash verified objects older than this (uploads/ lifecycle rule)
+
+    # Input pre-flight at job submit (app.preflight)
+    input_preflight_enabled: bool = True
+    input_max_bytes: int = 20 * 1024 * 1024
+    input_min_side: int = 64  # pixels
+    input_max_side: int = 8192  # pixels
+    input_probe_bytes: int = 64 * 1024  # header bytes read for the format / dimension probe
+    input_preflight_cache_size: int = 4096
+    input_preflight_cache_seconds: float = 600.0
+
     # Database
     database_url: str | None = None
     db_user: str = "solidgen"
@@ -35,6 +52,9 @@ class Settings(BaseSettings):
     db_host: str = "127.0.0.1"
     db_port: int = 5432
     cloudsql_instance_connection_name: str | None = None
+    # Read replica for read-only routes (app.deps.get_read_db); unset = everything on the primary.
+    database_replica_url: str | None = None
+    read_your_writes_seconds: float = 10.0  # after a user's write, this instance reads their rows from the primary
 
     # Billing
     stripe_secret_key: str | None = None
@@ -45,6 +65,30 @@ class Settings(BaseSettings):
     nowpayments_api_key: str | None = None
     nowpayments_ipn_secret: str | None = None
 
+    # Webhook queue consumer (app.webhooks)
+    webhook_consumer_enabled: bool = True  # run the consumer thread inside the API process
+    webhook_consumer_batch_size: int = 50
+    webhook_consumer_poll_seconds: float = 5.0
+    webhook_max_attempts: int = 5
+
+    # Request instrumentation (app.observability)
+    slow_request_ms: float = 500.0  # requests slower than this are logged with their slowest statements
+    slow_request_log_sample_rate: float = 1.0  # fraction of slow requests that are logged
+
+    # Required (X-Internal-Token header) by /internal/* and /metrics; unset, those routes return 403.
+    internal_api_token: str | None = None
+
+    # Ledger compaction / reconciliation (app.ledger)
+    ledger_compaction_lag_minutes: int = 15  # leave recent rows alone (in-flight txns, worker clock skew)
+    ledger_batch_size: int = 1000
+
+    # Partitioning / retention (app.retention)
+    ledger_partition_months_ahead: int = 3
+    ledger_retention_months: int = 24  # older partitions are archived to GCS, then dropped
+    webhook_payload_retention_days: int = 30  # processed payloads archived to GCS, then stripped
+    webhook_event_retention_days: int = 180  # rows (dedupe keys) deleted after this
+    archive_gcs_prefix: str = "archive"
+
 
 settings = Settings()
 
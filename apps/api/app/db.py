@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+import threading
+import time
+import uuid
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
 
 from app.config import settings
 
 
+# Alembic revision this build expects (migrations/versions). Bump together with each new migration.
+SCHEMA_REVISION = "0008"
+
+
 def _build_database_url() -> str:
     if settings.database_url:
         return settings.database_url
@@ -27,13 +36,83 @@ def _build_database_url() -> str:
     )
 
 
-engine = create_engine(
-    _build_database_url(),
-    pool_pre_ping=True,
-)
+_engine: Engine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> Engine:
+    # Created on first use rather than at import, keeping it off the cold-start import path.
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                from app.observability import instrument_engine
+
+                engine = create_engine(
+                    _build_database_url(),
+                    pool_pre_ping=True,
+                )
+                instrument_engine(engine)
+                _engine = engine
+    return _engine
+
+
+_read_engine: Engine | None = None
+
+
+def get_read_engine() -> Engine:
+    """The read replica (DATABASE_REPLICA_URL) for read-only routes; the primary engine when none is set."""
+    global _read_engine
+    if not settings.database_replica_url:
+        return get_engine()
+    if _read_engine is None:
+        with _engine_lock:
+            if _read_engine is None:
+                from app.observability import instrument_engine
+
+                engine = create_engine(settings.database_replica_url, pool_pre_ping=True)
+                instrument_engine(engine, role="replica")
+                _read_engine = engine
+    return _read_engine
+
+
+def __getattr__(name: str):
+    # `from app.db import engine` keeps working, lazily.
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazyBindSession(Session):
+    def __init__(self, bind=None, **kw):
+        super().__init__(bind=bind or get_engine(), **kw)
+
+
+SessionLocal = sessionmaker(class_=_LazyBindSession, autoflush=False, autocommit=False)
+
+
+class _LazyReadBindSession(Session):
+    def __init__(self, bind=None, **kw):
+        super().__init__(bind=bind or get_read_engine(), **kw)
+
+
+ReadSessionLocal = sessionmaker(class_=_LazyReadBindSession, autoflush=False, autocommit=False)
+
 
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# Read-your-writes (per instance): users who wrote recently read from the primary until the deadline.
+_recent_writes: dict[uuid.UUID, float] = {}
+_RECENT_WRITES_MAX = 10_000
 
 
+def note_user_write(user_id: uuid.UUID):
+    now = time.monotonic()
+    if len(_recent_writes) >= _RECENT_WRITES_MAX:
+        for uid, deadline in list(_recent_writes.items()):
+            if deadline <= now:
+                _recent_writes.pop(uid, None)
+    _recent_writes[user_id] = now + settings.read_your_writes_seconds
 
 
+def recently_wrote(user_id: uuid.UUID) -> bool:
+    deadline = _recent_writes.get(user_id)
+    return deadline is not None and deadline > time.monotonic()
@@ -5,8 +5,10 @@ import uuid
 from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
-from app.db import SessionLocal
+from app.config import settings
+from app.db import ReadSessionLocal, SessionLocal, recently_wrote
 from app.models import User
+from app.observability import READ_SESSIONS
 from app.security import decode_access_token
 
 
@@ -27,18 +29,52 @@ def get_bearer_token(req: Request) -> str:
     return auth.split(" ", 1)[1].strip()
 
 
-def get_current_user(db: Session = Depends(get_db), token: str = Depends(get_bearer_token)) -> User:
+def get_current_user_id(token: str = Depends(get_bearer_token)) -> uuid.UUID:
+    """
+    The token's user id, without loading the user. For endpoints that only read the caller's own rows
+    (filtered by user_id), e.g. job polling; a deleted user's rows are gone with it.
+    """
     try:
         payload = decode_access_token(token)
-        user_id = uuid.UUID(payload["sub"])
+        return uuid.UUID(payload["sub"])
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+
+def get_current_user(db: Session = Depends(get_db), user_id: uuid.UUID = Depends(get_current_user_id)) -> User:
     user = db.query(User).filter(User.id == user_id).one_or_none()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
+def get_read_db(request: Request, user_id: uuid.UUID = Depends(get_current_user_id)):
+    """
+    Session for read-only routes: on the read replica, unless the client asks for a strong read
+    (X-Read-Consistency: strong) or the user wrote within READ_YOUR_WRITES_SECONDS on this instance.
+    db.info["replica"] is True when a miss may only be replication lag (see main.get_job).
+    """
+    if not settings.database_replica_url:
+        reason = "no_replica"
+    elif request.headers.get("x-read-consistency", "").lower() == "strong":
+        reason = "strong"
+    elif recently_wrote(user_id):
+        reason = "recent_write"
+    else:
+        reason = "default"
+    replica = reason == "default"
+    READ_SESSIONS.labels("replica" if replica else "primary", reason).inc()
+    db = ReadSessionLocal() if replica else SessionLocal()
+    db.info["replica"] = replica
+    try:
+        yield db
+    finally:
+        db.close()
 
 
+def get_current_user_read(db: Session = Depends(get_read_db), user_id: uuid.UUID = Depends(get_current_user_id)) -> User:
+    """get_current_user for read-only routes (replica-routed, see get_read_db)."""
+    user = db.query(User).filter(User.id == user_id).one_or_none()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user
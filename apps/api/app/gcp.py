@@ -1,35 +1,70 @@
 from __future__ import annotations
 
 import datetime
+import functools
+import hashlib
+import threading
 import uuid
 from dataclasses import dataclass
-
-from google.auth import default as google_auth_default
-from google.auth.transport.requests import Request as GoogleAuthRequest
-from google.cloud import pubsub_v1, storage
+from typing import TYPE_CHECKING, BinaryIO
 
 from app.config import settings
+from app.observability import external_call
 
+# google-cloud-* / google-auth are imported lazily: they dominate API import time, and most
+# requests (auth, job polling) never touch them. See warm_up_clients() for background init.
+if TYPE_CHECKING:
+    from google.cloud import pubsub_v1, storage
+
+
+_creds_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1)
+def _credentials():
+    from google.auth import default as google_auth_default
 
-def _get_access_token() -> str:
     creds, _ = google_auth_default(scopes=["https://www.googleapis.com/auth/cloud-platform"])
-    req = GoogleAuthRequest()
-    creds.refresh(req)
-    return creds.token  # type: ignore[return-value]
+    return creds
 
 
+def _get_access_token() -> str:
+    from google.auth.transport.requests import Request as GoogleAuthRequest
+
+    creds = _credentials()
+    with _creds_lock:
+        # Refresh only when missing/expired instead of once per signed URL.
+        if not creds.valid:
+            creds.refresh(GoogleAuthRequest())
+        return creds.token  # type: ignore[return-value]
+
+
+@functools.lru_cache(maxsize=1)
 def get_pubsub_publisher() -> pubsub_v1.PublisherClient:
+    from google.cloud import pubsub_v1
+
     return pubsub_v1.PublisherClient()
 
 
-def pubsub_topic_path() -> str:
-    return pubsub_v1.PublisherClient.topic_path(settings.gcp_project_id, settings.pubsub_topic)
+def pubsub_topic_path(topic: str | None = None) -> str:
+    return f"projects/{settings.gcp_project_id}/topics/{topic or settings.pubsub_topic}"
 
 
+@functools.lru_cache(maxsize=1)
 def get_storage_client() -> storage.Client:
+    from google.cloud import storage
+
     return storage.Client(project=settings.gcp_project_id)
 
 
+def warm_up_clients():
+    """Build credentials/clients ahead of the first GCS or Pub/Sub request (best effort)."""
+    get_storage_client()
+    get_pubsub_publisher()
+    if settings.gcs_signer_service_account_email:
+        _get_access_token()
+
+
 @dataclass(frozen=True)
 class SignedUrlResult:
     url: str
@@ -37,26 +72,77 @@ class SignedUrlResult:
     gcs_uri: str
 
 
-def sign_gcs_upload_url(*, content_type: str, file_ext: str, user_id: uuid.UUID) -> SignedUrlResult:
+def sign_gcs_upload_url(
+    *, content_type: str, file_ext: str, user_id: uuid.UUID, object_name: str | None = None
+) -> SignedUrlResult:
     if not settings.gcs_signer_service_account_email:
         raise RuntimeError("Missing gcs_signer_service_account_email")
 
-    object_name = f"uploads/{user_id}/{uuid.uuid4()}.{file_ext}"
+    object_name = object_name or f"uploads/{user_id}/{uuid.uuid4()}.{file_ext}"
     client = get_storage_client()
     bucket = client.bucket(settings.gcs_bucket)
     blob = bucket.blob(object_name)
 
-    url = blob.generate_signed_url(
-        version="v4",
-        expiration=datetime.timedelta(minutes=settings.gcs_signed_url_exp_minutes),
-        method="PUT",
-        content_type=content_type,
-        service_account_email=settings.gcs_signer_service_account_email,
-        access_token=_get_access_token(),
-    )
+    with external_call("gcs_sign"):
+        url = blob.generate_signed_url(
+            version="v4",
+            expiration=datetime.timedelta(minutes=settings.gcs_signed_url_exp_minutes),
+            method="PUT",
+            content_type=content_type,
+            service_account_email=settings.gcs_signer_service_account_email,
+            access_token=_get_access_token(),
+        )
     return SignedUrlResult(url=url, object_name=object_name, gcs_uri=f"gs://{settings.gcs_bucket}/{object_name}")
 
 
+def hash_gcs_object(*, object_name: str, max_bytes: int) -> tuple[str, int] | None:
+    """(sha256 hex, size) of an object in the bucket; None if it doesn't exist or is over max_bytes."""
+    client = get_storage_client()
+    with external_call("gcs_hash"):
+        blob = client.bucket(settings.gcs_bucket).get_blob(object_name)
+        if blob is None or blob.size is None or blob.size > max_bytes:
+            return None
+        h = hashlib.sha256()
+        with blob.open("rb", chunk_size=8 << 20) as f:
+            for chunk in iter(lambda: f.read(8 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest(), blob.size
+
+
+@dataclass(frozen=True)
+class ObjectMeta:
+    size: int
+    content_type: str | None
+    generation: int
+
+
+def head_gcs_object(*, object_name: str) -> ObjectMeta | None:
+    """Metadata of an object in the bucket (one metadata GET, no body); None if it doesn't exist."""
+    client = get_storage_client()
+    with external_call("gcs_head"):
+        blob = client.bucket(settings.gcs_bucket).get_blob(object_name)
+    if blob is None:
+        return None
+    return ObjectMeta(size=int(blob.size or 0), content_type=blob.content_type, generation=int(blob.generation or 0))
+
+
+def read_gcs_object_head(*, object_name: str, generation: int, length: int) -> bytes:
+    """The first `length` bytes of one generation of an object (ranged GET)."""
+    client = get_storage_client()
+    blob = client.bucket(settings.gcs_bucket).blob(object_name, generation=generation)
+    with external_call("gcs_range_read"):
+        return blob.download_as_bytes(start=0, end=length - 1)
+
+
+def upload_archive(*, object_name: str, fileobj: BinaryIO) -> str:
+    """Upload a gzip'd JSONL archive (resumable for large files); returns its gs:// URI."""
+    client = get_storage_client()
+    blob = client.bucket(settings.gcs_bucket).blob(object_name)
+    blob.content_encoding = "gzip"
+    blob.upload_from_file(fileobj, rewind=True, content_type="application/x-ndjson")
+    return f"gs://{settings.gcs_bucket}/{object_name}"
+
+
 def sign_gcs_download_url(*, gcs_uri: str) -> str:
     if not settings.gcs_signer_service_account_email:
         raise RuntimeError("Missing gcs_signer_service_account_email")
@@ -69,13 +155,14 @@ def sign_gcs_download_url(*, gcs_uri: str) -> str:
     bucket = client.bucket(bucket_name)
     blob = bucket.blob(object_name)
 
-    return blob.generate_signed_url(
-        version="v4",
-        expiration=datetime.timedelta(minutes=settings.gcs_signed_url_exp_minutes),
-        method="GET",
-        service_account_email=settings.gcs_signer_service_account_email,
-        access_token=_get_access_token(),
-    )
+    with external_call("gcs_sign"):
+        return blob.generate_signed_url(
+            version="v4",
+            expiration=datetime.timedelta(minutes=settings.gcs_signed_url_exp_minutes),
+            method="GET",
+            service_account_email=settings.gcs_signer_service_account_email,
+            access_token=_get_access_token(),
+        )
 
 
 
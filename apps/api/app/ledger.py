@@ -0,0 +1,167 @@
+"""
+Credit ledger compaction + balance reconciliation.
+
+`users.credits_balance` is the materialized balance; `credit_ledger` is the audit trail.
+Instead of summing the whole ledger, each user has a checkpoint (credit_ledger_checkpoints)
+and only rows newer than the checkpoint are read, via ix_credit_ledger_user_created.
+Cost is O(users + new rows), independent of ledger history.
+
+Run periodically (e.g. Cloud Scheduler -> Cloud Run job):
+    python -m app.ledger compact
+    python -m app.ledger reconcile
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+
+logger = logging.getLogger("solidgen-api.ledger")
+
+
+_BATCH_IDS_SQL = text(
+    """
+    SELECT id FROM users
+    WHERE (CAST(:after AS uuid) IS NULL OR id > CAST(:after AS uuid))
+    ORDER BY id
+    LIMIT :batch
+    """
+)
+
+# Folds rows older than the cutoff into each user's checkpoint.
+# The LATERAL subquery is an index range scan on (user_id, created_at) that only touches
+# rows between the previous checkpoint and the cutoff.
+_COMPACT_SQL = text(
+    """
+    INSERT INTO credit_ledger_checkpoints (user_id, balance_credits, entries_compacted, through_created_at, updated_at)
+    SELECT u.id,
+           COALESCE(c.balance_credits, 0) + d.delta,
+           COALESCE(c.entries_compacted, 0) + d.n,
+           :cutoff,
+           now()
+    FROM users u
+    LEFT JOIN credit_ledger_checkpoints c ON c.user_id = u.id
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(SUM(l.delta_credits), 0) AS delta, COUNT(*) AS n
+        FROM credit_ledger l
+        WHERE l.user_id = u.id
+          AND l.created_at > COALESCE(c.through_created_at, '-infinity'::timestamptz)
+          AND l.created_at <= :cutoff
+    ) d
+    WHERE u.id = ANY(CAST(:ids AS uuid[])) AND d.n > 0
+    ON CONFLICT (user_id) DO UPDATE SET
+        balance_credits = EXCLUDED.balance_credits,
+        entries_compacted = EXCLUDED.entries_compacted,
+        through_created_at = EXCLUDED.through_created_at,
+        updated_at = EXCLUDED.updated_at
+    """
+)
+
+# Checkpoint + deltas since checkpoint must equal the materialized balance.
+# Single statement => single snapshot, so in-flight charge/refund transactions are either
+# fully visible (balance + ledger row) or not at all.
+_RECONCILE_SQL = text(
+    """
+    SELECT u.id, u.credits_balance, COALESCE(c.balance_credits, 0) + d.delta AS expected
+    FROM users u
+    LEFT JOIN credit_ledger_checkpoints c ON c.user_id = u.id
+    CROSS JOIN LATERAL (
+        SELECT COALESCE(SUM(l.delta_credits), 0) AS delta
+        FROM credit_ledger l
+        WHERE l.user_id = u.id
+          AND l.created_at > COALESCE(c.through_created_at, '-infinity'::timestamptz)
+    ) d
+    WHERE u.id = ANY(CAST(:ids AS uuid[]))
+      AND u.credits_balance <> COALESCE(c.balance_credits, 0) + d.delta
+    """
+)
+
+
+@dataclass(frozen=True)
+class BalanceMismatch:
+    user_id: uuid.UUID
+    credits_balance: int
+    expected_balance: int
+
+
+def _iter_user_batches(db: Session, batch_size: int):
+    after: str | None = None
+    while True:
+        ids = [str(r[0]) for r in db.execute(_BATCH_IDS_SQL, {"after": after, "batch": batch_size})]
+        if not ids:
+            return
+        yield ids
+        after = ids[-1]
+
+
+def compact_ledger(db: Session, *, lag_minutes: int | None = None, batch_size: int | None = None) -> int:
+    """
+    Advance per-user checkpoints up to now() - lag. Returns the number of checkpoints written.
+
+    The lag keeps rows from transactions that are still in flight (or written by a worker
+    with a slightly skewed clock) out of the checkpoint; they are picked up next run.
+    """
+    lag = settings.ledger_compaction_lag_minutes if lag_minutes is None else lag_minutes
+    batch = batch_size or settings.ledger_batch_size
+
+    cutoff = db.execute(text("SELECT now() - make_interval(mins => :lag)"), {"lag": lag}).scalar()
+    written = 0
+    for ids in _iter_user_batches(db, batch):
+        written += db.execute(_COMPACT_SQL, {"ids": ids, "cutoff": cutoff}).rowcount or 0
+        db.commit()
+    logger.info("Ledger compaction done (cutoff=%s, checkpoints_written=%s)", cutoff, written)
+    return written
+
+
+def reconcile_balances(db: Session, *, batch_size: int | None = None) -> list[BalanceMismatch]:
+    """Verify users.credits_balance == checkpoint + deltas since checkpoint for every user."""
+    batch = batch_size or settings.ledger_batch_size
+    mismatches: list[BalanceMismatch] = []
+    for ids in _iter_user_batches(db, batch):
+        for user_id, balance, expected in db.execute(_RECONCILE_SQL, {"ids": ids}):
+            mismatches.append(BalanceMismatch(user_id=user_id, credits_balance=balance, expected_balance=expected))
+        db.rollback()  # read-only; don't hold a snapshot across batches
+    for m in mismatches:
+        logger.error(
+            "Credit balance mismatch (user_id=%s, credits_balance=%s, ledger=%s)",
+            m.user_id,
+            m.credits_balance,
+            m.expected_balance,
+        )
+    logger.info("Ledger reconciliation done (mismatches=%s)", len(mismatches))
+    return mismatches
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.db import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.ledger")
+    parser.add_argument("command", choices=["compact", "reconcile"])
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--lag-minutes", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    db = SessionLocal()
+    try:
+        if args.command == "compact":
+            compact_ledger(db, lag_minutes=args.lag_minutes, batch_size=args.batch_size)
+        elif reconcile_balances(db, batch_size=args.batch_size):
+            return 1
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
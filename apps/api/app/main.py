@@ -1,26 +1,48 @@
 from __future__ import annotations
 
+import dataclasses
 import json
+import logging
+import secrets
+import threading
+import time
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Any
 
-import stripe
-from fastapi import Body, Depends, FastAPI, HTTPException, Request, status
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
+from fastapi.responses import ORJSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, select, text
 from sqlalchemy.orm import Session
 
+from app.conditional import cache_headers, etag_matches, job_etag, job_list_etag, not_modified, seen_newer
 from app.config import settings
-from app.deps import get_current_user, get_db
-from app.gcp import get_pubsub_publisher, pubsub_topic_path, sign_gcs_download_url, sign_gcs_upload_url
-from app.models import CreditLedger, Job, JobStatus, LedgerReason, User, WebhookEvent
+from app.db import SessionLocal, note_user_write
+from app.deps import get_current_user, get_current_user_id, get_current_user_read, get_db, get_read_db
+from app.gcp import (
+    get_pubsub_publisher,
+    pubsub_topic_path,
+    sign_gcs_download_url,
+    warm_up_clients,
+)
+from app.models import CreditLedger, Job, JobStatus, LedgerReason, User
+from app.observability import (
+    JOBS_SUBMITTED,
+    REPLICA_FALLBACKS,
+    WEBHOOK_BACKLOG_AGE,
+    WEBHOOK_BACKLOG_PENDING,
+    RequestTimingMiddleware,
+    external_call,
+    recent_slow_requests,
+)
+from app.preflight import InputRejected, check_input
 from app.schemas import (
     AuthResponse,
     CreateJobRequest,
     CreateJobResponse,
     JobResponse,
-    JobListItem,
     LoginRequest,
     ListJobsResponse,
     MeResponse,
@@ -33,8 +55,12 @@ from app.schemas import (
     StripeCheckoutResponse,
 )
 from app.security import create_access_token, hash_password, verify_password
+from app.uploads import upload_target
+from app.webhooks import consumer, ingest_event, ingest_latency_stats, record_ingest_latency, webhook_backlog
 
 
+logger = logging.getLogger("solidgen-api")
+
 app = FastAPI(title="solidgen-api")
 
 
@@ -50,7 +76,10 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "ETag"],
 )
+# Added last => outermost, so CORS handling is included in the timing.
+app.add_middleware(RequestTimingMiddleware)
 
 
 @app.get("/health")
@@ -59,21 +88,108 @@ def healthz():
     return {"ok": True, "service": "solidgen-api"}
 
 
+def _check_schema_revision():
+    """
+    Schema changes run as a separate deploy step (`alembic upgrade head`, see README);
+    startup only does a single-row version check instead of create_all's catalog inspection.
+    """
+    from app.db import SCHEMA_REVISION, engine
+
+    with engine.connect() as conn:
+        current = conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    if current != SCHEMA_REVISION:
+        logger.error("Schema revision mismatch (db=%s, expected=%s); run `alembic upgrade head`", current, SCHEMA_REVISION)
+
+
+def _warm_up():
+    # Runs off the startup path so it doesn't delay binding the port; each step is best effort.
+    for name, fn in (
+        ("schema check / DB pool", _check_schema_revision),
+        ("stripe import", _stripe),
+        ("GCP clients", warm_up_clients),
+    ):
+        try:
+            fn()
+        except Exception as e:
+            logger.warning("Warm-up step failed (%s): %s", name, e)
+
+
 @app.on_event("startup")
-def _startup_migrate_best_effort():
+def _schedule_warm_up():
+    if settings.warmup_delay_seconds >= 0:
+        timer = threading.Timer(settings.warmup_delay_seconds, _warm_up)
+        timer.daemon = True
+        timer.start()
+    if settings.webhook_consumer_enabled:
+        consumer.start()
+
+
+@app.on_event("shutdown")
+def _stop_webhook_consumer():
+    consumer.stop()
+
+
+def require_internal_token(request: Request):
+    # Fails closed: without INTERNAL_API_TOKEN configured the internal routes are off, not public.
+    token = settings.internal_api_token
+    if not token or not secrets.compare_digest(request.headers.get("X-Internal-Token", ""), token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+
+@app.get("/internal/webhooks/stats", dependencies=[Depends(require_internal_token)])
+def webhook_stats(db: Session = Depends(get_db)):
+    return {"backlog": webhook_backlog(db), "ingest_latency": ingest_latency_stats()}
+
+
+@app.get("/internal/slow-requests", dependencies=[Depends(require_internal_token)])
+def slow_requests():
+    return {"slow_request_ms": settings.slow_request_ms, "requests": recent_slow_requests()}
+
+
+@app.post("/internal/jobs/{job_id}/profile", dependencies=[Depends(require_internal_token)])
+def flag_job_for_profiling(job_id: uuid.UUID, db: Session = Depends(get_db)):
     """
-    Lightweight schema bootstrap to keep v1 deploys simple.
-    Uses a Postgres advisory lock to avoid concurrent creates.
+    Have the worker profile this job (params.profile); applies to queued jobs and redeliveries.
+    Profiling costs GPU time and writes artifacts, so this stays behind the fail-closed internal token.
     """
-    from app.db import engine
-    from app.models import Base
+    job = db.query(Job).filter(Job.id == job_id).one_or_none()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    job.params = {**(job.params or {}), "profile": True}
+    job.updated_at = datetime.now(timezone.utc)
+    db.commit()
+    return {"job_id": str(job.id), "status": job.status.value, "profile_gcs_uri": job.profile_gcs_uri}
+
+
+@app.get("/internal/jobs/{job_id}/profile", dependencies=[Depends(require_internal_token)])
+def job_profile(job_id: uuid.UUID, db: Session = Depends(get_db)):
+    job = db.query(Job).filter(Job.id == job_id).one_or_none()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return {
+        "job_id": str(job.id),
+        "status": job.status.value,
+        "profile_requested": bool((job.params or {}).get("profile")),
+        "profile_gcs_uri": job.profile_gcs_uri,
+    }
+
+
+@app.get("/metrics", dependencies=[Depends(require_internal_token)])
+def metrics(db: Session = Depends(get_db)):
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    backlog = webhook_backlog(db)
+    WEBHOOK_BACKLOG_PENDING.set(backlog["pending"])
+    WEBHOOK_BACKLOG_AGE.set(backlog["oldest_pending_age_seconds"])
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
-    with engine.begin() as conn:
-        # 64-bit lock key; any constant is fine for this DB
-        got = conn.execute(text("SELECT pg_try_advisory_lock(9876543210)")).scalar()
-        if got:
-            Base.metadata.create_all(bind=conn)
-            conn.execute(text("SELECT pg_advisory_unlock(9876543210)"))
+
+def _stripe():
+    # Imported on first billing request (or by _warm_up), not at module import.
+    import stripe
+
+    stripe.api_key = settings.stripe_secret_key
+    return stripe
 
 
 @app.post("/v1/auth/signup", response_model=AuthResponse)
@@ -86,6 +202,7 @@ def signup(req: SignupRequest, db: Session = Depends(get_db)):
     db.add(user)
     db.commit()
     db.refresh(user)
+    note_user_write(user.id)
     return AuthResponse(access_token=create_access_token(str(user.id)))
 
 
@@ -98,31 +215,45 @@ def login(req: LoginRequest, db: Session = Depends(get_db)):
 
 
 @app.get("/v1/me", response_model=MeResponse)
-def me(user: User = Depends(get_current_user)):
+def me(user: User = Depends(get_current_user_read)):
     return MeResponse(user_id=user.id, email=user.email, credits_balance=user.credits_balance)
 
 
 @app.post("/v1/uploads/sign", response_model=SignedUploadResponse)
-def sign_upload(req: SignedUploadRequest, user: User = Depends(get_current_user)):
-    res = sign_gcs_upload_url(content_type=req.content_type, file_ext=req.file_ext, user_id=user.id)
+def sign_upload(req: SignedUploadRequest, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
+    res = upload_target(db, user_id=user.id, content_type=req.content_type, file_ext=req.file_ext, sha256=req.sha256)
+    note_user_write(user.id)
     return SignedUploadResponse(
-        upload_url=res.url,
+        upload_url=res.upload_url,
         gcs_uri=res.gcs_uri,
         object_name=res.object_name,
         expires_in_minutes=settings.gcs_signed_url_exp_minutes,
     )
 
 
-def _cost_for_resolution(resolution: int) -> int:
-    # v1 pricing knobs (tune later)
-    return {512: 1, 1024: 3, 1536: 8}.get(resolution, 3)
+# Credits per job by quality tier and resolution; "standard" keeps the v1 prices (tune later).
+_JOB_PRICES = {
+    "draft": {512: 1, 1024: 2, 1536: 5},
+    "standard": {512: 1, 1024: 3, 1536: 8},
+    "high": {512: 2, 1024: 5, 1536: 12},
+}
+
+
+def _job_cost(*, resolution: int, quality: str) -> int:
+    prices = _JOB_PRICES[quality]
+    return prices.get(resolution, prices[1024])
 
 
 @app.post("/v1/jobs", response_model=CreateJobResponse)
 def create_job(req: CreateJobRequest, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    cost = _cost_for_resolution(req.resolution)
+    cost = _job_cost(resolution=req.resolution, quality=req.quality)
     if user.credits_balance < cost:
         raise HTTPException(status_code=status.HTTP_402_PAYMENT_REQUIRED, detail="Insufficient credits")
+    # Before charging / publishing: unusable inputs never reach a worker.
+    try:
+        input_info = check_input(user_id=user.id, gcs_uri=req.input_gcs_uri)
+    except InputRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
 
     job_id = uuid.uuid4()
     job = Job(
@@ -132,9 +263,12 @@ def create_job(req: CreateJobRequest, db: Session = Depends(get_db), user: User
         input_gcs_uri=req.input_gcs_uri,
         params={
             "resolution": req.resolution,
+            "quality": req.quality,
             "seed": req.seed,
             "decimation_target": req.decimation_target,
             "texture_size": req.texture_size,
+            **({"outputs": [o.model_dump(exclude_none=True) for o in req.outputs]} if req.outputs else {}),
+            **({"input": dataclasses.asdict(input_info)} if input_info else {}),
         },
         cost_credits=cost,
     )
@@ -157,62 +291,185 @@ def create_job(req: CreateJobRequest, db: Session = Depends(get_db), user: User
     )
     db.commit()
     db.refresh(job)
+    note_user_write(user.id)
 
-    publisher = get_pubsub_publisher()
-    publisher.publish(pubsub_topic_path(), json.dumps({"job_id": str(job.id)}).encode("utf-8"))
+    lane = "draft" if req.quality == "draft" and settings.pubsub_draft_topic else "default"
+    with external_call("pubsub_publish"):
+        publisher = get_pubsub_publisher()
+        topic = settings.pubsub_draft_topic if lane == "draft" else None
+        publisher.publish(pubsub_topic_path(topic), json.dumps({"job_id": str(job.id)}).encode("utf-8"))
+    JOBS_SUBMITTED.labels(req.quality, lane).inc()
 
     return CreateJobResponse(job_id=job.id, status=job.status.value, cost_credits=cost)
 
 
-@app.get("/v1/jobs/{job_id}", response_model=JobResponse)
-def get_job(job_id: uuid.UUID, db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user.id).one_or_none()
-    if not job:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+def _sign_or_none(gcs_uri: str | None) -> str | None:
+    if not gcs_uri:
+        return None
+    try:
+        return sign_gcs_download_url(gcs_uri=gcs_uri)
+    except Exception:
+        return None
+
+
+def _job_body(job: Job) -> dict[str, Any]:
+    """JobResponse as a JSON-ready dict: built once and serialized by orjson, no response_model round trip."""
+    download_url = _sign_or_none(job.output_gcs_uri)
+    outputs = []
+    for o in job.outputs or []:
+        url = download_url if o.get("gcs_uri") == job.output_gcs_uri else _sign_or_none(o.get("gcs_uri"))
+        outputs.append(
+            {
+                "name": o["name"],
+                "format": o["format"],
+                "compression": o.get("compression", "none"),
+                "decimation_target": o.get("decimation_target"),
+                "texture_size": o.get("texture_size"),
+                "bytes": o.get("bytes"),
+                "gcs_uri": o["gcs_uri"],
+                "download_url": url,
+            }
+        )
+    return {
+        "job_id": str(job.id),
+        "status": job.status.value,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+        "input_gcs_uri": job.input_gcs_uri,
+        "output_gcs_uri": job.output_gcs_uri,
+        "output_download_url": download_url,
+        "outputs": outputs,
+        "preview_gcs_uri": job.preview_gcs_uri,
+        "preview_download_url": _sign_or_none(job.preview_gcs_uri),
+        "error_text": job.error_text,
+        "cost_credits": job.cost_credits,
+        "params": job.params,
+    }
 
-    download_url = None
-    if job.output_gcs_uri:
-        try:
-            download_url = sign_gcs_download_url(gcs_uri=job.output_gcs_uri)
-        except Exception:
-            download_url = None
 
-    return JobResponse(
+def _job_response(db: Session, request: Request, *, job_id: uuid.UUID, user_id: uuid.UUID) -> Response | None:
+    """
+    GET /v1/jobs/{job_id} against one session; None if the job isn't there, or (replica) if the client has
+    already seen a newer version of it than the replica has.
+    """
+    route = "/v1/jobs/{job_id}"
+    if request.headers.get("if-none-match"):
+        # Revalidation: only the columns the tag depends on (primary key lookup), no signing.
+        row = db.execute(
+            select(Job.status, Job.updated_at, Job.output_gcs_uri, Job.preview_gcs_uri).where(
+                Job.id == job_id, Job.user_id == user_id
+            )
+        ).one_or_none()
+        if row is None or (db.info.get("replica") and seen_newer(request, row.updated_at)):
+            return None
+        etag = job_etag(
+            job_id=job_id,
+            status=row.status.value,
+            updated_at=row.updated_at,
+            signs_urls=bool(row.output_gcs_uri or row.preview_gcs_uri),
+        )
+        if etag_matches(request, etag):
+            return not_modified(route, etag)
+
+    job = db.query(Job).filter(Job.id == job_id, Job.user_id == user_id).one_or_none()
+    if not job:
+        return None
+    etag = job_etag(
         job_id=job.id,
         status=job.status.value,
-        created_at=job.created_at.isoformat(),
-        updated_at=job.updated_at.isoformat(),
-        input_gcs_uri=job.input_gcs_uri,
-        output_gcs_uri=job.output_gcs_uri,
-        output_download_url=download_url,
-        error_text=job.error_text,
-        cost_credits=job.cost_credits,
-        params=job.params,
+        updated_at=job.updated_at,
+        signs_urls=bool(job.output_gcs_uri or job.preview_gcs_uri),
     )
+    return ORJSONResponse(_job_body(job), headers=cache_headers(route, request, etag))
 
 
-@app.get("/v1/jobs", response_model=ListJobsResponse)
-def list_jobs(db: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    jobs = (
-        db.query(Job)
-        .filter(Job.user_id == user.id)
+@app.get("/v1/jobs/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: uuid.UUID,
+    request: Request,
+    db: Session = Depends(get_read_db),
+    user_id: uuid.UUID = Depends(get_current_user_id),
+):
+    response = _job_response(db, request, job_id=job_id, user_id=user_id)
+    if response is None and db.info.get("replica"):
+        # Not replicated yet (just created, or updated since the client's copy): the primary has the final word.
+        REPLICA_FALLBACKS.labels("/v1/jobs/{job_id}").inc()
+        with SessionLocal() as primary:
+            response = _job_response(primary, request, job_id=job_id, user_id=user_id)
+    if response is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return response
+
+
+_JOB_LIST_LIMIT = 100
+
+
+def _job_list_response(db: Session, request: Request, *, user_id: uuid.UUID) -> Response | None:
+    """GET /v1/jobs against one session; None (replica) if the client has already seen newer rows than it has."""
+    route = "/v1/jobs"
+    # The tag covers exactly the listed rows: a new, updated or deleted job (incl. one sliding in at the end)
+    # changes it. Revalidation computes it in the DB; a full response computes the same tag from its rows.
+    if request.headers.get("if-none-match"):
+        listed = (
+            select(Job.created_at, Job.updated_at)
+            .where(Job.user_id == user_id)
+            .order_by(Job.created_at.desc())
+            .limit(_JOB_LIST_LIMIT)
+            .subquery()
+        )
+        count, newest_update, oldest_created = db.execute(
+            select(func.count(), func.max(listed.c.updated_at), func.min(listed.c.created_at))
+        ).one()
+        if db.info.get("replica") and seen_newer(request, newest_update):
+            return None
+        etag = job_list_etag(user_id=user_id, count=count, newest_update=newest_update, oldest_created=oldest_created)
+        if etag_matches(request, etag):
+            return not_modified(route, etag)
+
+    rows = db.execute(
+        select(
+            Job.id,
+            Job.status,
+            Job.created_at,
+            Job.updated_at,
+            Job.params["resolution"].astext,
+            Job.params["quality"].astext,
+            Job.cost_credits,
+        )
+        .where(Job.user_id == user_id)
         .order_by(Job.created_at.desc())
-        .limit(100)
-        .all()
+        .limit(_JOB_LIST_LIMIT)
+    ).all()
+    items = [
+        {
+            "job_id": str(job_id),
+            "status": job_status.value,
+            "created_at": created_at.isoformat(),
+            "updated_at": updated_at.isoformat(),
+            "resolution": int(resolution) if resolution is not None else None,
+            "quality": quality or "standard",
+            "cost_credits": cost_credits,
+        }
+        for job_id, job_status, created_at, updated_at, resolution, quality, cost_credits in rows
+    ]
+    etag = job_list_etag(
+        user_id=user_id,
+        count=len(rows),
+        newest_update=max((r.updated_at for r in rows), default=None),
+        oldest_created=min((r.created_at for r in rows), default=None),
     )
-    items = []
-    for j in jobs:
-        items.append(
-            JobListItem(
-                job_id=j.id,
-                status=j.status.value,
-                created_at=j.created_at.isoformat(),
-                updated_at=j.updated_at.isoformat(),
-                resolution=(j.params or {}).get("resolution"),
-                cost_credits=j.cost_credits,
-            )
-        )
-    return ListJobsResponse(jobs=items)
+    return ORJSONResponse({"jobs": items}, headers=cache_headers(route, request, etag))
+
+
+@app.get("/v1/jobs", response_model=ListJobsResponse)
+def list_jobs(request: Request, db: Session = Depends(get_read_db), user_id: uuid.UUID = Depends(get_current_user_id)):
+    response = _job_list_response(db, request, user_id=user_id)
+    if response is None:
+        # The replica is behind what the client already saw: answering from it would go backwards.
+        REPLICA_FALLBACKS.labels("/v1/jobs").inc()
+        with SessionLocal() as primary:
+            response = _job_list_response(primary, request, user_id=user_id)
+    return response
 
 
 @app.post("/v1/billing/stripe/checkout-session", response_model=StripeCheckoutResponse)
@@ -220,32 +477,34 @@ def stripe_checkout(req: StripeCheckoutRequest, user: User = Depends(get_current
     if not settings.stripe_secret_key:
         raise HTTPException(status_code=500, detail="Stripe not configured")
 
-    stripe.api_key = settings.stripe_secret_key
+    stripe = _stripe()
 
     # v1: $1 per credit (tune later)
     amount_cents = int(req.credits) * 100
 
-    session = stripe.checkout.Session.create(
-        mode="payment",
-        line_items=[
-            {
-                "price_data": {
-                    "currency": "usd",
-                    "product_data": {"name": f"Solidgen credits ({req.credits})"},
-                    "unit_amount": amount_cents,
-                },
-                "quantity": 1,
-            }
-        ],
-        success_url=settings.stripe_success_url,
-        cancel_url=settings.stripe_cancel_url,
-        metadata={"user_id": str(user.id), "credits": str(req.credits)},
-    )
+    with external_call("stripe"):
+        session = stripe.checkout.Session.create(
+            mode="payment",
+            line_items=[
+                {
+                    "price_data": {
+                        "currency": "usd",
+                        "product_data": {"name": f"Solidgen credits ({req.credits})"},
+                        "unit_amount": amount_cents,
+                    },
+                    "quantity": 1,
+                }
+            ],
+            success_url=settings.stripe_success_url,
+            cancel_url=settings.stripe_cancel_url,
+            metadata={"user_id": str(user.id), "credits": str(req.credits)},
+        )
     return StripeCheckoutResponse(url=session.url)
 
 
 @app.post("/v1/webhooks/stripe")
 async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
+    t0 = time.perf_counter()
     if not settings.stripe_webhook_secret or not settings.stripe_secret_key:
         raise HTTPException(status_code=500, detail="Stripe not configured")
 
@@ -255,69 +514,20 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="Missing Stripe-Signature")
 
     try:
-        event = stripe.Webhook.construct_event(payload, sig_header, settings.stripe_webhook_secret)
+        event = _stripe().Webhook.construct_event(payload, sig_header, settings.stripe_webhook_secret)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-    provider = "stripe"
-    event_id = event["id"]
-    existing = db.query(WebhookEvent).filter(WebhookEvent.provider == provider, WebhookEvent.event_id == event_id).one_or_none()
-    if existing and existing.processed_at is not None:
+    # Persist + ack; crediting happens in the webhook consumer (app.webhooks).
+    inserted = await run_in_threadpool(
+        ingest_event, db, provider="stripe", event_id=event["id"], payload=json.loads(payload)
+    )
+    record_ingest_latency("stripe", time.perf_counter() - t0)
+    if not inserted:
         return {"ok": True, "idempotent": True}
-
-    wh = existing or WebhookEvent(provider=provider, event_id=event_id, payload=event)
-    db.add(wh)
-    db.commit()
-    db.refresh(wh)
-
-    if event["type"] == "checkout.session.completed":
-        session = event["data"]["object"]
-        metadata = session.get("metadata") or {}
-        user_id = metadata.get("user_id")
-        credits = metadata.get("credits")
-        if user_id and credits:
-            _apply_credit_purchase(
-                db=db,
-                provider="stripe",
-                external_id=event_id,
-                user_id=uuid.UUID(user_id),
-                credits=int(credits),
-            )
-
-    wh.processed_at = datetime.utcnow()
-    db.add(wh)
-    db.commit()
     return {"ok": True}
 
 
-def _apply_credit_purchase(*, db: Session, provider: str, external_id: str, user_id: uuid.UUID, credits: int):
-    user = db.query(User).filter(User.id == user_id).with_for_update().one_or_none()
-    if not user:
-        return
-
-    # Idempotency for “credit add” on provider/external_id
-    already = (
-        db.query(CreditLedger)
-        .filter(CreditLedger.provider == provider, CreditLedger.external_id == external_id)
-        .one_or_none()
-    )
-    if already:
-        return
-
-    user.credits_balance += credits
-    ledger = CreditLedger(
-        user_id=user.id,
-        job_id=None,
-        delta_credits=credits,
-        reason=LedgerReason.CREDIT_PURCHASE_STRIPE if provider == "stripe" else LedgerReason.CREDIT_PURCHASE_NOWPAYMENTS,
-        provider=provider,
-        external_id=external_id,
-    )
-    db.add(ledger)
-    db.add(user)
-    db.commit()
-
-
 @app.post("/v1/billing/nowpayments/invoice", response_model=NowPaymentsInvoiceResponse)
 def nowpayments_invoice(req: NowPaymentsInvoiceRequest, request: Request, user: User = Depends(get_current_user)):
     if not settings.nowpayments_api_key:
@@ -346,12 +556,13 @@ def nowpayments_invoice(req: NowPaymentsInvoiceRequest, request: Request, user:
 def __nowpayments_post(path: str, payload: dict[str, Any]) -> dict[str, Any]:
     import requests
 
-    r = requests.post(
-        f"https://api.nowpayments.io{path}",
-        headers={"x-api-key": settings.nowpayments_api_key, "Content-Type": "application/json"},
-        data=json.dumps(payload),
-        timeout=30,
-    )
+    with external_call("nowpayments"):
+        r = requests.post(
+            f"https://api.nowpayments.io{path}",
+            headers={"x-api-key": settings.nowpayments_api_key, "Content-Type": "application/json"},
+            data=json.dumps(payload),
+            timeout=30,
+        )
     r.raise_for_status()
     return r.json()
 
@@ -363,8 +574,9 @@ async def nowpayments_webhook(request: Request, db: Session = Depends(get_db)):
 
     v1 behavior:
     - verify signature if ipn secret configured (best effort)
-    - on confirmed/finished payment, credit user
+    - persist the event; the webhook consumer credits the user on confirmed/finished payment
     """
+    t0 = time.perf_counter()
     body = await request.body()
     if settings.nowpayments_ipn_secret:
         import hmac
@@ -383,36 +595,16 @@ async def nowpayments_webhook(request: Request, db: Session = Depends(get_db)):
             raise HTTPException(status_code=400, detail="Invalid NOWPayments signature")
 
     data = json.loads(body.decode("utf-8"))
-
-    provider = "nowpayments"
-    event_id = str(data.get("payment_id") or data.get("invoice_id") or uuid.uuid4())
-
-    existing = db.query(WebhookEvent).filter(WebhookEvent.provider == provider, WebhookEvent.event_id == event_id).one_or_none()
-    if existing and existing.processed_at is not None:
+    payment_id = str(data.get("payment_id") or data.get("invoice_id") or uuid.uuid4())
+    # NOWPayments sends one IPN per status transition for the same payment; dedupe per (payment, status)
+    # so a "finished" IPN isn't swallowed by an earlier "waiting" one.
+    event_id = f"{payment_id}:{str(data.get('payment_status') or '').lower()}"
+
+    # Persist + ack; crediting happens in the webhook consumer (app.webhooks).
+    inserted = await run_in_threadpool(ingest_event, db, provider="nowpayments", event_id=event_id, payload=data)
+    record_ingest_latency("nowpayments", time.perf_counter() - t0)
+    if not inserted:
         return {"ok": True, "idempotent": True}
-
-    wh = existing or WebhookEvent(provider=provider, event_id=event_id, payload=data)
-    db.add(wh)
-    db.commit()
-    db.refresh(wh)
-
-    status_str = str(data.get("payment_status") or "").lower()
-    if status_str in {"finished", "confirmed"}:
-        meta = data.get("metadata") or {}
-        user_id = meta.get("user_id")
-        credits = meta.get("credits")
-        if user_id and credits:
-            _apply_credit_purchase(
-                db=db,
-                provider="nowpayments",
-                external_id=event_id,
-                user_id=uuid.UUID(user_id),
-                credits=int(credits),
-            )
-
-    wh.processed_at = datetime.utcnow()
-    db.add(wh)
-    db.commit()
     return {"ok": True}
 
 
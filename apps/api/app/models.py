@@ -4,7 +4,7 @@ import enum
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Enum, ForeignKey, Integer, String, Text, UniqueConstraint
+from sqlalchemy import BigInteger, DateTime, Enum, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -51,6 +51,12 @@ class Job(Base):
 
     input_gcs_uri: Mapped[str] = mapped_column(String(1024), nullable=False)
     output_gcs_uri: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    # Early point-cloud preview (sparse structure), set while the job is still RUNNING.
+    preview_gcs_uri: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    # Worker profiling artifacts (gs://.../profiles/<job_id>/), for sampled or operator-flagged jobs.
+    profile_gcs_uri: Mapped[str | None] = mapped_column(String(1024), nullable=True)
+    # Every output variant (see CreateJobRequest.outputs): [{name, format, ..., gcs_uri}], primary first.
+    outputs: Mapped[list] = mapped_column(JSONB, default=list, server_default=text("'[]'::jsonb"), nullable=False)
 
     params: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
     cost_credits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -60,7 +66,19 @@ class Job(Base):
 
 
 class CreditLedger(Base):
+    """
+    Range-partitioned by month on created_at (partitions are managed by app.retention),
+    so the primary key has to include created_at.
+    """
+
     __tablename__ = "credit_ledger"
+    __table_args__ = (
+        # Per-user range scans for compaction / reconciliation (see app.ledger).
+        Index("ix_credit_ledger_user_created", "user_id", "created_at", postgresql_include=["delta_credits"]),
+        # Purchase idempotency lookup in _apply_credit_purchase.
+        Index("ix_credit_ledger_provider_external", "provider", "external_id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
@@ -70,12 +88,20 @@ class CreditLedger(Base):
     reason: Mapped[LedgerReason] = mapped_column(Enum(LedgerReason), nullable=False)
     provider: Mapped[str | None] = mapped_column(String(64), nullable=True)
     external_id: Mapped[str | None] = mapped_column(String(256), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=datetime.utcnow, nullable=False
+    )
 
 
 class WebhookEvent(Base):
     __tablename__ = "webhook_events"
-    __table_args__ = (UniqueConstraint("provider", "event_id", name="uq_webhook_provider_event"),)
+    __table_args__ = (
+        UniqueConstraint("provider", "event_id", name="uq_webhook_provider_event"),
+        # Retention scans (app.retention).
+        Index("ix_webhook_events_received_at", "received_at"),
+        # Consumer queue scan / backlog (app.webhooks).
+        Index("ix_webhook_events_pending", "received_at", postgresql_where=text("processed_at IS NULL")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     provider: Mapped[str] = mapped_column(String(64), nullable=False)
@@ -83,7 +109,37 @@ class WebhookEvent(Base):
     received_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
     processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     payload: Mapped[dict] = mapped_column(JSONB, default=dict, nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
 
+class CreditLedgerCheckpoint(Base):
+    """
+    Per-user compacted ledger snapshot.
 
+    balance_credits == SUM(credit_ledger.delta_credits) for the user's rows with created_at <= through_created_at.
+    """
 
+    __tablename__ = "credit_ledger_checkpoints"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    balance_credits: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    entries_compacted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    through_created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
 
+
+class UploadObject(Base):
+    """
+    Content-addressed uploads (POST /v1/uploads/sign with a sha256), one row per (user, hash); see app.uploads.
+    Only rows with verified_at (bytes hashed server-side) are handed out again.
+    """
+
+    __tablename__ = "upload_objects"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    object_name: Mapped[str] = mapped_column(String(1024), nullable=False)
+    size_bytes: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow, nullable=False)
+    verified_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
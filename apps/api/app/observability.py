@@ -0,0 +1,233 @@
+"""
+Request-level latency instrumentation.
+
+- RequestTimingMiddleware (pure ASGI) times every request and labels it by route template.
+- SQLAlchemy cursor events add DB time + query count to the current request (via a contextvar,
+  which Starlette copies into the threadpool running sync endpoints/dependencies).
+- external_call("gcs_sign" | "stripe" | "nowpayments" | ...) times calls to other services.
+
+Everything lands in Prometheus histograms (GET /metrics). Requests slower than slow_request_ms are
+logged (sampled by slow_request_log_sample_rate) with their slowest statements and external calls,
+and kept in a small ring buffer for GET /internal/slow-requests. A per-request query count that
+grows with the result size (N+1) shows up directly in solidgen_api_request_db_queries.
+"""
+
+from __future__ import annotations
+
+import collections
+import contextlib
+import contextvars
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+
+
+logger = logging.getLogger("solidgen-api.observability")
+
+
+REQUEST_SECONDS = Histogram(
+    "solidgen_api_request_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "solidgen_api_request_db_seconds",
+    "Time spent in DB cursor execution per request.",
+    ["route"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "solidgen_api_request_db_queries",
+    "DB statements executed per request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+EXTERNAL_CALL_SECONDS = Histogram(
+    "solidgen_api_external_call_seconds",
+    "Latency of calls to other services (GCS signing, Stripe, NOWPayments, Pub/Sub).",
+    ["target"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_QUERY_SECONDS = Histogram(
+    "solidgen_api_db_query_seconds",
+    "Latency of individual DB statements (all callers, incl. background threads).",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+CONDITIONAL_GETS = Counter(
+    "solidgen_api_conditional_get_total",
+    "Job polling responses, by route and result (not_modified, modified, unconditional).",
+    ["route", "result"],
+)
+UPLOAD_DEDUP = Counter(
+    "solidgen_api_upload_dedup_total",
+    "Hashed upload signs, by result (hit, verified, new, reupload).",
+    ["result"],
+)
+INPUT_PREFLIGHT = Counter(
+    "solidgen_api_input_preflight_total",
+    "Job input pre-flight checks, by result (ok or the rejection reason) and source (gcs, cache, check).",
+    ["result", "source"],
+)
+JOBS_SUBMITTED = Counter(
+    "solidgen_api_jobs_submitted_total", "Jobs created, by quality tier and Pub/Sub lane (default, draft).", ["quality", "lane"]
+)
+DB_STATEMENTS = Counter("solidgen_api_db_statements_total", "DB statements, by engine (primary, replica).", ["role"])
+READ_SESSIONS = Counter(
+    "solidgen_api_read_sessions_total",
+    "Sessions for read-only routes, by target (replica, primary) and reason (default, no_replica, strong, recent_write).",
+    ["target", "reason"],
+)
+REPLICA_FALLBACKS = Counter(
+    "solidgen_api_replica_fallback_total", "Replica misses retried on the primary (replication lag).", ["route"]
+)
+SLOW_REQUESTS = Counter("solidgen_api_slow_requests_total", "Requests slower than slow_request_ms.", ["route"])
+WEBHOOK_BACKLOG_PENDING = Gauge("solidgen_api_webhook_backlog_pending", "Unprocessed webhook events.")
+WEBHOOK_BACKLOG_AGE = Gauge("solidgen_api_webhook_backlog_oldest_age_seconds", "Age of the oldest unprocessed webhook.")
+
+
+_MAX_STATEMENTS_PER_REQUEST = 50
+
+
+@dataclass
+class RequestStats:
+    db_seconds: float = 0.0
+    db_queries: int = 0
+    external_seconds: dict[str, float] = field(default_factory=dict)
+    statements: list[tuple[float, str]] = field(default_factory=list)  # (seconds, sql), first N only
+
+
+_current: contextvars.ContextVar[RequestStats | None] = contextvars.ContextVar("solidgen_request_stats", default=None)
+
+_recent_slow: collections.deque[dict[str, Any]] = collections.deque(maxlen=100)
+
+
+def recent_slow_requests() -> list[dict[str, Any]]:
+    return list(_recent_slow)
+
+
+@contextlib.contextmanager
+def external_call(target: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        EXTERNAL_CALL_SECONDS.labels(target).observe(dt)
+        stats = _current.get()
+        if stats is not None:
+            stats.external_seconds[target] = stats.external_seconds.get(target, 0.0) + dt
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("solidgen_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    dt = time.perf_counter() - conn.info["solidgen_query_start"].pop()
+    DB_QUERY_SECONDS.observe(dt)
+    stats = _current.get()
+    if stats is not None:
+        stats.db_seconds += dt
+        stats.db_queries += 1
+        if len(stats.statements) < _MAX_STATEMENTS_PER_REQUEST:
+            stats.statements.append((dt, statement))
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute doesn't fire for failed statements; keep the start-time stack balanced.
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("solidgen_query_start"):
+        conn.info["solidgen_query_start"].pop()
+
+
+def instrument_engine(engine: Engine, *, role: str = "primary"):
+    statements = DB_STATEMENTS.labels(role)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "after_cursor_execute", lambda *_args: statements.inc())
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _log_slow(method: str, route: str, status: int, seconds: float, stats: RequestStats):
+    SLOW_REQUESTS.labels(route).inc()
+    if random.random() >= settings.slow_request_log_sample_rate:
+        return
+    slowest = sorted(stats.statements, key=lambda s: s[0], reverse=True)[:5]
+    entry = {
+        "at": time.time(),
+        "method": method,
+        "route": route,
+        "status": status,
+        "ms": round(seconds * 1000.0, 1),
+        "db_ms": round(stats.db_seconds * 1000.0, 1),
+        "db_queries": stats.db_queries,
+        "external_ms": {k: round(v * 1000.0, 1) for k, v in stats.external_seconds.items()},
+        "slowest_statements": [{"ms": round(dt * 1000.0, 2), "sql": sql[:500]} for dt, sql in slowest],
+    }
+    _recent_slow.append(entry)
+    logger.warning(
+        "Slow request %s %s status=%s ms=%.1f db_ms=%.1f db_queries=%s external_ms=%s slowest=%s",
+        method,
+        route,
+        status,
+        entry["ms"],
+        entry["db_ms"],
+        entry["db_queries"],
+        entry["external_ms"],
+        entry["slowest_statements"][:1],
+    )
+
+
+class RequestTimingMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead). Adds a Server-Timing header."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        t0 = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Non-streaming endpoints have finished by now, so this is the full app/DB split.
+                server_timing = f"app;dur={(time.perf_counter() - t0) * 1000.0:.1f}, db;dur={stats.db_seconds * 1000.0:.1f}"
+                for target, seconds in stats.external_seconds.items():
+                    server_timing += f", {target};dur={seconds * 1000.0:.1f}"
+                message["headers"] = [*message.get("headers", []), (b"server-timing", server_timing.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            seconds = time.perf_counter() - t0
+            route = _route_template(scope)
+            method = scope.get("method", "")
+            REQUEST_SECONDS.labels(method, route, str(status_code)).observe(seconds)
+            REQUEST_DB_SECONDS.labels(route).observe(stats.db_seconds)
+            REQUEST_DB_QUERIES.labels(route).observe(stats.db_queries)
+            if seconds * 1000.0 >= settings.slow_request_ms:
+                _log_slow(method, route, status_code, seconds, stats)
@@ -0,0 +1,231 @@
+"""
+Input pre-flight for POST /v1/jobs: reject unusable inputs before charging credits or publishing.
+
+A missing object, a non-image or a huge image used to surface only on the GPU worker (a worker slot,
+a job lock, a failure write and a refund). At submit time we now check, in order:
+  1. the URI is one of the caller's uploads: gs://<gcs_bucket>/uploads/<user_id>/...;
+  2. object metadata (one metadata GET, no body): exists, at most INPUT_MAX_BYTES;
+  3. a header-only probe (ranged GET of the first INPUT_PROBE_BYTES, more only for JPEGs with large
+     metadata segments): PNG / JPEG / WebP, each side within [INPUT_MIN_SIDE, INPUT_MAX_SIDE].
+
+Results are cached per URI in a process-local LRU for INPUT_PREFLIGHT_CACHE_SECONDS (resubmits of the same
+upload skip GCS); "not found" is never cached, the client may still be uploading. GCS errors fail open:
+the job is accepted unchecked, as before.
+
+Failed jobs the checks didn't catch are marked "Invalid input: ..." by the worker when the download or
+decode of the input fails; `python -m app.preflight report` counts them per day.
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import logging
+import struct
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.gcp import head_gcs_object, read_gcs_object_head
+from app.observability import INPUT_PREFLIGHT
+
+
+logger = logging.getLogger("solidgen-api.preflight")
+
+
+# Worker error_text prefix for failures in download / decode of the input (solidgen_worker.main).
+INVALID_INPUT_PREFIX = "Invalid input: "
+
+_MAX_PROBE_BYTES = 1 << 20  # JPEG EXIF/ICC segments ahead of the frame header rarely exceed this
+
+
+@dataclass(frozen=True)
+class InputInfo:
+    format: str  # png | jpeg | webp
+    width: int
+    height: int
+    bytes: int
+
+
+class InputRejected(Exception):
+    """The input can't be processed; `reason` is a short metric label, the message is shown to the client."""
+
+    def __init__(self, reason: str, message: str, *, status_code: int = 422):
+        super().__init__(message)
+        self.reason = reason
+        self.status_code = status_code
+
+
+def _u16be(data: bytes, i: int) -> int:
+    return struct.unpack_from(">H", data, i)[0]
+
+
+def _probe_jpeg(data: bytes) -> tuple[int, int] | None:
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:  # no length field
+            i += 2
+            continue
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):  # SOFn
+            return _u16be(data, i + 7), _u16be(data, i + 5)
+        i += 2 + _u16be(data, i + 2)
+    return None
+
+
+def probe_image(data: bytes) -> tuple[str, int, int] | None:
+    """(format, width, height) from the leading bytes of a PNG / JPEG / WebP; None if unrecognized or truncated."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and data[12:16] == b"IHDR" and len(data) >= 24:
+        width, height = struct.unpack_from(">II", data, 16)
+        return "png", width, height
+    if data[:2] == b"\xff\xd8":
+        dims = _probe_jpeg(data)
+        return ("jpeg", *dims) if dims else None
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b"VP8 ":
+            return "webp", struct.unpack_from("<H", data, 26)[0] & 0x3FFF, struct.unpack_from("<H", data, 28)[0] & 0x3FFF
+        if chunk == b"VP8L":
+            bits = struct.unpack_from("<I", data, 21)[0]
+            return "webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b"VP8X":
+            return "webp", int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+
+_cache: collections.OrderedDict[str, tuple[float, InputInfo | InputRejected]] = collections.OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_get(gcs_uri: str) -> InputInfo | InputRejected | None:
+    with _cache_lock:
+        entry = _cache.get(gcs_uri)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del _cache[gcs_uri]
+            return None
+        _cache.move_to_end(gcs_uri)
+        return entry[1]
+
+
+def _cache_put(gcs_uri: str, result: InputInfo | InputRejected):
+    with _cache_lock:
+        _cache[gcs_uri] = (time.monotonic() + settings.input_preflight_cache_seconds, result)
+        _cache.move_to_end(gcs_uri)
+        while len(_cache) > settings.input_preflight_cache_size:
+            _cache.popitem(last=False)
+
+
+def _inspect(object_name: str) -> InputInfo:
+    meta = head_gcs_object(object_name=object_name)
+    if meta is None:
+        raise InputRejected("not_found", "Input image not found; upload it before creating the job")
+    if meta.size > settings.input_max_bytes:
+        raise InputRejected("too_large", f"Input image is {meta.size} bytes; the limit is {settings.input_max_bytes}")
+
+    length = min(meta.size, settings.input_probe_bytes)
+    head = read_gcs_object_head(object_name=object_name, generation=meta.generation, length=length) if length else b""
+    probed = probe_image(head)
+    if probed is None and head[:2] == b"\xff\xd8" and meta.size > length:
+        head = read_gcs_object_head(object_name=object_name, generation=meta.generation, length=min(meta.size, _MAX_PROBE_BYTES))
+        probed = probe_image(head)
+    if probed is None:
+        raise InputRejected("not_image", "Input is not a PNG, JPEG or WebP image")
+
+    fmt, width, height = probed
+    if min(width, height) < settings.input_min_side or max(width, height) > settings.input_max_side:
+        raise InputRejected(
+            "dimensions",
+            f"Input image is {width}x{height}; each side must be between {settings.input_min_side} "
+            f"and {settings.input_max_side} pixels",
+        )
+    return InputInfo(format=fmt, width=width, height=height, bytes=meta.size)
+
+
+def check_input(*, user_id: uuid.UUID, gcs_uri: str) -> InputInfo | None:
+    """Raises InputRejected for unusable inputs. None when pre-flight is disabled."""
+    if not settings.input_preflight_enabled:
+        return None
+    prefix = f"gs://{settings.gcs_bucket}/uploads/{user_id}/"
+    if not gcs_uri.startswith(prefix) or len(gcs_uri) == len(prefix):
+        INPUT_PREFLIGHT.labels("foreign_uri", "check").inc()
+        raise InputRejected("foreign_uri", "input_gcs_uri must be one of your uploads (POST /v1/uploads/sign)", status_code=403)
+
+    cached = _cache_get(gcs_uri)
+    if cached is not None:
+        INPUT_PREFLIGHT.labels("ok" if isinstance(cached, InputInfo) else cached.reason, "cache").inc()
+        if isinstance(cached, InputRejected):
+            raise InputRejected(cached.reason, str(cached), status_code=cached.status_code)
+        return cached
+
+    try:
+        info = _inspect(gcs_uri[len(f"gs://{settings.gcs_bucket}/") :])
+    except InputRejected as e:
+        INPUT_PREFLIGHT.labels(e.reason, "gcs").inc()
+        if e.reason != "not_found":
+            _cache_put(gcs_uri, e)
+        raise
+    except Exception:
+        # GCS trouble shouldn't block submissions: let the worker find out, as before.
+        logger.warning("Input pre-flight failed for %s; accepting the job unchecked", gcs_uri, exc_info=True)
+        INPUT_PREFLIGHT.labels("error", "gcs").inc()
+        return None
+    INPUT_PREFLIGHT.labels("ok", "gcs").inc()
+    _cache_put(gcs_uri, info)
+    return info
+
+
+# Per day: jobs that reached a worker and failed, and how many of those on their input.
+_REPORT_SQL = text(
+    """
+    SELECT date_trunc('day', updated_at) AS day,
+           COUNT(*) AS failed,
+           COUNT(*) FILTER (WHERE error_text LIKE :prefix) AS invalid_input,
+           COALESCE(SUM(cost_credits) FILTER (WHERE error_text LIKE :prefix), 0) AS refunded_credits
+    FROM jobs
+    WHERE status = 'FAILED' AND updated_at >= now() - make_interval(days => :days)
+    GROUP BY 1
+    ORDER BY 1
+    """
+)
+
+
+def failure_report(db: Session, *, days: int) -> list[dict]:
+    rows = db.execute(_REPORT_SQL, {"prefix": f"{INVALID_INPUT_PREFIX}%", "days": days}).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def main(argv: list[str] | None = None) -> int:
+    from app.db import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.preflight")
+    parser.add_argument("command", choices=["report"])
+    parser.add_argument("--days", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        rows = failure_report(db, days=args.days)
+    finally:
+        db.close()
+    print(f"{'day':<12} {'failed':>8} {'invalid_input':>14} {'refunded_credits':>17}")
+    for r in rows:
+        print(f"{r['day']:%Y-%m-%d}   {r['failed']:>8} {r['invalid_input']:>14} {r['refunded_credits']:>17}")
+    print("Worker seconds lost to them: increase(solidgen_worker_failed_job_seconds_total[1d]) by (reason)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+Partition management + retention.
+
+- credit_ledger is RANGE-partitioned by month on created_at. Partitions are created ahead of
+  time; partitions older than ledger_retention_months are archived to GCS (gzip JSONL) and
+  dropped, but only once every row in them is folded into a checkpoint (app.ledger), so
+  reconciliation never needs them again.
+- webhook_events keeps its (provider, event_id) unique key for idempotency, which rules out
+  partitioning by time. Instead, processed payloads are archived to GCS and stripped after
+  webhook_payload_retention_days, and rows are deleted after webhook_event_retention_days.
+- jobs is not partitioned: it is looked up by primary key and referenced by
+  credit_ledger.job_id, and both would have to carry created_at under partitioning.
+
+Run periodically (e.g. daily Cloud Scheduler -> Cloud Run job):
+    python -m app.retention maintain
+
+The partitioned table itself is created by migration 0003.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import logging
+import re
+import sys
+import tempfile
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+
+
+logger = logging.getLogger("solidgen-api.retention")
+
+
+_LEDGER_PARTITION_RE = re.compile(r"^credit_ledger_y(\d{4})m(\d{2})$")
+
+
+def _month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _add_months(d: date, n: int) -> date:
+    idx = d.year * 12 + (d.month - 1) + n
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def _ledger_partition_name(month: date) -> str:
+    return f"credit_ledger_y{month.year:04d}m{month.month:02d}"
+
+
+def is_ledger_partitioned(conn: Connection) -> bool:
+    return bool(
+        conn.execute(
+            text(
+                """
+                SELECT EXISTS (
+                    SELECT 1 FROM pg_partitioned_table p
+                    JOIN pg_class c ON c.oid = p.partrelid
+                    WHERE c.relname = 'credit_ledger'
+                )
+                """
+            )
+        ).scalar()
+    )
+
+
+def _create_ledger_partition(conn: Connection, month: date):
+    name = _ledger_partition_name(month)
+    lo = month.isoformat()
+    hi = _add_months(month, 1).isoformat()
+    try:
+        with conn.begin_nested():
+            conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF credit_ledger "
+                    f"FOR VALUES FROM ('{lo} 00:00:00+00') TO ('{hi} 00:00:00+00')"
+                )
+            )
+    except Exception:
+        # Typically: rows for this month already landed in the default partition.
+        logger.exception("Failed to create ledger partition %s", name)
+
+
+def ensure_ledger_partitions(conn: Connection, *, first_month: date | None = None, months_ahead: int | None = None):
+    """Create the default partition plus monthly partitions from first_month through now + months_ahead."""
+    ahead = settings.ledger_partition_months_ahead if months_ahead is None else months_ahead
+    this_month = _month_start(datetime.now(timezone.utc).date())
+    month = _month_start(first_month) if first_month else this_month
+
+    conn.execute(text("CREATE TABLE IF NOT EXISTS credit_ledger_default PARTITION OF credit_ledger DEFAULT"))
+    last = _add_months(this_month, ahead)
+    while month <= last:
+        _create_ledger_partition(conn, month)
+        month = _add_months(month, 1)
+
+
+def _ledger_partitions(conn: Connection) -> list[tuple[str, date]]:
+    rows = conn.execute(
+        text(
+            """
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            JOIN pg_class p ON p.oid = i.inhparent
+            WHERE p.relname = 'credit_ledger'
+            """
+        )
+    ).scalars()
+    out = []
+    for name in rows:
+        m = _LEDGER_PARTITION_RE.match(name)
+        if m:
+            out.append((name, date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(out, key=lambda x: x[1])
+
+
+def _archive_query(conn: Connection, sql: str, params: dict, object_name: str) -> tuple[str, int]:
+    from app.gcp import upload_archive
+
+    n = 0
+    with tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024) as buf:
+        with gzip.GzipFile(fileobj=buf, mode="wb") as gz:
+            # Options on the statement, not the connection: Connection.execution_options() sets them in place,
+            # and the DDL / UPDATE that follow on this connection must not run through a server-side cursor.
+            result = conn.execute(text(sql).execution_options(stream_results=True, yield_per=5000), params)
+            for (line,) in result:
+                gz.write(line.encode("utf-8"))
+                gz.write(b"\n")
+                n += 1
+        uri = upload_archive(object_name=object_name, fileobj=buf)
+    return uri, n
+
+
+def drop_expired_ledger_partitions(engine: Engine, *, dry_run: bool = False) -> list[str]:
+    """Archive + drop monthly partitions older than ledger_retention_months that checkpoints fully cover."""
+    this_month = _month_start(datetime.now(timezone.utc).date())
+    keep_from = _add_months(this_month, -settings.ledger_retention_months)
+    dropped: list[str] = []
+
+    with engine.connect() as conn:
+        if not is_ledger_partitioned(conn):
+            logger.info("credit_ledger is not partitioned; skipping partition retention")
+            return dropped
+        candidates = [name for name, month in _ledger_partitions(conn) if _add_months(month, 1) <= keep_from]
+        conn.rollback()
+
+    for name in candidates:
+        with engine.begin() as conn:
+            uncovered = conn.execute(
+                text(
+                    f"""
+                    SELECT 1 FROM {name} l
+                    LEFT JOIN credit_ledger_checkpoints c ON c.user_id = l.user_id
+                    WHERE c.through_created_at IS NULL OR l.created_at > c.through_created_at
+                    LIMIT 1
+                    """
+                )
+            ).first()
+            if uncovered:
+                logger.warning("Ledger partition %s has rows not covered by checkpoints; keeping it", name)
+                continue
+            if dry_run:
+                logger.info("Would archive + drop ledger partition %s", name)
+                continue
+
+            uri, n = _archive_query(
+                conn,
+                f"SELECT row_to_json(l)::text FROM {name} l ORDER BY l.created_at",
+                {},
+                f"{settings.archive_gcs_prefix}/credit_ledger/{name}.jsonl.gz",
+            )
+            conn.execute(text(f"ALTER TABLE credit_ledger DETACH PARTITION {name}"))
+            conn.execute(text(f"DROP TABLE {name}"))
+            logger.info("Archived + dropped ledger partition %s (rows=%s, archive=%s)", name, n, uri)
+            dropped.append(name)
+    return dropped
+
+
+def archive_webhook_payloads(db: Session, *, batch_size: int = 1000, dry_run: bool = False) -> int:
+    """Move processed webhook payloads older than webhook_payload_retention_days to GCS; keep the dedupe row."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.webhook_payload_retention_days)
+    total = 0
+    while True:
+        conn = db.connection()
+        ids = conn.execute(
+            text(
+                """
+                SELECT id FROM webhook_events
+                WHERE received_at < :cutoff AND processed_at IS NOT NULL AND payload <> '{}'::jsonb
+                ORDER BY received_at
+                LIMIT :batch
+                FOR UPDATE SKIP LOCKED
+                """
+            ),
+            {"cutoff": cutoff, "batch": batch_size},
+        ).scalars().all()
+        if not ids:
+            db.rollback()
+            return total
+        if dry_run:
+            db.rollback()
+            logger.info("Would archive %s+ webhook payloads older than %s", len(ids), cutoff)
+            return total
+
+        object_name = (
+            f"{settings.archive_gcs_prefix}/webhook_events/{datetime.now(timezone.utc):%Y/%m/%d}/{uuid.uuid4()}.jsonl.gz"
+        )
+        uri, n = _archive_query(
+            conn,
+            "SELECT row_to_json(w)::text FROM webhook_events w WHERE w.id = ANY(:ids) ORDER BY w.received_at",
+            {"ids": ids},
+            object_name,
+        )
+        conn.execute(text("UPDATE webhook_events SET payload = '{}'::jsonb WHERE id = ANY(:ids)"), {"ids": ids})
+        db.commit()
+        total += n
+        logger.info("Archived webhook payloads (count=%s, archive=%s)", n, uri)
+
+
+def delete_expired_webhook_events(db: Session, *, batch_size: int = 5000, dry_run: bool = False) -> int:
+    """Delete processed webhook rows past the provider retry horizon (webhook_event_retention_days)."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.webhook_event_retention_days)
+    if dry_run:
+        n = db.execute(
+            text("SELECT count(*) FROM webhook_events WHERE received_at < :cutoff AND processed_at IS NOT NULL"),
+            {"cutoff": cutoff},
+        ).scalar()
+        db.rollback()
+        logger.info("Would delete %s webhook events older than %s", n, cutoff)
+        return 0
+
+    total = 0
+    while True:
+        n = db.execute(
+            text(
+                """
+                DELETE FROM webhook_events WHERE id IN (
+                    SELECT id FROM webhook_events
+                    WHERE received_at < :cutoff AND processed_at IS NOT NULL
+                    LIMIT :batch
+                )
+                """
+            ),
+            {"cutoff": cutoff, "batch": batch_size},
+        ).rowcount
+        db.commit()
+        total += n or 0
+        if not n:
+            logger.info("Deleted expired webhook events (count=%s)", total)
+            return total
+
+
+def maintain(*, dry_run: bool = False):
+    from app.db import SessionLocal, engine
+
+    if not dry_run:
+        with engine.begin() as conn:
+            if is_ledger_partitioned(conn):
+                ensure_ledger_partitions(conn)
+
+    drop_expired_ledger_partitions(engine, dry_run=dry_run)
+
+    db = SessionLocal()
+    try:
+        archive_webhook_payloads(db, dry_run=dry_run)
+        delete_expired_webhook_events(db, dry_run=dry_run)
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.retention")
+    parser.add_argument("command", choices=["maintain"])
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    maintain(dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
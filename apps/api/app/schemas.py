@@ -3,7 +3,7 @@ from __future__ import annotations
 import uuid
 from typing import Literal, Optional
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 
 
 class SignupRequest(BaseModel):
@@ -30,21 +30,50 @@ class MeResponse(BaseModel):
 class SignedUploadRequest(BaseModel):
     content_type: Literal["image/png", "image/jpeg", "image/webp"]
     file_ext: Literal["png", "jpg", "jpeg", "webp"]
+    # Hex SHA-256 of the file: the same content is uploaded once per user (see app.uploads).
+    sha256: Optional[str] = Field(default=None, pattern=r"^[0-9a-f]{64}$")
 
 
 class SignedUploadResponse(BaseModel):
-    upload_url: str
+    upload_url: Optional[str]  # None: already stored (deduplicated), skip the PUT and use gcs_uri
     gcs_uri: str
     object_name: str
     expires_in_minutes: int
 
 
+class OutputVariantRequest(BaseModel):
+    """One deliverable built from the job's single inference pass; unset fields inherit the job's values."""
+
+    name: str = Field(pattern=r"^[a-z0-9][a-z0-9_-]{0,31}$")  # object name: outputs/<user>/<job>/<name>.<ext>
+    format: Literal["glb", "obj"] = "glb"
+    compression: Literal["none", "draco", "meshopt"] = "none"  # glb only
+    decimation_target: Optional[int] = Field(default=None, gt=0, le=2_000_000)
+    texture_size: Optional[Literal[512, 1024, 2048, 4096]] = None
+
+
 class CreateJobRequest(BaseModel):
     input_gcs_uri: str
     resolution: Literal[512, 1024, 1536] = 1024
+    # Sampler steps / guidance tier (solidgen_worker.quality); priced per tier.
+    quality: Literal["draft", "standard", "high"] = "standard"
     seed: int = 0
     decimation_target: int = 500_000
     texture_size: int = 2048
+    # Default: a single "asset" GLB. The first variant is the primary output (output_gcs_uri).
+    outputs: Optional[list[OutputVariantRequest]] = Field(default=None, min_length=1, max_length=8)
+
+    @field_validator("outputs")
+    @classmethod
+    def _check_outputs(cls, outputs):
+        if outputs is None:
+            return outputs
+        names = [o.name for o in outputs]
+        if len(set(names)) != len(names):
+            raise ValueError("output names must be unique")
+        for o in outputs:
+            if o.compression != "none" and o.format != "glb":
+                raise ValueError(f"compression is only supported for glb outputs ({o.name})")
+        return outputs
 
 
 class CreateJobResponse(BaseModel):
@@ -53,6 +82,17 @@ class CreateJobResponse(BaseModel):
     cost_credits: int
 
 
+class JobOutput(BaseModel):
+    name: str
+    format: str
+    compression: str = "none"
+    decimation_target: Optional[int] = None
+    texture_size: Optional[int] = None
+    bytes: Optional[int] = None
+    gcs_uri: str
+    download_url: Optional[str] = None
+
+
 class JobResponse(BaseModel):
     job_id: uuid.UUID
     status: str
@@ -61,6 +101,9 @@ class JobResponse(BaseModel):
     input_gcs_uri: str
     output_gcs_uri: Optional[str] = None
     output_download_url: Optional[str] = None
+    outputs: list[JobOutput] = []
+    preview_gcs_uri: Optional[str] = None
+    preview_download_url: Optional[str] = None
     error_text: Optional[str] = None
     cost_credits: int
     params: dict
@@ -72,6 +115,7 @@ class JobListItem(BaseModel):
     created_at: str
     updated_at: str
     resolution: int | None = None
+    quality: str = "standard"
     cost_credits: int
 
 
@@ -0,0 +1,110 @@
+"""
+Content-addressed uploads: POST /v1/uploads/sign with the file's sha256.
+
+    uploads/<user_id>/sha256/<sha256>.<ext>    (requests without a hash keep uploads/<user_id>/<uuid>.<ext>)
+
+upload_objects indexes these per (user_id, sha256). The first sign for a hash records a pending row and
+returns a PUT URL. A later sign for the same hash:
+  - verified row: the stored object, no upload URL (one primary-key lookup, no GCS call);
+  - pending row: the object is hashed server-side once. On a match the row is marked verified and reused;
+    otherwise (not uploaded, different bytes, over upload_dedup_verify_max_bytes) a fresh PUT URL is signed.
+Only bytes the API hashed itself are reused, so a client can't bind a hash to other content, and rows are
+per user, so a hash never reveals or shares another user's upload.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.gcp import hash_gcs_object, sign_gcs_upload_url
+from app.models import UploadObject
+from app.observability import UPLOAD_DEDUP
+
+
+logger = logging.getLogger("solidgen-api.uploads")
+
+
+@dataclass(frozen=True)
+class UploadTarget:
+    upload_url: str | None  # None: the content is already stored, nothing to upload
+    object_name: str
+    gcs_uri: str
+
+
+def _gcs_uri(object_name: str) -> str:
+    return f"gs://{settings.gcs_bucket}/{object_name}"
+
+
+def _is_current(row: UploadObject) -> bool:
+    if row.verified_at is None:
+        return False
+    if settings.upload_dedup_reverify_days <= 0:
+        return True
+    return row.verified_at > datetime.now(timezone.utc) - timedelta(days=settings.upload_dedup_reverify_days)
+
+
+def _sign(*, content_type: str, file_ext: str, user_id: uuid.UUID, object_name: str | None = None) -> UploadTarget:
+    res = sign_gcs_upload_url(content_type=content_type, file_ext=file_ext, user_id=user_id, object_name=object_name)
+    return UploadTarget(upload_url=res.url, object_name=res.object_name, gcs_uri=res.gcs_uri)
+
+
+def upload_target(
+    db: Session, *, user_id: uuid.UUID, content_type: str, file_ext: str, sha256: str | None
+) -> UploadTarget:
+    """Where the client's file goes (or already is). See module docstring."""
+    if sha256 is None:
+        return _sign(content_type=content_type, file_ext=file_ext, user_id=user_id)
+
+    row = db.execute(
+        select(UploadObject).where(UploadObject.user_id == user_id, UploadObject.sha256 == sha256)
+    ).scalar_one_or_none()
+    if row is not None and _is_current(row):
+        UPLOAD_DEDUP.labels("hit").inc()
+        return UploadTarget(upload_url=None, object_name=row.object_name, gcs_uri=_gcs_uri(row.object_name))
+
+    if row is None:
+        object_name = f"uploads/{user_id}/sha256/{sha256}.{file_ext}"
+        # Two tabs signing the same file at once: one row wins, both upload the same bytes to the same name.
+        db.execute(
+            insert(UploadObject)
+            .values(user_id=user_id, sha256=sha256, object_name=object_name, created_at=datetime.now(timezone.utc))
+            .on_conflict_do_nothing(index_elements=["user_id", "sha256"])
+        )
+        db.commit()
+        UPLOAD_DEDUP.labels("new").inc()
+        return _sign(content_type=content_type, file_ext=file_ext, user_id=user_id, object_name=object_name)
+
+    object_name = row.object_name
+    try:
+        stored = hash_gcs_object(object_name=object_name, max_bytes=settings.upload_dedup_verify_max_bytes)
+    except Exception:
+        logger.warning("Could not hash %s; signing a fresh upload", object_name, exc_info=True)
+        stored = None
+    if stored is not None and stored[0] == sha256:
+        db.execute(
+            update(UploadObject)
+            .where(UploadObject.user_id == user_id, UploadObject.sha256 == sha256)
+            .values(verified_at=datetime.now(timezone.utc), size_bytes=stored[1])
+        )
+        db.commit()
+        UPLOAD_DEDUP.labels("verified").inc()
+        return UploadTarget(upload_url=None, object_name=object_name, gcs_uri=_gcs_uri(object_name))
+
+    if row.verified_at is not None:
+        # Expired verification and the object is gone or changed: back to pending.
+        db.execute(
+            update(UploadObject)
+            .where(UploadObject.user_id == user_id, UploadObject.sha256 == sha256)
+            .values(verified_at=None, size_bytes=None)
+        )
+        db.commit()
+    UPLOAD_DEDUP.labels("reupload").inc()
+    return _sign(content_type=content_type, file_ext=file_ext, user_id=user_id, object_name=object_name)
@@ -0,0 +1,227 @@
+"""
+Payment webhook ingestion queue.
+
+Webhook handlers only verify the signature and persist the event with a single
+INSERT ... ON CONFLICT DO NOTHING (the (provider, event_id) key doubles as the idempotency check),
+then acknowledge. A consumer drains webhook_events WHERE processed_at IS NULL in batches
+(FOR UPDATE SKIP LOCKED, so any number of API instances / consumers can run) and credits users.
+
+The consumer runs as a background thread in the API (WEBHOOK_CONSUMER_ENABLED) and/or standalone:
+    python -m app.webhooks
+"""
+
+from __future__ import annotations
+
+import collections
+import logging
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models import CreditLedger, LedgerReason, User, WebhookEvent
+
+
+logger = logging.getLogger("solidgen-api.webhooks")
+
+
+# Recent ingest latencies (verify + insert), per provider, for /internal/webhooks/stats.
+_ingest_latency_ms: dict[str, collections.deque[float]] = collections.defaultdict(lambda: collections.deque(maxlen=1000))
+
+
+def record_ingest_latency(provider: str, seconds: float):
+    _ingest_latency_ms[provider].append(seconds * 1000.0)
+
+
+def ingest_event(db: Session, *, provider: str, event_id: str, payload: dict[str, Any]) -> bool:
+    """Persist a verified event. Returns False if (provider, event_id) was already received."""
+    stmt = (
+        pg_insert(WebhookEvent)
+        .values(id=uuid.uuid4(), provider=provider, event_id=event_id, payload=payload, received_at=datetime.utcnow())
+        .on_conflict_do_nothing(constraint="uq_webhook_provider_event")
+        .returning(WebhookEvent.id)
+    )
+    inserted = db.execute(stmt).first() is not None
+    db.commit()
+    if inserted:
+        consumer.wake()
+    return inserted
+
+
+def apply_credit_purchase(*, db: Session, provider: str, external_id: str, user_id: uuid.UUID, credits: int):
+    """Credit a purchase once per (provider, external_id). Caller commits."""
+    user = db.query(User).filter(User.id == user_id).with_for_update().one_or_none()
+    if not user:
+        return
+
+    # Idempotency for “credit add” on provider/external_id
+    already = (
+        db.query(CreditLedger)
+        .filter(CreditLedger.provider == provider, CreditLedger.external_id == external_id)
+        .one_or_none()
+    )
+    if already:
+        return
+
+    user.credits_balance += credits
+    ledger = CreditLedger(
+        user_id=user.id,
+        job_id=None,
+        delta_credits=credits,
+        reason=LedgerReason.CREDIT_PURCHASE_STRIPE if provider == "stripe" else LedgerReason.CREDIT_PURCHASE_NOWPAYMENTS,
+        provider=provider,
+        external_id=external_id,
+    )
+    db.add(ledger)
+    db.add(user)
+
+
+def _process_stripe(db: Session, wh: WebhookEvent):
+    event = wh.payload
+    if event.get("type") != "checkout.session.completed":
+        return
+    session = event["data"]["object"]
+    metadata = session.get("metadata") or {}
+    user_id = metadata.get("user_id")
+    credits = metadata.get("credits")
+    if user_id and credits:
+        apply_credit_purchase(
+            db=db,
+            provider="stripe",
+            external_id=wh.event_id,
+            user_id=uuid.UUID(user_id),
+            credits=int(credits),
+        )
+
+
+def _process_nowpayments(db: Session, wh: WebhookEvent):
+    data = wh.payload
+    status_str = str(data.get("payment_status") or "").lower()
+    if status_str not in {"finished", "confirmed"}:
+        return
+    meta = data.get("metadata") or {}
+    user_id = meta.get("user_id")
+    credits = meta.get("credits")
+    if user_id and credits:
+        apply_credit_purchase(
+            db=db,
+            provider="nowpayments",
+            # One credit per payment, whichever of finished/confirmed arrives first.
+            external_id=wh.event_id.split(":", 1)[0],
+            user_id=uuid.UUID(user_id),
+            credits=int(credits),
+        )
+
+
+_PROCESSORS = {
+    "stripe": _process_stripe,
+    "nowpayments": _process_nowpayments,
+}
+
+
+def drain_webhook_events(db: Session, *, batch_size: int) -> int:
+    """Process one batch of pending events. Returns how many rows were claimed."""
+    rows = (
+        db.query(WebhookEvent)
+        .filter(WebhookEvent.processed_at.is_(None), WebhookEvent.attempts < settings.webhook_max_attempts)
+        .order_by(WebhookEvent.received_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for wh in rows:
+        wh.attempts += 1
+        try:
+            with db.begin_nested():
+                _PROCESSORS[wh.provider](db, wh)
+            wh.processed_at = datetime.utcnow()
+            wh.last_error = None
+        except Exception as e:
+            logger.exception("Webhook processing failed (provider=%s, event_id=%s)", wh.provider, wh.event_id)
+            wh.last_error = f"{type(e).__name__}: {e}"[:8000]
+    db.commit()
+    return len(rows)
+
+
+def webhook_backlog(db: Session) -> dict[str, Any]:
+    """Pending count + oldest pending age (served by the partial index ix_webhook_events_pending)."""
+    count, age = db.execute(
+        text(
+            "SELECT count(*), EXTRACT(EPOCH FROM now() - min(received_at)) "
+            "FROM webhook_events WHERE processed_at IS NULL"
+        )
+    ).one()
+    return {"pending": int(count), "oldest_pending_age_seconds": float(age or 0.0)}
+
+
+def ingest_latency_stats() -> dict[str, dict[str, float]]:
+    out = {}
+    for provider, samples in _ingest_latency_ms.items():
+        s = sorted(samples)
+        if s:
+            out[provider] = {
+                "count": len(s),
+                "p50_ms": s[len(s) // 2],
+                "p99_ms": s[min(len(s) - 1, int(len(s) * 0.99))],
+            }
+    return out
+
+
+class WebhookConsumer:
+    """Background thread draining pending webhook events; woken on ingest, polls as a fallback."""
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name="webhook-consumer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def run_forever(self):
+        from app.db import SessionLocal
+
+        while not self._stop.is_set():
+            self._wake.wait(timeout=settings.webhook_consumer_poll_seconds)
+            self._wake.clear()
+            try:
+                db = SessionLocal()
+                try:
+                    # Keep draining while batches come back full; failures wait for the next wake/poll.
+                    batch = settings.webhook_consumer_batch_size
+                    while not self._stop.is_set() and drain_webhook_events(db, batch_size=batch) >= batch:
+                        pass
+                finally:
+                    db.close()
+            except Exception:
+                logger.exception("Webhook consumer iteration failed")
+                time.sleep(1.0)
+
+
+consumer = WebhookConsumer()
+
+
+def main() -> int:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    consumer.run_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
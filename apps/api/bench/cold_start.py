@@ -0,0 +1,112 @@
+"""
+API cold-start benchmark: wall time from process spawn to the first healthy /healthz response,
+plus an import-time breakdown of `import app.main` (python -X importtime, grouped by top-level package).
+
+Each run starts a fresh `uvicorn app.main:app` process (same env as this shell, so point
+DATABASE_URL at the DB you want startup to talk to), polls /healthz, then kills it.
+
+    cd apps/api
+    python -m bench.cold_start --runs 10 --label after --out /tmp/after.json
+    python -m bench.cold_start --compare /tmp/before.json /tmp/after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthy(timeout_s: float = 60.0) -> float:
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host=127.0.0.1", f"--port={port}", "--log-level=warning"],
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    try:
+        while time.perf_counter() - t0 < timeout_s:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited early (code={proc.returncode})")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - t0
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("API did not become healthy")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def import_time_breakdown(module: str = "app.main", top: int = 15) -> list[tuple[str, float]]:
+    """Cumulative import time (ms) per top-level package for a cold `import <module>`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    totals: dict[str, float] = collections.defaultdict(float)
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        if name.startswith("  "):
+            continue  # nested import; already counted in its parent's cumulative time
+        totals[name.strip().split(".")[0]] += int(cumulative) / 1000.0
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), default=None)
+    args = parser.parse_args()
+
+    if args.compare:
+        before, after = (json.load(open(p)) for p in args.compare)
+        for key in ("p50_s", "max_s"):
+            print(f"{key:<6} {before['label']}={before[key]:.3f} {after['label']}={after[key]:.3f}")
+        return
+
+    imports = import_time_breakdown()
+    print(f"{'package':<24} {'import_ms':>10}")
+    for name, ms in imports:
+        print(f"{name:<24} {ms:>10.1f}")
+
+    samples = [time_to_healthy() for _ in range(args.runs)]
+    result = {
+        "label": args.label,
+        "runs": args.runs,
+        "p50_s": statistics.median(samples),
+        "max_s": max(samples),
+        "samples_s": samples,
+        "import_ms": dict(imports),
+    }
+    print(f"time-to-healthy p50={result['p50_s']:.3f}s max={result['max_s']:.3f}s (runs={args.runs})")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Local stand-ins for GCS, Pub/Sub and the payment providers, for load tests (bench.load).
+
+    cd apps/api
+    DATABASE_URL=postgresql+psycopg2://... python -m bench.fakes --port 8089
+
+Runs the real app (app.main:app, same middleware, DB and webhook consumer) in uvicorn with the external
+calls replaced at their import sites:
+  - GCS: objects live in memory. Signed upload URLs point at PUT /_fake_gcs/<object> on this server;
+    metadata / ranged reads / hashing (upload dedup, input pre-flight) read that store; download URLs are
+    just strings.
+  - Pub/Sub: publish() hands the job to a fake worker thread that marks it RUNNING after
+    BENCH_FAKE_JOB_SECONDS / 2 and SUCCEEDED (with one output) after BENCH_FAKE_JOB_SECONDS, so pollers
+    see the same status changes as in production.
+  - Stripe / NOWPayments: checkout sessions and invoices return canned URLs. Webhooks are the real
+    handlers; bench.load signs its deliveries with STRIPE_WEBHOOK_SECRET / NOWPAYMENTS_IPN_SECRET.
+Every fake runs inside external_call(<same target as the real call>) and sleeps BENCH_FAKE_LATENCY_MS
+(default 0), so Server-Timing and the external-call metrics look like production.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy import text
+
+from app.config import settings
+from app.gcp import ObjectMeta, SignedUrlResult
+from app.observability import external_call
+
+
+logger = logging.getLogger("solidgen-api.bench.fakes")
+
+
+_LATENCY_S = float(os.environ.get("BENCH_FAKE_LATENCY_MS", "0")) / 1000.0
+_JOB_SECONDS = float(os.environ.get("BENCH_FAKE_JOB_SECONDS", "5"))
+
+
+@contextlib.contextmanager
+def _external(target: str):
+    with external_call(target):
+        if _LATENCY_S > 0:
+            time.sleep(_LATENCY_S)
+        yield
+
+
+@dataclass
+class _Object:
+    data: bytes
+    content_type: str | None
+    generation: int
+
+
+_objects: dict[str, _Object] = {}
+_objects_lock = threading.Lock()
+
+
+def _base_url() -> str:
+    return os.environ.get("BENCH_BASE_URL", settings.api_base_url).rstrip("/")
+
+
+def sign_gcs_upload_url(
+    *, content_type: str, file_ext: str, user_id: uuid.UUID, object_name: str | None = None
+) -> SignedUrlResult:
+    object_name = object_name or f"uploads/{user_id}/{uuid.uuid4()}.{file_ext}"
+    with _external("gcs_sign"):
+        url = f"{_base_url()}/_fake_gcs/{object_name}"
+    return SignedUrlResult(url=url, object_name=object_name, gcs_uri=f"gs://{settings.gcs_bucket}/{object_name}")
+
+
+def sign_gcs_download_url(*, gcs_uri: str) -> str:
+    with _external("gcs_sign"):
+        return f"https://storage.fake/{gcs_uri[len('gs://'):]}?X-Goog-Signature=fake"
+
+
+def head_gcs_object(*, object_name: str) -> ObjectMeta | None:
+    with _external("gcs_head"):
+        obj = _objects.get(object_name)
+    if obj is None:
+        return None
+    return ObjectMeta(size=len(obj.data), content_type=obj.content_type, generation=obj.generation)
+
+
+def read_gcs_object_head(*, object_name: str, generation: int, length: int) -> bytes:
+    with _external("gcs_range_read"):
+        return _objects[object_name].data[:length]
+
+
+def hash_gcs_object(*, object_name: str, max_bytes: int) -> tuple[str, int] | None:
+    with _external("gcs_hash"):
+        obj = _objects.get(object_name)
+        if obj is None or len(obj.data) > max_bytes:
+            return None
+        return hashlib.sha256(obj.data).hexdigest(), len(obj.data)
+
+
+def warm_up_clients():
+    pass
+
+
+async def _fake_gcs_put(object_name: str, request: Request):
+    data = await request.body()
+    with _objects_lock:
+        previous = _objects.get(object_name)
+        _objects[object_name] = _Object(
+            data=data,
+            content_type=request.headers.get("content-type"),
+            generation=(previous.generation + 1) if previous else 1,
+        )
+    return Response(status_code=200)
+
+
+class _FakeWorker:
+    """Moves published jobs QUEUED -> RUNNING -> SUCCEEDED on a timer, like a (very fast) GPU worker."""
+
+    def __init__(self):
+        self._due: list[tuple[float, str, str]] = []
+        self._cv = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="fake-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, job_id: str):
+        now = time.monotonic()
+        with self._cv:
+            heapq.heappush(self._due, (now + _JOB_SECONDS / 2, job_id, "RUNNING"))
+            heapq.heappush(self._due, (now + _JOB_SECONDS, job_id, "SUCCEEDED"))
+            self._cv.notify()
+
+    def _run(self):
+        from app.db import get_engine
+
+        while True:
+            with self._cv:
+                while not self._due or self._due[0][0] > time.monotonic():
+                    self._cv.wait(timeout=(self._due[0][0] - time.monotonic()) if self._due else None)
+                _due, job_id, status = heapq.heappop(self._due)
+            output = f"gs://{settings.gcs_bucket}/outputs/fake/{job_id}/asset.glb"
+            outputs = [{"name": "asset", "format": "glb", "compression": "none", "bytes": 1_000_000, "gcs_uri": output}]
+            try:
+                with get_engine().begin() as conn:
+                    if status == "RUNNING":
+                        conn.execute(text("UPDATE jobs SET status = 'RUNNING', updated_at = now() WHERE id = :id"), {"id": job_id})
+                    else:
+                        conn.execute(
+                            text(
+                                "UPDATE jobs SET status = 'SUCCEEDED', updated_at = now(), output_gcs_uri = :output, "
+                                "outputs = CAST(:outputs AS jsonb) WHERE id = :id"
+                            ),
+                            {"id": job_id, "output": output, "outputs": json.dumps(outputs)},
+                        )
+            except Exception:
+                logger.warning("Fake worker could not update job %s", job_id, exc_info=True)
+
+
+class _FakePublisher:
+    def __init__(self, worker: _FakeWorker):
+        self._worker = worker
+
+    def publish(self, topic: str, data: bytes, **attrs: Any) -> Future:
+        with _external("pubsub_publish"):
+            self._worker.submit(json.loads(data)["job_id"])
+        future: Future = Future()
+        future.set_result(str(uuid.uuid4()))
+        return future
+
+
+def _stripe_checkout_create(**kwargs: Any):
+    # app.main already times this call as "stripe".
+    time.sleep(_LATENCY_S)
+    return SimpleNamespace(id=f"cs_fake_{uuid.uuid4().hex}", url="https://checkout.stripe.fake/session")
+
+
+def _nowpayments_post(path: str, payload: dict[str, Any]) -> dict[str, Any]:
+    with _external("nowpayments"):
+        invoice_id = uuid.uuid4().int % 10**10
+    return {"id": invoice_id, "invoice_url": f"https://nowpayments.fake/invoice/{invoice_id}"}
+
+
+def install():
+    """Swap the external calls for the fakes (in every module that imported them) and mount the fake GCS route."""
+    import app.gcp
+    import app.main
+    import app.preflight
+    import app.uploads
+
+    publisher = _FakePublisher(_FakeWorker())
+    fakes = {
+        "sign_gcs_upload_url": sign_gcs_upload_url,
+        "sign_gcs_download_url": sign_gcs_download_url,
+        "head_gcs_object": head_gcs_object,
+        "read_gcs_object_head": read_gcs_object_head,
+        "hash_gcs_object": hash_gcs_object,
+        "warm_up_clients": warm_up_clients,
+        "get_pubsub_publisher": lambda: publisher,
+        "__nowpayments_post": _nowpayments_post,
+    }
+    for module in (app.gcp, app.main, app.preflight, app.uploads):
+        for name, fake in fakes.items():
+            if hasattr(module, name):
+                setattr(module, name, fake)
+
+    stripe = app.main._stripe()
+    stripe.checkout.Session.create = staticmethod(_stripe_checkout_create)
+
+    app.main.app.add_api_route("/_fake_gcs/{object_name:path}", _fake_gcs_put, methods=["PUT"], include_in_schema=False)
+    return app.main.app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    os.environ.setdefault("BENCH_BASE_URL", f"http://{args.host}:{args.port}")
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    uvicorn.run(install(), host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Hot-query latency benchmark (run before/after partitioning + retention to compare).
+
+Samples real ids from the target DB and times each hot query N times; writes are rolled back.
+
+    cd apps/api
+    python -m bench.hot_queries --label before --out /tmp/before.json
+    alembic upgrade head && python -m app.retention maintain
+    python -m bench.hot_queries --label after --out /tmp/after.json
+    python -m bench.hot_queries --compare /tmp/before.json /tmp/after.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+
+from sqlalchemy import text
+
+from app.db import engine
+
+
+HOT_QUERIES: dict[str, str] = {
+    # worker: mark_job_running / mark_job_succeeded
+    "jobs.update_status": "UPDATE jobs SET status = 'RUNNING', updated_at = now() WHERE id = :job_id",
+    # API: get_job / list_jobs
+    "jobs.get": "SELECT * FROM jobs WHERE id = :job_id AND user_id = :user_id",
+    "jobs.list": "SELECT * FROM jobs WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 100",
+    # API: _apply_credit_purchase idempotency
+    "ledger.purchase_lookup": "SELECT id FROM credit_ledger WHERE provider = :provider AND external_id = :external_id",
+    # worker: refund_job_if_needed idempotency
+    "ledger.refund_lookup": "SELECT 1 FROM credit_ledger WHERE job_id = :job_id AND reason = 'JOB_REFUND' LIMIT 1",
+    "ledger.insert": (
+        "INSERT INTO credit_ledger (id, user_id, job_id, delta_credits, reason, created_at) "
+        "VALUES (:new_id, :user_id, NULL, -1, 'JOB_CHARGE', now())"
+    ),
+    # API: webhook idempotency
+    "webhooks.lookup": "SELECT id, processed_at FROM webhook_events WHERE provider = :provider AND event_id = :event_id",
+}
+
+
+def _sample_params(conn, n: int) -> list[dict]:
+    jobs = conn.execute(text("SELECT id, user_id FROM jobs TABLESAMPLE SYSTEM (1) LIMIT :n"), {"n": n}).all()
+    if not jobs:
+        jobs = conn.execute(text("SELECT id, user_id FROM jobs LIMIT :n"), {"n": n}).all()
+    purchases = conn.execute(
+        text("SELECT provider, external_id FROM credit_ledger WHERE provider IS NOT NULL LIMIT :n"), {"n": n}
+    ).all()
+    events = conn.execute(text("SELECT provider, event_id FROM webhook_events LIMIT :n"), {"n": n}).all()
+    if not jobs:
+        raise SystemExit("Target DB has no jobs; seed it first.")
+
+    out = []
+    for i in range(n):
+        job = random.choice(jobs)
+        p = random.choice(purchases) if purchases else ("stripe", "missing")
+        e = random.choice(events) if events else ("stripe", "missing")
+        out.append(
+            {
+                "job_id": job[0],
+                "user_id": job[1],
+                "provider": p[0],
+                "external_id": p[1],
+                "event_id": e[1],
+                "new_id": uuid.uuid4(),
+            }
+        )
+    return out
+
+
+def run(iterations: int) -> dict[str, dict[str, float]]:
+    results: dict[str, dict[str, float]] = {}
+    with engine.connect() as conn:
+        params = _sample_params(conn, iterations)
+        conn.rollback()
+        for name, sql in HOT_QUERIES.items():
+            stmt = text(sql)
+            samples = []
+            for p in params:
+                t0 = time.perf_counter()
+                conn.execute(stmt, p)
+                samples.append((time.perf_counter() - t0) * 1000.0)
+                conn.rollback()
+            samples.sort()
+            results[name] = {
+                "p50_ms": statistics.median(samples),
+                "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+                "mean_ms": statistics.fmean(samples),
+            }
+    return results
+
+
+def _print(results: dict[str, dict[str, float]]):
+    print(f"{'query':<26} {'p50_ms':>9} {'p99_ms':>9} {'mean_ms':>9}")
+    for name, r in results.items():
+        print(f"{name:<26} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f} {r['mean_ms']:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), default=None)
+    args = parser.parse_args()
+
+    if args.compare:
+        before, after = (json.load(open(p)) for p in args.compare)
+        print(f"{'query':<26} {before['label'] + ' p50':>14} {after['label'] + ' p50':>14} {'speedup':>8}")
+        for name, b in before["results"].items():
+            a = after["results"].get(name)
+            if a:
+                print(f"{name:<26} {b['p50_ms']:>14.3f} {a['p50_ms']:>14.3f} {b['p50_ms'] / a['p50_ms']:>7.2f}x")
+        return
+
+    results = run(args.iterations)
+    _print(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"label": args.label, "iterations": args.iterations, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Job-polling load test: what a poll of GET /v1/jobs/{id} and GET /v1/jobs costs per request.
+
+Seeds a user with a few jobs in the target DB (DATABASE_URL, schema at head), mints a token for it,
+then hammers a running API (`uvicorn app.main:app`) from --concurrency threads, like many browser tabs
+polling. With --conditional each poller sends If-None-Match with the ETag it last saw (what a browser
+does for a "private, no-cache" response), so unchanged jobs come back as 304.
+
+    cd apps/api
+    uvicorn app.main:app --port 8080 &
+    python -m bench.job_polling --requests 5000 --label before --out /tmp/before.json
+    python -m bench.job_polling --requests 5000 --conditional --label after --out /tmp/after.json
+    python -m bench.job_polling --compare /tmp/before.json /tmp/after.json
+
+Reports per endpoint: requests/s, client latency p50/p99, server time (app / db) from the
+Server-Timing header, response bytes and the status mix. The seeded rows are deleted afterwards.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.db import engine
+from app.security import create_access_token
+
+
+def _pct(samples: list[float], q: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * q))] if s else 0.0
+
+
+def _seed(n_jobs: int) -> tuple[uuid.UUID, list[uuid.UUID]]:
+    user_id = uuid.uuid4()
+    job_ids = [uuid.uuid4() for _ in range(n_jobs)]
+    now = datetime.now(timezone.utc)
+    outputs = [{"name": "asset", "format": "glb", "bytes": 1_000_000, "gcs_uri": "gs://bench/outputs/asset.glb"}]
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO users (id, email, password_hash, credits_balance, created_at) "
+                "VALUES (:id, :email, '-', 0, :now)"
+            ),
+            {"id": user_id, "email": f"bench-{user_id}@example.invalid", "now": now},
+        )
+        for i, job_id in enumerate(job_ids):
+            # A mix of finished (signed URLs in the body) and running jobs.
+            done = i % 2 == 0
+            conn.execute(
+                text(
+                    "INSERT INTO jobs (id, user_id, status, created_at, updated_at, input_gcs_uri, output_gcs_uri, "
+                    "outputs, params, cost_credits) VALUES (:id, :user_id, :status, :now, :now, 'gs://bench/in.png', "
+                    ":output, CAST(:outputs AS jsonb), CAST(:params AS jsonb), 3)"
+                ),
+                {
+                    "id": job_id,
+                    "user_id": user_id,
+                    "status": "SUCCEEDED" if done else "RUNNING",
+                    "now": now,
+                    "output": outputs[0]["gcs_uri"] if done else None,
+                    "outputs": json.dumps(outputs if done else []),
+                    "params": json.dumps({"resolution": 1024, "seed": i}),
+                },
+            )
+    return user_id, job_ids
+
+
+def _cleanup(user_id: uuid.UUID):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM jobs WHERE user_id = :u"), {"u": user_id})
+        conn.execute(text("DELETE FROM users WHERE id = :u"), {"u": user_id})
+
+
+def _server_timing(header: str | None) -> dict[str, float]:
+    out = {}
+    for part in (header or "").split(","):
+        name, _, dur = part.strip().partition(";dur=")
+        if dur:
+            out[name] = float(dur)
+    return out
+
+
+def _poll(base_url: str, path: str, token: str, etag: str | None) -> tuple[int, float, int, dict[str, float], str | None]:
+    req = urllib.request.Request(f"{base_url}{path}", headers={"Authorization": f"Bearer {token}"})
+    if etag:
+        req.add_header("If-None-Match", etag)
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=30) as r:
+            body = r.read()
+            status, headers = r.status, r.headers
+    except urllib.error.HTTPError as e:  # urllib raises for 304
+        body, status, headers = e.read(), e.code, e.headers
+    ms = (time.perf_counter() - t0) * 1000.0
+    return status, ms, len(body), _server_timing(headers.get("Server-Timing")), headers.get("ETag") or etag
+
+
+def run(base_url: str, n_requests: int, *, concurrency: int, conditional: bool, n_jobs: int) -> dict:
+    user_id, job_ids = _seed(n_jobs)
+    token = create_access_token(str(user_id))
+    paths = {"get_job": [f"/v1/jobs/{j}" for j in job_ids], "list_jobs": ["/v1/jobs"]}
+    results = {}
+    try:
+        for endpoint, endpoint_paths in paths.items():
+            samples: list[tuple[int, float, int, dict[str, float]]] = []
+            lock = threading.Lock()
+            counter = iter(range(n_requests))
+
+            def worker():
+                etags: dict[str, str | None] = {}
+                while True:
+                    with lock:
+                        i = next(counter, None)
+                    if i is None:
+                        return
+                    path = endpoint_paths[i % len(endpoint_paths)]
+                    status, ms, nbytes, timing, etag = _poll(base_url, path, token, etags.get(path) if conditional else None)
+                    etags[path] = etag
+                    with lock:
+                        samples.append((status, ms, nbytes, timing))
+
+            threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+            t0 = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            wall = time.perf_counter() - t0
+
+            latencies = [s[1] for s in samples]
+            statuses: dict[str, int] = {}
+            for s in samples:
+                statuses[str(s[0])] = statuses.get(str(s[0]), 0) + 1
+            results[endpoint] = {
+                "requests": len(samples),
+                "requests_per_second": len(samples) / wall,
+                "latency_ms": {"p50": _pct(latencies, 0.5), "p99": _pct(latencies, 0.99)},
+                "server_app_ms_mean": statistics.fmean(s[3].get("app", 0.0) for s in samples),
+                "server_db_ms_mean": statistics.fmean(s[3].get("db", 0.0) for s in samples),
+                "bytes_mean": statistics.fmean(s[2] for s in samples),
+                "statuses": statuses,
+            }
+    finally:
+        _cleanup(user_id)
+    return results
+
+
+def _print(r: dict):
+    for endpoint, m in r.items():
+        print(
+            f"{endpoint:<10} req/s={m['requests_per_second']:.0f} p50={m['latency_ms']['p50']:.2f}ms "
+            f"p99={m['latency_ms']['p99']:.2f}ms server app={m['server_app_ms_mean']:.2f}ms "
+            f"db={m['server_db_ms_mean']:.2f}ms bytes={m['bytes_mean']:.0f} statuses={m['statuses']}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8080")
+    parser.add_argument("--requests", type=int, default=5000, help="per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--jobs", type=int, default=20, help="seeded jobs (polled round-robin)")
+    parser.add_argument("--conditional", action="store_true", help="send If-None-Match with the last ETag")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), default=None)
+    args = parser.parse_args()
+
+    if args.compare:
+        before, after = (json.load(open(p)) for p in args.compare)
+        print(f"{'metric':<30} {before['label']:>12} {after['label']:>12}")
+        for endpoint, b in before["results"].items():
+            a = after["results"].get(endpoint)
+            if not a:
+                continue
+            print(f"{endpoint + '.req_per_s':<30} {b['requests_per_second']:>12.0f} {a['requests_per_second']:>12.0f}")
+            print(f"{endpoint + '.p50_ms':<30} {b['latency_ms']['p50']:>12.2f} {a['latency_ms']['p50']:>12.2f}")
+            print(f"{endpoint + '.p99_ms':<30} {b['latency_ms']['p99']:>12.2f} {a['latency_ms']['p99']:>12.2f}")
+            print(f"{endpoint + '.server_app_ms':<30} {b['server_app_ms_mean']:>12.2f} {a['server_app_ms_mean']:>12.2f}")
+            print(f"{endpoint + '.bytes':<30} {b['bytes_mean']:>12.0f} {a['bytes_mean']:>12.0f}")
+        return
+
+    results = run(
+        args.base_url.rstrip("/"), args.requests, concurrency=args.concurrency, conditional=args.conditional, n_jobs=args.jobs
+    )
+    _print(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"label": args.label, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""baseline schema (users, jobs, credit_ledger, webhook_events)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases bootstrapped by the old startup create_all already have this schema; adopt them as-is.
+    if sa.inspect(op.get_bind()).has_table("users"):
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("email", sa.String(320), nullable=False),
+        sa.Column("password_hash", sa.String(512), nullable=False),
+        sa.Column("credits_balance", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column(
+            "status",
+            sa.Enum("QUEUED", "RUNNING", "SUCCEEDED", "FAILED", name="jobstatus"),
+            nullable=False,
+        ),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("input_gcs_uri", sa.String(1024), nullable=False),
+        sa.Column("output_gcs_uri", sa.String(1024), nullable=True),
+        sa.Column("params", postgresql.JSONB(), nullable=False),
+        sa.Column("cost_credits", sa.Integer(), nullable=False),
+        sa.Column("error_text", sa.Text(), nullable=True),
+    )
+    op.create_index("ix_jobs_user_id", "jobs", ["user_id"])
+    op.create_index("ix_jobs_status", "jobs", ["status"])
+
+    op.create_table(
+        "credit_ledger",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("job_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("jobs.id"), nullable=True),
+        sa.Column("delta_credits", sa.Integer(), nullable=False),
+        sa.Column(
+            "reason",
+            sa.Enum(
+                "CREDIT_PURCHASE_STRIPE",
+                "CREDIT_PURCHASE_NOWPAYMENTS",
+                "JOB_CHARGE",
+                "JOB_REFUND",
+                name="ledgerreason",
+            ),
+            nullable=False,
+        ),
+        sa.Column("provider", sa.String(64), nullable=True),
+        sa.Column("external_id", sa.String(256), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index("ix_credit_ledger_user_id", "credit_ledger", ["user_id"])
+    op.create_index("ix_credit_ledger_job_id", "credit_ledger", ["job_id"])
+
+    op.create_table(
+        "webhook_events",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("provider", sa.String(64), nullable=False),
+        sa.Column("event_id", sa.String(256), nullable=False),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("payload", postgresql.JSONB(), nullable=False),
+        sa.UniqueConstraint("provider", "event_id", name="uq_webhook_provider_event"),
+    )
+
+
+def downgrade():
+    op.drop_table("webhook_events")
+    op.drop_table("credit_ledger")
+    op.drop_table("jobs")
+    op.drop_table("users")
+    sa.Enum(name="ledgerreason").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="jobstatus").drop(op.get_bind(), checkfirst=True)
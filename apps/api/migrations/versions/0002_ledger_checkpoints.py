@@ -0,0 +1,51 @@
+"""credit ledger checkpoints + (user_id, created_at) index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("credit_ledger_checkpoints"):
+        op.create_table(
+            "credit_ledger_checkpoints",
+            sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("balance_credits", sa.Integer(), nullable=False),
+            sa.Column("entries_compacted", sa.Integer(), nullable=False),
+            sa.Column("through_created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        )
+
+    partitioned = op.get_bind().execute(
+        sa.text(
+            "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+            "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'credit_ledger')"
+        )
+    ).scalar()
+    if partitioned:
+        # Bootstrapped by create_all after partitioning landed; the index already exists.
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_credit_ledger_user_created "
+            "ON credit_ledger (user_id, created_at) INCLUDE (delta_credits)"
+        )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_credit_ledger_user_created")
+    op.drop_table("credit_ledger_checkpoints")
@@ -0,0 +1,127 @@
+"""partition credit_ledger by month; retention indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Rebuilds credit_ledger as a RANGE (created_at) partitioned table and copies existing rows.
+Takes an ACCESS EXCLUSIVE lock on credit_ledger while copying; run in a maintenance window
+on large databases. Further partitions are created by `python -m app.retention maintain`.
+"""
+
+from __future__ import annotations
+
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+_COLUMNS = "id, user_id, job_id, delta_credits, reason, provider, external_id, created_at"
+_MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, n: int) -> date:
+    idx = d.year * 12 + (d.month - 1) + n
+    return date(idx // 12, idx % 12 + 1, 1)
+
+
+def _is_partitioned(bind) -> bool:
+    return bool(
+        bind.execute(
+            sa.text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'credit_ledger')"
+            )
+        ).scalar()
+    )
+
+
+def upgrade():
+    bind = op.get_bind()
+    converting = not _is_partitioned(bind)
+    oldest = None
+
+    if converting:
+        op.execute("LOCK TABLE credit_ledger IN ACCESS EXCLUSIVE MODE")
+        op.execute("ALTER TABLE credit_ledger RENAME TO credit_ledger_unpartitioned")
+        for idx in bind.execute(
+            sa.text("SELECT indexname FROM pg_indexes WHERE tablename = 'credit_ledger_unpartitioned'")
+        ).scalars().all():
+            op.execute(f'ALTER INDEX "{idx}" RENAME TO "{idx[:48]}_unpartitioned"')
+
+        op.execute(
+            """
+            CREATE TABLE credit_ledger (
+                id uuid NOT NULL,
+                user_id uuid NOT NULL REFERENCES users (id),
+                job_id uuid REFERENCES jobs (id),
+                delta_credits integer NOT NULL,
+                reason ledgerreason NOT NULL,
+                provider varchar(64),
+                external_id varchar(256),
+                created_at timestamptz NOT NULL,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+            """
+        )
+        op.execute("CREATE INDEX ix_credit_ledger_user_id ON credit_ledger (user_id)")
+        op.execute("CREATE INDEX ix_credit_ledger_job_id ON credit_ledger (job_id)")
+        op.execute(
+            "CREATE INDEX ix_credit_ledger_user_created ON credit_ledger (user_id, created_at) INCLUDE (delta_credits)"
+        )
+        oldest = bind.execute(sa.text("SELECT min(created_at) FROM credit_ledger_unpartitioned")).scalar()
+
+    op.execute("CREATE INDEX IF NOT EXISTS ix_credit_ledger_provider_external ON credit_ledger (provider, external_id)")
+    op.execute("CREATE TABLE IF NOT EXISTS credit_ledger_default PARTITION OF credit_ledger DEFAULT")
+
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    month = oldest.astimezone(timezone.utc).date().replace(day=1) if oldest else this_month
+    while month <= _add_months(this_month, _MONTHS_AHEAD):
+        nxt = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS credit_ledger_y{month.year:04d}m{month.month:02d} PARTITION OF credit_ledger "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{nxt.isoformat()} 00:00:00+00')"
+        )
+        month = nxt
+
+    if converting:
+        op.execute(f"INSERT INTO credit_ledger ({_COLUMNS}) SELECT {_COLUMNS} FROM credit_ledger_unpartitioned")
+        op.execute("DROP TABLE credit_ledger_unpartitioned")
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_webhook_events_received_at ON webhook_events (received_at)")
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_webhook_events_received_at")
+    op.execute(
+        """
+        CREATE TABLE credit_ledger_unpartitioned (
+            id uuid PRIMARY KEY,
+            user_id uuid NOT NULL REFERENCES users (id),
+            job_id uuid REFERENCES jobs (id),
+            delta_credits integer NOT NULL,
+            reason ledgerreason NOT NULL,
+            provider varchar(64),
+            external_id varchar(256),
+            created_at timestamptz NOT NULL
+        )
+        """
+    )
+    op.execute(f"INSERT INTO credit_ledger_unpartitioned ({_COLUMNS}) SELECT {_COLUMNS} FROM credit_ledger")
+    op.execute("DROP TABLE credit_ledger")  # drops its partitions and indexes too
+    op.execute("ALTER TABLE credit_ledger_unpartitioned RENAME TO credit_ledger")
+    op.execute("ALTER INDEX credit_ledger_unpartitioned_pkey RENAME TO credit_ledger_pkey")
+    op.execute("CREATE INDEX ix_credit_ledger_user_id ON credit_ledger (user_id)")
+    op.execute("CREATE INDEX ix_credit_ledger_job_id ON credit_ledger (job_id)")
+    op.execute(
+        "CREATE INDEX ix_credit_ledger_user_created ON credit_ledger (user_id, created_at) INCLUDE (delta_credits)"
+    )
+    op.execute("CREATE INDEX ix_credit_ledger_provider_external ON credit_ledger (provider, external_id)")
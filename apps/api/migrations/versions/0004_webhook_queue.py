@@ -0,0 +1,33 @@
+"""webhook queue: attempts/last_error + pending partial index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("webhook_events", sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("webhook_events", sa.Column("last_error", sa.Text(), nullable=True))
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_webhook_events_pending "
+            "ON webhook_events (received_at) WHERE processed_at IS NULL"
+        )
+
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_webhook_events_pending")
+    op.drop_column("webhook_events", "last_error")
+    op.drop_column("webhook_events", "attempts")
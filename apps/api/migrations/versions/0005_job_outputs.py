@@ -0,0 +1,30 @@
+"""jobs.outputs: output variants produced from one inference pass
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Constant default: a catalog-only change on Postgres 11+, no table rewrite.
+    op.add_column(
+        "jobs",
+        sa.Column("outputs", postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+    )
+
+
+def downgrade():
+    op.drop_column("jobs", "outputs")
@@ -0,0 +1,25 @@
+"""jobs.preview_gcs_uri: early point-cloud preview
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("jobs", sa.Column("preview_gcs_uri", sa.String(length=1024), nullable=True))
+
+
+def downgrade():
+    op.drop_column("jobs", "preview_gcs_uri")
@@ -0,0 +1,35 @@
+"""upload_objects: content-addressed upload index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table("upload_objects"):
+        op.create_table(
+            "upload_objects",
+            sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("sha256", sa.String(length=64), primary_key=True),
+            sa.Column("object_name", sa.String(length=1024), nullable=False),
+            sa.Column("size_bytes", sa.BigInteger(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("verified_at", sa.DateTime(timezone=True), nullable=True),
+        )
+
+
+def downgrade():
+    op.drop_table("upload_objects")
@@ -0,0 +1,25 @@
+"""jobs.profile_gcs_uri: deep-profiling artifacts of sampled / flagged jobs
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("jobs", sa.Column("profile_gcs_uri", sa.String(length=1024), nullable=True))
+
+
+def downgrade():
+    op.drop_column("jobs", "profile_gcs_uri")
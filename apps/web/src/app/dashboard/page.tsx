@@ -79,7 +79,7 @@ export default function DashboardPage() {
                   <div>
                     <div className="text-sm text-zinc-100">Job {j.job_id.slice(0, 8)}</div>
                     <div className="mt-1 text-xs text-zinc-400">
-                      {j.status} · res {j.resolution ?? "?"} · cost {j.cost_credits}
+                      {j.status} · res {j.resolution ?? "?"} · {j.quality ?? "standard"} · cost {j.cost_credits}
                     </div>
                   </div>
                   <div className="text-xs text-zinc-500">{new Date(j.updated_at).toLocaleString()}</div>
@@ -72,6 +72,15 @@ export default function JobPage() {
               </div>
             ) : null}
 
+            {job.status === "RUNNING" && job.preview_download_url ? (
+              <div className="pt-3 text-sm">
+                <a className="text-zinc-100 underline hover:text-white" href={job.preview_download_url}>
+                  Preview (point cloud)
+                </a>{" "}
+                <span className="text-zinc-400">— coarse shape; the full model is still being generated.</span>
+              </div>
+            ) : null}
+
             {job.status === "SUCCEEDED" && job.output_download_url ? (
               <div className="pt-3">
                 <a
@@ -80,6 +89,25 @@ export default function JobPage() {
                 >
                   Download GLB
                 </a>
+                {job.outputs.length > 1 ? (
+                  <ul className="mt-3 space-y-1 text-sm">
+                    {job.outputs.slice(1).map((o) =>
+                      o.download_url ? (
+                        <li key={o.name}>
+                          <a className="text-zinc-100 underline hover:text-white" href={o.download_url}>
+                            {o.name}
+                          </a>{" "}
+                          <span className="text-zinc-400">
+                            {o.format}
+                            {o.compression !== "none" ? ` (${o.compression})` : ""}
+                            {o.decimation_target ? ` · ${o.decimation_target.toLocaleString()} faces` : ""}
+                            {o.texture_size ? ` · ${o.texture_size}px` : ""}
+                          </span>
+                        </li>
+                      ) : null
+                    )}
+                  </ul>
+                ) : null}
                 <p className="mt-2 text-xs text-zinc-400">Signed URL expires quickly; refresh if needed.</p>
               </div>
             ) : null}
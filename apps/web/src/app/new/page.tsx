@@ -5,11 +5,17 @@ import { useRouter } from "next/navigation";
 import { apiFetch, API_BASE, type ApiCreateJobResponse, type ApiSignedUploadResponse } from "@/lib/api";
 import { getToken } from "@/lib/auth";
 
+async function sha256Hex(file: File): Promise<string> {
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, "0")).join("");
+}
+
 export default function NewJobPage() {
   const router = useRouter();
   const token = useMemo(() => getToken(), []);
   const [file, setFile] = useState<File | null>(null);
   const [resolution, setResolution] = useState<512 | 1024 | 1536>(1024);
+  const [quality, setQuality] = useState<"draft" | "standard" | "high">("standard");
   const [seed, setSeed] = useState<number>(0);
   const [decimationTarget, setDecimationTarget] = useState<number>(500000);
   const [textureSize, setTextureSize] = useState<number>(2048);
@@ -38,20 +44,23 @@ export default function NewJobPage() {
           : "image/png";
 
     setStatus("Requesting upload URL...");
+    const sha256 = await sha256Hex(file);
     const sign = await apiFetch<ApiSignedUploadResponse>(
       "/v1/uploads/sign",
-      { method: "POST", body: JSON.stringify({ content_type: contentType, file_ext: fileExt }) },
+      { method: "POST", body: JSON.stringify({ content_type: contentType, file_ext: fileExt, sha256 }) },
       token,
     );
 
-    setStatus("Uploading image to storage...");
-    const putRes = await fetch(sign.upload_url, {
-      method: "PUT",
-      headers: { "Content-Type": contentType },
-      body: file,
-    });
-    if (!putRes.ok) {
-      throw new Error(`Upload failed: ${putRes.status} ${putRes.statusText}`);
+    if (sign.upload_url) {
+      setStatus("Uploading image to storage...");
+      const putRes = await fetch(sign.upload_url, {
+        method: "PUT",
+        headers: { "Content-Type": contentType },
+        body: file,
+      });
+      if (!putRes.ok) {
+        throw new Error(`Upload failed: ${putRes.status} ${putRes.statusText}`);
+      }
     }
 
     setStatus("Creating job...");
@@ -62,6 +71,7 @@ export default function NewJobPage() {
         body: JSON.stringify({
           input_gcs_uri: sign.gcs_uri,
           resolution,
+          quality,
           seed,
           decimation_target: decimationTarget,
           texture_size: textureSize,
@@ -107,6 +117,18 @@ export default function NewJobPage() {
               <option value={1536}>1536</option>
             </select>
           </label>
+          <label className="block text-sm">
+            <span className="text-zinc-300">Quality</span>
+            <select
+              className="mt-1 w-full rounded-lg border border-zinc-800 bg-zinc-950 px-3 py-2"
+              value={quality}
+              onChange={(e) => setQuality(e.target.value as "draft" | "standard" | "high")}
+            >
+              <option value="draft">Draft (fastest, cheapest)</option>
+              <option value="standard">Standard</option>
+              <option value="high">High (more sampler steps)</option>
+            </select>
+          </label>
           <label className="block text-sm">
             <span className="text-zinc-300">Seed</span>
             <input
@@ -3,7 +3,8 @@ export type ApiAuthResponse = { access_token: string; token_type: string };
 export type ApiMeResponse = { user_id: string; email: string; credits_balance: number };
 
 export type ApiSignedUploadResponse = {
-  upload_url: string;
+  // null: the same file is already stored (content-hash dedup); skip the PUT and use gcs_uri.
+  upload_url: string | null;
   gcs_uri: string;
   object_name: string;
   expires_in_minutes: number;
@@ -11,6 +12,25 @@ export type ApiSignedUploadResponse = {
 
 export type ApiCreateJobResponse = { job_id: string; status: string; cost_credits: number };
 
+export type ApiOutputVariant = {
+  name: string;
+  format?: "glb" | "obj";
+  compression?: "none" | "draco" | "meshopt";
+  decimation_target?: number;
+  texture_size?: 512 | 1024 | 2048 | 4096;
+};
+
+export type ApiJobOutput = {
+  name: string;
+  format: string;
+  compression: string;
+  decimation_target?: number | null;
+  texture_size?: number | null;
+  bytes?: number | null;
+  gcs_uri: string;
+  download_url?: string | null;
+};
+
 export type ApiJobResponse = {
   job_id: string;
   status: string;
@@ -19,13 +39,16 @@ export type ApiJobResponse = {
   input_gcs_uri: string;
   output_gcs_uri?: string | null;
   output_download_url?: string | null;
+  outputs: ApiJobOutput[];
+  preview_gcs_uri?: string | null;
+  preview_download_url?: string | null;
   error_text?: string | null;
   cost_credits: number;
   params: Record<string, unknown>;
 };
 
 export type ApiListJobsResponse = {
-  jobs: Array<{ job_id: string; status: string; created_at: string; updated_at: string; resolution?: number | null; cost_credits: number }>;
+  jobs: Array<{ job_id: string; status: string; created_at: string; updated_at: string; resolution?: number | null; quality?: string; cost_credits: number }>;
 };
 
 export type ApiStripeCheckoutResponse = { url: string };
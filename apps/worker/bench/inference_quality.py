@@ -0,0 +1,136 @@
+"""
+Quality-vs-speed benchmark: default vs optimized (INFERENCE_OPTIMIZED) TRELLIS inference. GPU required.
+
+Runs the same images/seeds through both modes in one process and compares per-stage time and
+mesh metrics of the exported GLBs (vertex/face counts, surface area, bounding box, and the
+symmetric Chamfer distance between surface samples, relative to the bbox diagonal).
+
+    cd apps/worker
+    python -m bench.inference_quality --images a.png b.png --seeds 0 1 --resolution 1024 --out /tmp/quality.json
+
+The first optimized run of each shape includes compilation; it is reported separately (warmup_s)
+and excluded from the timing comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import statistics
+
+import numpy as np
+import trimesh
+from PIL import Image
+
+from solidgen_worker.backends import TrellisBackend
+from solidgen_worker.config import settings
+from solidgen_worker.stages import StageRecorder
+from solidgen_worker.vram import VramPlan
+
+
+def _load(glb: bytes) -> trimesh.Trimesh:
+    return trimesh.load(io.BytesIO(glb), file_type="glb", force="mesh")
+
+
+def _mesh_metrics(glb: bytes) -> dict:
+    mesh = _load(glb)
+    lo, hi = mesh.bounds
+    return {
+        "vertices": int(len(mesh.vertices)),
+        "faces": int(len(mesh.faces)),
+        "area": float(mesh.area),
+        "bbox_min": lo.tolist(),
+        "bbox_max": hi.tolist(),
+    }
+
+
+def _chamfer(glb_a: bytes, glb_b: bytes, n: int = 20_000) -> float:
+    from scipy.spatial import cKDTree
+
+    a = _load(glb_a)
+    b = _load(glb_b)
+    pa, _ = trimesh.sample.sample_surface(a, n, seed=0)
+    pb, _ = trimesh.sample.sample_surface(b, n, seed=0)
+    d_ab, _ = cKDTree(pb).query(pa)
+    d_ba, _ = cKDTree(pa).query(pb)
+    diag = float(np.linalg.norm(a.bounds[1] - a.bounds[0])) or 1.0
+    return float((d_ab.mean() + d_ba.mean()) / 2.0 / diag)
+
+
+def _run(backend: TrellisBackend, image: Image.Image, seed: int, args) -> tuple[bytes, dict[str, float]]:
+    rec = StageRecorder()
+    out = backend.run(
+        image=image,
+        resolution=args.resolution,
+        seed=seed,
+        decimation_target=args.decimation_target,
+        texture_size=args.texture_size,
+        hooks=rec,
+        plan=VramPlan(fits=True, low_vram=args.low_vram, texture_size=args.texture_size),
+    )
+    return out.glb_bytes, rec.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", nargs="+", required=True)
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--resolution", type=int, default=1024)
+    parser.add_argument("--texture-size", type=int, default=2048)
+    parser.add_argument("--decimation-target", type=int, default=500_000)
+    parser.add_argument("--low-vram", action="store_true")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    backend = TrellisBackend(
+        repo_root=os.environ.get("SOLIDGEN_REPO_ROOT") or os.getcwd(), model_id=settings.trellis_model_id
+    )
+    cases = []
+    warmup_s = None
+    for image_path in args.images:
+        image = Image.open(image_path)
+        for seed in args.seeds:
+            settings.inference_optimized = False
+            base_glb, base_t = _run(backend, image, seed, args)
+            settings.inference_optimized = True
+            if warmup_s is None:
+                _, t = _run(backend, image, seed, args)
+                warmup_s = sum(t.values())
+            opt_glb, opt_t = _run(backend, image, seed, args)
+            opt2_glb, _ = _run(backend, image, seed, args)
+            case = {
+                "image": image_path,
+                "seed": seed,
+                "default": {"seconds": base_t, "mesh": _mesh_metrics(base_glb)},
+                "optimized": {"seconds": opt_t, "mesh": _mesh_metrics(opt_glb)},
+                "chamfer_rel": _chamfer(base_glb, opt_glb),
+                # Same seed twice in optimized mode must give the same mesh.
+                "optimized_deterministic": _mesh_metrics(opt2_glb) == _mesh_metrics(opt_glb),
+            }
+            cases.append(case)
+            print(
+                f"{os.path.basename(image_path)} seed={seed} "
+                f"default={sum(base_t.values()):.1f}s optimized={sum(opt_t.values()):.1f}s "
+                f"faces={case['default']['mesh']['faces']}/{case['optimized']['mesh']['faces']} "
+                f"chamfer_rel={case['chamfer_rel']:.5f} deterministic={case['optimized_deterministic']}"
+            )
+
+    stages = sorted({s for c in cases for s in c["default"]["seconds"]})
+    summary = {}
+    print(f"{'stage':<18} {'default_s':>10} {'optimized_s':>12} {'speedup':>8}")
+    for stage in stages:
+        d = statistics.fmean(c["default"]["seconds"].get(stage, 0.0) for c in cases)
+        o = statistics.fmean(c["optimized"]["seconds"].get(stage, 0.0) for c in cases)
+        summary[stage] = {"default_s": d, "optimized_s": o}
+        print(f"{stage:<18} {d:>10.2f} {o:>12.2f} {d / o if o else 0.0:>7.2f}x")
+    print(f"compile warmup: {warmup_s:.1f}s; max chamfer_rel: {max(c['chamfer_rel'] for c in cases):.5f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"warmup_s": warmup_s, "stages": summary, "cases": cases}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+CPU-only smoke check of the optimized inference wiring (no GPU, TRELLIS weights or o_voxel needed).
+
+Builds a stand-in pipeline with a flow model and a decoder and checks that INFERENCE_OPTIMIZED
+wraps only the flow model, returns fp32, stays deterministic for a fixed seed, and that switching
+back restores the original forward and TF32 flags:
+
+    cd apps/worker
+    python -m bench.optimized_smoke            # autocast + torch.compile (needs a C++ compiler)
+    python -m bench.optimized_smoke --no-compile
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+
+import torch
+
+from solidgen_worker.config import settings
+from solidgen_worker.trellis_runner import _set_inference_mode
+
+
+class _StandInPipeline:
+    def __init__(self):
+        torch.manual_seed(0)
+        self.models = {
+            "sparse_structure_flow_model": torch.nn.Sequential(torch.nn.Linear(64, 256), torch.nn.GELU(), torch.nn.Linear(256, 64)),
+            "sparse_structure_decoder": torch.nn.Linear(64, 8),
+        }
+
+
+def _sample(pipeline: _StandInPipeline, seed: int) -> torch.Tensor:
+    # Same shape as a sampler loop: fp32 state, model predicts a velocity, Euler step.
+    torch.manual_seed(seed)
+    x = torch.randn(4, 64)
+    flow = pipeline.models["sparse_structure_flow_model"]
+    with torch.no_grad():
+        for _ in range(4):
+            x = x - 0.25 * flow(x)
+        return pipeline.models["sparse_structure_decoder"](x)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-compile", action="store_true")
+    args = parser.parse_args()
+    settings.inference_compile = not args.no_compile
+
+    pipeline = _StandInPipeline()
+    flow = pipeline.models["sparse_structure_flow_model"]
+    decoder = pipeline.models["sparse_structure_decoder"]
+    tf32_before = (torch.backends.cuda.matmul.allow_tf32, torch.backends.cudnn.allow_tf32)
+    reference = _sample(pipeline, seed=42)
+
+    failures = []
+
+    def check(ok: bool, what: str):
+        print(f"{'ok  ' if ok else 'FAIL'} {what}")
+        if not ok:
+            failures.append(what)
+
+    _set_inference_mode(pipeline, optimized=True)
+    check("forward" in flow.__dict__, "flow model forward is wrapped")
+    check("forward" not in decoder.__dict__, "decoder is left alone")
+    check(torch.backends.cuda.matmul.allow_tf32, "TF32 enabled")
+
+    a = _sample(pipeline, seed=42)
+    b = _sample(pipeline, seed=42)
+    check(a.dtype == torch.float32, "sampler state stays fp32")
+    check(torch.equal(a, b), "same seed => identical output in optimized mode")
+    check(torch.allclose(a, reference, atol=5e-2, rtol=5e-2), f"close to default mode (max abs diff {(a - reference).abs().max():.4f})")
+
+    _set_inference_mode(pipeline, optimized=True)  # idempotent
+    _set_inference_mode(pipeline, optimized=False)
+    check("forward" not in flow.__dict__, "default mode restores the original forward")
+    check((torch.backends.cuda.matmul.allow_tf32, torch.backends.cudnn.allow_tf32) == tf32_before, "TF32 flags restored")
+    check(torch.equal(_sample(pipeline, seed=42), reference), "default mode output unchanged")
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Simulated Spot preemption with the fake backend: inference seconds lost with and without stage checkpoints.
+
+Same setup as bench.throughput (Postgres with the API schema, local object store, real process_job):
+
+    cd apps/worker
+    python -m bench.preemption --jobs 20 --stage-scale 0.05 --grace 0.1
+
+Each job is preempted once, at a random point of its run (the same points in both modes):
+request_preemption() fires like the SIGTERM handler, the job either finishes inside the grace window
+or checkpoints and is nacked, then the "next worker" (preemption cleared) processes the redelivery.
+An uninterrupted baseline run first gives the cost of a job and warms the stage-time estimates.
+
+Reports, for checkpoints on / off: inference (GPU-lane) seconds per job over both attempts, the
+overhead vs the baseline, and the seconds recovered from checkpoints
+(solidgen_worker_checkpoint_recovered_seconds_total).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+import threading
+import time
+import uuid
+
+from prometheus_client import REGISTRY
+
+from bench.throughput import _cleanup, _seed
+from solidgen_worker.backends import FakeBackend, parse_stage_seconds
+from solidgen_worker.checkpoints import request_preemption, reset_preemption
+from solidgen_worker.config import settings
+from solidgen_worker.main import handle_job_message
+from solidgen_worker.postprocess_pool import shutdown_pool
+from solidgen_worker.stages import StageRecorder
+
+
+GPU_STAGES = ("sparse_structure", "shape_slat", "tex_slat", "decode")
+
+
+def _recovered() -> float:
+    return REGISTRY.get_sample_value("solidgen_worker_checkpoint_recovered_seconds_total") or 0.0
+
+
+def _gpu_seconds(rec: StageRecorder) -> float:
+    return sum(rec.seconds.get(s, 0.0) for s in GPU_STAGES)
+
+
+def _run_jobs(backend: FakeBackend, job_ids: list[uuid.UUID], *, preempt_at: list[float] | None, grace: float) -> dict:
+    gpu, wall = [], []
+    preempted = finished_in_grace = 0
+    recovered_before = _recovered()
+    for i, job_id in enumerate(job_ids):
+        rec = StageRecorder()
+        fired = threading.Event()
+        timer = None
+        if preempt_at is not None:
+
+            def _preempt(fired=fired):
+                fired.set()
+                request_preemption(grace)
+
+            timer = threading.Timer(preempt_at[i], _preempt)
+            timer.start()
+        t0 = time.perf_counter()
+        acked = handle_job_message(job_id, hooks=rec, backend=backend)
+        if timer is not None:
+            timer.cancel()
+        reset_preemption()
+        if not acked:
+            # Redelivered to the next worker.
+            preempted += 1
+            acked = handle_job_message(job_id, hooks=rec, backend=backend)
+        elif fired.is_set():
+            finished_in_grace += 1
+        if not acked:
+            raise RuntimeError(f"job {job_id} was not acked after redelivery")
+        wall.append(time.perf_counter() - t0)
+        gpu.append(_gpu_seconds(rec))
+    return {
+        "jobs": len(job_ids),
+        "preempted": preempted,
+        "finished_in_grace": finished_in_grace,
+        "gpu_seconds_per_job": statistics.fmean(gpu),
+        "wall_seconds_per_job": statistics.fmean(wall),
+        "recovered_seconds": _recovered() - recovered_before,
+    }
+
+
+def run(n_jobs: int, stage_scale: float, *, grace: float, seed: int) -> dict:
+    settings.storage_backend = "local"
+    stage_seconds = {k: v * stage_scale for k, v in parse_stage_seconds(settings.fake_stage_seconds).items()}
+    backend = FakeBackend(stage_seconds=stage_seconds)
+    job_seconds = sum(stage_seconds.values())
+    rng = random.Random(seed)
+    preempt_at = [rng.uniform(0.0, job_seconds) for _ in range(n_jobs)]
+
+    results: dict = {}
+    users = []
+    try:
+        user_id, job_ids = _seed(n_jobs)
+        users.append(user_id)
+        results["baseline"] = _run_jobs(backend, job_ids, preempt_at=None, grace=grace)
+        for label, enabled in (("checkpoints_off", False), ("checkpoints_on", True)):
+            settings.checkpoints_enabled = enabled
+            user_id, job_ids = _seed(n_jobs)
+            users.append(user_id)
+            results[label] = _run_jobs(backend, job_ids, preempt_at=preempt_at, grace=grace)
+    finally:
+        shutdown_pool()
+        for user_id in users:
+            _cleanup(user_id)
+
+    base = results["baseline"]["gpu_seconds_per_job"]
+    for label in ("checkpoints_off", "checkpoints_on"):
+        results[label]["gpu_overhead_per_job"] = results[label]["gpu_seconds_per_job"] - base
+    # GPU time a preempted job no longer pays twice, per job.
+    results["recovered_gpu_seconds_per_job"] = (
+        results["checkpoints_off"]["gpu_seconds_per_job"] - results["checkpoints_on"]["gpu_seconds_per_job"]
+    )
+    return results
+
+
+def _print(r: dict):
+    print(f"{'mode':<16} {'preempted':>9} {'in_grace':>9} {'gpu_s/job':>10} {'overhead_s':>11} {'recovered_s':>12}")
+    for label in ("baseline", "checkpoints_off", "checkpoints_on"):
+        m = r[label]
+        print(
+            f"{label:<16} {m['preempted']:>9} {m['finished_in_grace']:>9} {m['gpu_seconds_per_job']:>10.3f} "
+            f"{m.get('gpu_overhead_per_job', 0.0):>11.3f} {m['recovered_seconds']:>12.3f}"
+        )
+    print(f"recovered GPU seconds per job (off - on): {r['recovered_gpu_seconds_per_job']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=20)
+    parser.add_argument("--stage-scale", type=float, default=0.05, help="multiplier for FAKE_STAGE_SECONDS")
+    parser.add_argument("--grace", type=float, default=0.1, help="preemption grace window (seconds, scaled like the stages)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the preemption points")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    results = run(args.jobs, args.stage_scale, grace=args.grace, seed=args.seed)
+    _print(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
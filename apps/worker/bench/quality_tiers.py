@@ -0,0 +1,111 @@
+"""
+Quality-tier benchmark (params.quality, see solidgen_worker.quality): seconds per job and mesh metrics
+for draft / standard / high on the same images and seeds. GPU required for real numbers.
+
+    cd apps/worker
+    python -m bench.quality_tiers --images a.png b.png --seeds 0 1 --resolution 1024 --out /tmp/tiers.json
+
+Per tier: inference seconds per job (sum of stages, post-processing included) and per sampler stage,
+mesh metrics of the primary GLB (vertex/face counts, area) and the Chamfer distance to the --reference
+tier's mesh for the same image and seed (relative to the bbox diagonal; 0 for the reference itself).
+One untimed warm-up run comes first, so pipeline loading doesn't land on the first tier.
+With INFERENCE_BACKEND=fake it runs on CPU, which checks the wiring and the sampler-time scaling only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+
+from PIL import Image
+
+from bench.inference_quality import _chamfer, _mesh_metrics
+from solidgen_worker.backends import get_backend
+from solidgen_worker.quality import QUALITY_TIERS, SAMPLERS
+from solidgen_worker.stages import StageRecorder
+from solidgen_worker.vram import VramPlan
+
+
+def _run(backend, image: Image.Image, seed: int, quality: str, args) -> tuple[bytes, dict[str, float]]:
+    rec = StageRecorder()
+    out = backend.run(
+        image=image,
+        resolution=args.resolution,
+        seed=seed,
+        decimation_target=args.decimation_target,
+        texture_size=args.texture_size,
+        hooks=rec,
+        plan=VramPlan(fits=True, low_vram=args.low_vram, texture_size=args.texture_size),
+        quality=quality,
+    )
+    return out.glb_bytes, rec.seconds
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", nargs="+", required=True)
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+    parser.add_argument("--tiers", nargs="+", choices=list(QUALITY_TIERS), default=list(QUALITY_TIERS))
+    parser.add_argument("--reference", choices=list(QUALITY_TIERS), default="high")
+    parser.add_argument("--resolution", type=int, default=1024)
+    parser.add_argument("--texture-size", type=int, default=2048)
+    parser.add_argument("--decimation-target", type=int, default=500_000)
+    parser.add_argument("--low-vram", action="store_true")
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    tiers = args.tiers if args.reference in args.tiers else [*args.tiers, args.reference]
+    backend = get_backend()
+    backend.warm_up()
+    cases = []
+    for image_path in args.images:
+        image = Image.open(image_path)
+        if not cases:
+            _run(backend, image, args.seeds[0], "standard", args)
+        for seed in args.seeds:
+            glbs, case = {}, {"image": image_path, "seed": seed, "tiers": {}}
+            for quality in tiers:
+                glbs[quality], seconds = _run(backend, image, seed, quality, args)
+                case["tiers"][quality] = {"seconds": seconds, "mesh": _mesh_metrics(glbs[quality])}
+            for quality in tiers:
+                case["tiers"][quality]["chamfer_rel"] = (
+                    0.0 if quality == args.reference else _chamfer(glbs[args.reference], glbs[quality])
+                )
+            cases.append(case)
+            print(
+                f"{os.path.basename(image_path)} seed={seed} "
+                + " ".join(
+                    f"{q}={sum(t['seconds'].values()):.1f}s/chamfer={t['chamfer_rel']:.5f}" for q, t in case["tiers"].items()
+                )
+            )
+
+    summary = {}
+    print(f"{'tier':<10} {'job_s':>8} {'sampler_s':>10} {'faces':>9} {'chamfer_rel':>12}  (vs {args.reference})")
+    for quality in tiers:
+        runs = [c["tiers"][quality] for c in cases]
+        summary[quality] = {
+            "job_seconds": statistics.fmean(sum(r["seconds"].values()) for r in runs),
+            "stage_seconds": {
+                stage: statistics.fmean(r["seconds"].get(stage, 0.0) for r in runs)
+                for stage in sorted({s for r in runs for s in r["seconds"]})
+            },
+            "faces": statistics.fmean(r["mesh"]["faces"] for r in runs),
+            "chamfer_rel_mean": statistics.fmean(r["chamfer_rel"] for r in runs),
+            "chamfer_rel_max": max(r["chamfer_rel"] for r in runs),
+        }
+        s = summary[quality]
+        sampler_s = sum(s["stage_seconds"].get(stage, 0.0) for stage in SAMPLERS)
+        print(
+            f"{quality:<10} {s['job_seconds']:>8.2f} {sampler_s:>10.2f} {s['faces']:>9.0f} "
+            f"{s['chamfer_rel_mean']:>12.5f}"
+        )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"reference": args.reference, "tiers": summary, "cases": cases}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
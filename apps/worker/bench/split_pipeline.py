@@ -0,0 +1,176 @@
+"""
+Split pipeline benchmark (POSTPROCESS_MODE=remote, see solidgen_worker.postprocess_worker), end to end on one
+box: GPU workers and the post-processing service each drain their own in-process queue, with the fake
+backend and the local object store standing in for TRELLIS, GCS and Pub/Sub. Needs a Postgres with the API
+schema, like bench.throughput:
+
+    cd apps/api && alembic upgrade head
+    cd apps/worker
+    python -m bench.split_pipeline --jobs 50 --stage-scale 0.01 --mode local --label local --out /tmp/local.json
+    python -m bench.split_pipeline --jobs 50 --stage-scale 0.01 --mode remote --post-inflight 4 --label split --out /tmp/split.json
+    python -m bench.split_pipeline --compare /tmp/local.json /tmp/split.json
+
+Reports jobs/hour, end-to-end job latency (publish -> final status) p50/p99 and the seconds each side spends
+per job: GPU worker (process_job wall time, which in local mode includes post-processing, export and upload)
+and post-processing service (task wall time). Checks that every job SUCCEEDED and that no raw mesh is left.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+
+from bench.throughput import _cleanup, _pct, _seed
+from solidgen_worker import handoff
+from solidgen_worker.backends import FakeBackend, parse_stage_seconds
+from solidgen_worker.config import settings
+from solidgen_worker.db import db_conn
+from solidgen_worker.local import LocalQueue, local_path_for_uri
+from solidgen_worker.main import handle_job_message
+from solidgen_worker.postprocess_pool import shutdown_pool
+from solidgen_worker.postprocess_worker import handle_postprocess_message
+
+
+def _statuses(job_ids: list[uuid.UUID]) -> dict[str, int]:
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT status, count(*) FROM jobs WHERE id = ANY(%s::uuid[]) GROUP BY status", ([str(j) for j in job_ids],))
+            return dict(cur.fetchall())
+
+
+def _raw_meshes_left() -> int:
+    root = local_path_for_uri(f"gs://{settings.gcs_bucket}/{settings.postprocess_prefix.strip('/')}/")
+    return sum(len(files) for _, _, files in os.walk(root)) if os.path.isdir(root) else 0
+
+
+def run(n_jobs: int, stage_scale: float, *, mode: str, gpu_inflight: int, post_inflight: int, outputs: list[dict] | None) -> dict:
+    settings.storage_backend = "local"
+    settings.postprocess_mode = mode
+    stage_seconds = {k: v * stage_scale for k, v in parse_stage_seconds(settings.fake_stage_seconds).items()}
+    backend = FakeBackend(stage_seconds=stage_seconds)
+
+    user_id, job_ids = _seed(n_jobs, outputs)
+    published: dict[uuid.UUID, float] = {}
+    latency: list[float] = []
+    gpu_seconds: list[float] = []
+    post_seconds: list[float] = []
+    lock = threading.Lock()
+    done = threading.Semaphore(0)
+
+    def _finished(job_id: uuid.UUID):
+        with lock:
+            latency.append(time.perf_counter() - published[job_id])
+        done.release()
+
+    def gpu_handler(job_id: uuid.UUID) -> bool:
+        t0 = time.perf_counter()
+        acked = handle_job_message(job_id, backend=backend)
+        if acked:
+            with lock:
+                gpu_seconds.append(time.perf_counter() - t0)
+            if mode != "remote":
+                _finished(job_id)
+        return acked
+
+    def post_handler(job_id: uuid.UUID) -> bool:
+        t0 = time.perf_counter()
+        acked = handle_postprocess_message(job_id, backend=backend)
+        if acked:
+            with lock:
+                post_seconds.append(time.perf_counter() - t0)
+            _finished(job_id)
+        return acked
+
+    jobs_q, post_q = LocalQueue(), LocalQueue()
+    handoff.use_local_queue(post_q)
+    jobs_q.start(gpu_handler, workers=gpu_inflight)
+    post_q.start(post_handler, workers=post_inflight)
+    t0 = time.perf_counter()
+    try:
+        for job_id in job_ids:
+            published[job_id] = time.perf_counter()
+            jobs_q.publish(job_id)
+        for _ in job_ids:
+            done.acquire()
+        wall = time.perf_counter() - t0
+        statuses = _statuses(job_ids)
+    finally:
+        jobs_q.stop()
+        post_q.stop()
+        handoff.use_local_queue(None)
+        shutdown_pool()
+        _cleanup(user_id)
+
+    return {
+        "jobs": n_jobs,
+        "mode": mode,
+        "gpu_inflight": gpu_inflight,
+        "post_inflight": post_inflight if mode == "remote" else 0,
+        "postprocess_workers": settings.postprocess_workers,
+        "wall_seconds": wall,
+        "jobs_per_hour": n_jobs / wall * 3600.0,
+        "latency_ms": {"p50": _pct([s * 1000.0 for s in latency], 0.5), "p99": _pct([s * 1000.0 for s in latency], 0.99)},
+        "gpu_worker_seconds_per_job": statistics.fmean(gpu_seconds) if gpu_seconds else 0.0,
+        "postprocess_seconds_per_job": statistics.fmean(post_seconds) if post_seconds else 0.0,
+        "statuses": statuses,
+        "raw_meshes_left": _raw_meshes_left(),
+    }
+
+
+def _print(r: dict):
+    print(f"mode={r['mode']} jobs={r['jobs']} wall={r['wall_seconds']:.2f}s jobs/hour={r['jobs_per_hour']:.0f}")
+    print(f"job latency p50={r['latency_ms']['p50']:.1f}ms p99={r['latency_ms']['p99']:.1f}ms")
+    print(
+        f"seconds per job: gpu worker={r['gpu_worker_seconds_per_job']:.3f} "
+        f"post-processing service={r['postprocess_seconds_per_job']:.3f}"
+    )
+    print(f"statuses={r['statuses']} raw meshes left={r['raw_meshes_left']}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--stage-scale", type=float, default=1.0, help="multiplier for FAKE_STAGE_SECONDS")
+    parser.add_argument("--mode", choices=("local", "remote"), default="remote", help="POSTPROCESS_MODE of the GPU workers")
+    parser.add_argument("--gpu-inflight", type=int, default=settings.max_inflight_jobs, help="GPU worker MAX_INFLIGHT_JOBS")
+    parser.add_argument("--post-inflight", type=int, default=2, help="post-process tasks handled at once (remote)")
+    parser.add_argument("--postprocess-workers", type=int, default=settings.postprocess_workers)
+    parser.add_argument("--outputs", type=json.loads, default=None, help="JSON list of output variants per job")
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), default=None)
+    args = parser.parse_args()
+
+    if args.compare:
+        before, after = (json.load(open(p)) for p in args.compare)
+        b, a = before["results"], after["results"]
+        print(f"{'metric':<28} {before['label']:>12} {after['label']:>12}")
+        print(f"{'jobs_per_hour':<28} {b['jobs_per_hour']:>12.0f} {a['jobs_per_hour']:>12.0f}")
+        print(f"{'latency_p50_ms':<28} {b['latency_ms']['p50']:>12.1f} {a['latency_ms']['p50']:>12.1f}")
+        print(f"{'latency_p99_ms':<28} {b['latency_ms']['p99']:>12.1f} {a['latency_ms']['p99']:>12.1f}")
+        for key in ("gpu_worker_seconds_per_job", "postprocess_seconds_per_job"):
+            print(f"{key:<28} {b[key]:>12.3f} {a[key]:>12.3f}")
+        return
+
+    settings.postprocess_workers = args.postprocess_workers
+    results = run(
+        args.jobs,
+        args.stage_scale,
+        mode=args.mode,
+        gpu_inflight=args.gpu_inflight,
+        post_inflight=args.post_inflight,
+        outputs=args.outputs,
+    )
+    _print(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"label": args.label, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
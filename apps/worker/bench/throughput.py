@@ -0,0 +1,244 @@
+"""
+End-to-end worker throughput benchmark on any Linux box (no GPU, TRELLIS or GCP needed).
+
+Runs the real process_job orchestration (advisory lock, status updates, download, backend, upload)
+against the fake inference backend, local object store and in-process queue. Needs a Postgres with
+the API schema:
+
+    cd apps/api && alembic upgrade head
+    cd apps/worker
+    python -m bench.throughput --jobs 50 --stage-scale 0.01 --label before --out /tmp/before.json
+    python -m bench.throughput --jobs 50 --stage-scale 0.01 --label after --out /tmp/after.json
+    python -m bench.throughput --compare /tmp/before.json /tmp/after.json
+
+Post-processing pool vs inline (MAX_INFLIGHT_JOBS / POSTPROCESS_WORKERS):
+    python -m bench.throughput --inflight 1 --postprocess-workers -1 --label inline --out /tmp/inline.json
+    python -m bench.throughput --inflight 2 --postprocess-workers 2 --label pool --out /tmp/pool.json
+
+Several output variants from one inference pass (params["outputs"], see solidgen_worker.outputs):
+    python -m bench.throughput --outputs '[{"name": "asset"}, {"name": "lod1", "decimation_target": 2000}, {"name": "obj", "format": "obj"}]'
+
+Deep-profiling overhead (solidgen_worker.profiling; artifacts land in the local object store):
+    python -m bench.throughput --profile-rate 0 --label off --out /tmp/off.json
+    python -m bench.throughput --profile-rate 1 --label on --out /tmp/on.json
+
+Reports jobs/hour, queue latency (publish -> handler start) p50/p99, per-stage wall time and the
+worker's own overhead (job wall time minus time spent inside stages) and local scratch bytes written per job.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import os
+import statistics
+import threading
+import time
+import uuid
+
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from solidgen_worker.backends import FakeBackend, parse_stage_seconds
+from solidgen_worker.config import settings
+from solidgen_worker.quality import QUALITY_TIERS
+from solidgen_worker.db import db_conn
+from solidgen_worker.local import LocalQueue, local_path_for_uri
+from solidgen_worker.main import handle_job_message
+from solidgen_worker.postprocess_pool import shutdown_pool
+from solidgen_worker.stages import StageRecorder
+
+
+def _pct(samples: list[float], q: float) -> float:
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(len(s) * q))] if s else 0.0
+
+
+def _seed(
+    n_jobs: int, outputs: list[dict] | None = None, quality: str | None = None
+) -> tuple[uuid.UUID, list[uuid.UUID]]:
+    user_id = uuid.uuid4()
+    input_uri = f"gs://{settings.gcs_bucket}/bench/{user_id}/input.png"
+    path = local_path_for_uri(input_uri)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    buf = io.BytesIO()
+    Image.new("RGBA", (512, 512), (200, 120, 40, 255)).save(buf, format="PNG")
+    with open(path, "wb") as f:
+        f.write(buf.getvalue())
+
+    job_ids = [uuid.uuid4() for _ in range(n_jobs)]
+    params = {"decimation_target": settings.fake_glb_faces}
+    if outputs:
+        params["outputs"] = outputs
+    if quality:
+        params["quality"] = quality
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO users (id, email, password_hash, credits_balance, created_at) VALUES (%s, %s, '-', 0, now())",
+                (str(user_id), f"bench-{user_id}@example.invalid"),
+            )
+            for job_id in job_ids:
+                cur.execute(
+                    "INSERT INTO jobs (id, user_id, status, created_at, updated_at, input_gcs_uri, params, cost_credits) "
+                    "VALUES (%s, %s, 'QUEUED', now(), now(), %s, %s, 0)",
+                    (str(job_id), str(user_id), input_uri, json.dumps(params)),
+                )
+        conn.commit()
+    return user_id, job_ids
+
+
+def _preview_samples() -> tuple[float, float, float]:
+    """(sum of time-to-preview seconds, sum of preview fractions, preview count) so far."""
+    get = REGISTRY.get_sample_value
+    return (
+        get("solidgen_worker_time_to_preview_seconds_sum") or 0.0,
+        get("solidgen_worker_preview_fraction_sum") or 0.0,
+        get("solidgen_worker_preview_fraction_count") or 0.0,
+    )
+
+
+def _preprocess_cache_samples() -> tuple[float, float]:
+    """(hits, misses) so far."""
+    get = REGISTRY.get_sample_value
+    return (
+        get("solidgen_worker_preprocess_cache_total", {"result": "hit"}) or 0.0,
+        get("solidgen_worker_preprocess_cache_total", {"result": "miss"}) or 0.0,
+    )
+
+
+def _cleanup(user_id: uuid.UUID):
+    with db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM credit_ledger WHERE user_id = %s", (str(user_id),))
+            cur.execute("DELETE FROM jobs WHERE user_id = %s", (str(user_id),))
+            cur.execute("DELETE FROM users WHERE id = %s", (str(user_id),))
+        conn.commit()
+
+
+def run(
+    n_jobs: int, stage_scale: float, *, inflight: int = 1, outputs: list[dict] | None = None, quality: str | None = None
+) -> dict:
+    settings.storage_backend = "local"
+    stage_seconds = {k: v * stage_scale for k, v in parse_stage_seconds(settings.fake_stage_seconds).items()}
+    backend = FakeBackend(stage_seconds=stage_seconds)
+
+    user_id, job_ids = _seed(n_jobs, outputs, quality)
+    finished: list[tuple[float, StageRecorder]] = []  # (job wall seconds, stage times)
+    done = threading.Semaphore(0)
+
+    def handler(job_id: uuid.UUID) -> bool:
+        rec = StageRecorder()
+        t0 = time.perf_counter()
+        acked = handle_job_message(job_id, hooks=rec, backend=backend)
+        if acked:
+            finished.append((time.perf_counter() - t0, rec))
+            done.release()
+        return acked
+
+    scratch_before = REGISTRY.get_sample_value("solidgen_worker_job_scratch_bytes_written_sum") or 0.0
+    preview_before = _preview_samples()
+    cache_before = _preprocess_cache_samples()
+    q = LocalQueue()
+    q.start(handler, workers=inflight)
+    t0 = time.perf_counter()
+    try:
+        for job_id in job_ids:
+            q.publish(job_id)
+        for _ in job_ids:
+            done.acquire()
+        wall = time.perf_counter() - t0
+    finally:
+        q.stop()
+        shutdown_pool()
+        _cleanup(user_id)
+
+    scratch_bytes = (REGISTRY.get_sample_value("solidgen_worker_job_scratch_bytes_written_sum") or 0.0) - scratch_before
+    preview_after = _preview_samples()
+    hits, misses = (a - b for a, b in zip(_preprocess_cache_samples(), cache_before))
+    previews = preview_after[2] - preview_before[2]
+    job_seconds = [js for js, _ in finished]
+    recorders = [r for _, r in finished]
+    stages: dict[str, dict[str, float]] = {}
+    for stage in sorted({s for r in recorders for s in r.seconds}):
+        vals = [r.seconds.get(stage, 0.0) * 1000.0 for r in recorders]
+        stages[stage] = {"mean_ms": statistics.fmean(vals), "p99_ms": _pct(vals, 0.99)}
+    # With --inflight > 1 this includes time spent waiting for the GPU lane.
+    overhead_ms = [(js - sum(r.seconds.values())) * 1000.0 for js, r in finished]
+    queue_ms = [s * 1000.0 for s in q.queue_wait_seconds]
+    return {
+        "jobs": n_jobs,
+        "inflight": inflight,
+        "postprocess_workers": settings.postprocess_workers,
+        "outputs_per_job": len(outputs or [None]),
+        "quality": quality or "standard",
+        "wall_seconds": wall,
+        "jobs_per_hour": n_jobs / wall * 3600.0,
+        "queue_latency_ms": {"p50": _pct(queue_ms, 0.5), "p99": _pct(queue_ms, 0.99)},
+        "job_ms": {"p50": _pct([s * 1000.0 for s in job_seconds], 0.5), "p99": _pct([s * 1000.0 for s in job_seconds], 0.99)},
+        "worker_overhead_ms": {"mean": statistics.fmean(overhead_ms), "p99": _pct(overhead_ms, 0.99)},
+        "scratch_bytes_per_job": scratch_bytes / max(1, len(finished)),
+        # Time to first visual (job start -> preview recorded), mean over published previews.
+        "time_to_preview_ms": (preview_after[0] - preview_before[0]) / max(1, previews) * 1000.0,
+        "preview_fraction": (preview_after[1] - preview_before[1]) / max(1, previews),
+        "previews": previews,
+        # All bench jobs share one input image: every job after the first should hit.
+        "preprocess_cache_hit_rate": hits / max(1.0, hits + misses),
+        "stages": stages,
+    }
+
+
+def _print(r: dict):
+    print(f"jobs={r['jobs']} wall={r['wall_seconds']:.2f}s jobs/hour={r['jobs_per_hour']:.0f}")
+    print(f"queue latency p50={r['queue_latency_ms']['p50']:.1f}ms p99={r['queue_latency_ms']['p99']:.1f}ms")
+    print(f"job wall p50={r['job_ms']['p50']:.1f}ms p99={r['job_ms']['p99']:.1f}ms")
+    print(f"worker overhead mean={r['worker_overhead_ms']['mean']:.2f}ms p99={r['worker_overhead_ms']['p99']:.2f}ms")
+    print(f"scratch bytes written per job={r.get('scratch_bytes_per_job', 0):.0f}")
+    print(f"preprocess cache hit rate={r.get('preprocess_cache_hit_rate', 0):.0%}")
+    if r.get("previews"):
+        print(f"time to preview mean={r['time_to_preview_ms']:.1f}ms ({r['preview_fraction']:.0%} of job wall time)")
+    print(f"{'stage':<18} {'mean_ms':>9} {'p99_ms':>9}")
+    for name, s in r["stages"].items():
+        print(f"{name:<18} {s['mean_ms']:>9.2f} {s['p99_ms']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=50)
+    parser.add_argument("--stage-scale", type=float, default=1.0, help="multiplier for FAKE_STAGE_SECONDS")
+    parser.add_argument("--inflight", type=int, default=settings.max_inflight_jobs)
+    parser.add_argument("--postprocess-workers", type=int, default=settings.postprocess_workers)
+    parser.add_argument("--outputs", type=json.loads, default=None, help="JSON list of output variants per job")
+    parser.add_argument("--quality", choices=list(QUALITY_TIERS), default=None, help="params.quality of every job")
+    parser.add_argument(
+        "--profile-rate", type=float, default=settings.profile_sample_rate, help="PROFILE_SAMPLE_RATE (profiling overhead)"
+    )
+    parser.add_argument("--label", default="run")
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), default=None)
+    args = parser.parse_args()
+
+    if args.compare:
+        before, after = (json.load(open(p)) for p in args.compare)
+        b, a = before["results"], after["results"]
+        print(f"{'metric':<26} {before['label']:>12} {after['label']:>12}")
+        print(f"{'jobs_per_hour':<26} {b['jobs_per_hour']:>12.0f} {a['jobs_per_hour']:>12.0f}")
+        print(f"{'queue_p99_ms':<26} {b['queue_latency_ms']['p99']:>12.1f} {a['queue_latency_ms']['p99']:>12.1f}")
+        print(f"{'overhead_mean_ms':<26} {b['worker_overhead_ms']['mean']:>12.2f} {a['worker_overhead_ms']['mean']:>12.2f}")
+        for name, s in b["stages"].items():
+            if name in a["stages"]:
+                print(f"{'stage.' + name:<26} {s['mean_ms']:>12.2f} {a['stages'][name]['mean_ms']:>12.2f}")
+        return
+
+    settings.postprocess_workers = args.postprocess_workers
+    settings.profile_sample_rate = args.profile_rate
+    results = run(args.jobs, args.stage_scale, inflight=args.inflight, outputs=args.outputs, quality=args.quality)
+    _print(results)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"label": args.label, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
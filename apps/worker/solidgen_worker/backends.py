@@ -0,0 +1,493 @@
+from __future__ import annotations
+
+import contextlib
+import functools
+import json
+import os
+import random
+import struct
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Protocol
+
+from solidgen_worker.checkpoints import CHECKPOINT_STAGES, JobCheckpoints
+from solidgen_worker.config import settings
+from solidgen_worker.outputs import PRIMARY_NAME, OutputFile, OutputVariant, cap_texture_size, encode_group, group_variants, in_variant_order
+from solidgen_worker.quality import DEFAULT_QUALITY, QUALITY_TIERS, SAMPLERS
+from solidgen_worker.rawmesh import decode_raw_mesh, encode_raw_mesh, raw_array
+from solidgen_worker.stages import INFERENCE_STAGES, NO_HOOKS, StageHooks, timed_stage
+from solidgen_worker.vram import VramPlan, get_planner
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+
+@dataclass(frozen=True)
+class TrellisResult:
+    outputs: list[OutputFile] = field(repr=False)  # one per requested variant, in request order; in memory
+    scratch_bytes_written: int = 0  # bytes written to local scratch on the way (0 when streamed)
+    gpu_peak_bytes: int | None = None  # torch.cuda.max_memory_allocated() over the GPU-lane part of the run
+    raw_mesh: bytes | None = field(default=None, repr=False)  # run(handoff=True): solidgen_worker.rawmesh, no outputs
+
+    @property
+    def glb_bytes(self) -> bytes:
+        """The primary (first) output."""
+        return self.outputs[0].data
+
+
+def default_variants(variants: list[OutputVariant] | None, *, decimation_target: int, texture_size: int) -> list[OutputVariant]:
+    return variants or [OutputVariant(PRIMARY_NAME, decimation_target=decimation_target, texture_size=texture_size)]
+
+
+# Serializes the GPU lane (inference) when several jobs are in flight (MAX_INFLIGHT_JOBS > 1);
+# post-processing in the pool overlaps with the next job's inference.
+gpu_lock = threading.Lock()
+
+
+class InferenceBackend(Protocol):
+    """
+    Turns an input image into one mesh and encodes it into each output variant (in memory).
+    Without `variants`, produces a single GLB at decimation_target / texture_size.
+    Reports stage boundaries through `hooks`.
+
+    preprocess() (background removal + crop) is separate so it can run, and be cached, outside the GPU
+    lane; run(..., preprocessed=True) then skips it.
+
+    With `checkpoints`, run() resumes from the job's stage checkpoints and saves new ones as stages finish;
+    checkpoint_key() is what makes a checkpoint reusable (same model, resolution, seed, quality, inference mode).
+
+    `quality` is a tier of solidgen_worker.quality (sampler steps / guidance).
+
+    Split pipeline (POSTPROCESS_MODE=remote): run(..., handoff=True) stops after decoding and returns the
+    mesh as TrellisResult.raw_mesh; postprocess_raw_mesh() turns that into the output variants, on another
+    worker (solidgen_worker.postprocess_worker). The two halves give the same outputs as one run().
+    """
+
+    name: str
+
+    def plan(self, *, resolution: int, texture_size: int) -> VramPlan: ...
+
+    def warm_up(self) -> dict[str, float]: ...
+
+    def preprocess_key(self) -> str: ...
+
+    def preprocess(self, image: Image.Image) -> Image.Image: ...
+
+    def checkpoint_key(self, *, resolution: int, seed: int, quality: str = DEFAULT_QUALITY) -> str: ...
+
+    def run(
+        self,
+        *,
+        image: Image.Image,
+        resolution: int,
+        seed: int,
+        decimation_target: int,
+        texture_size: int,
+        hooks: StageHooks = NO_HOOKS,
+        plan: VramPlan | None = None,
+        variants: list[OutputVariant] | None = None,
+        preprocessed: bool = False,
+        checkpoints: JobCheckpoints | None = None,
+        quality: str = DEFAULT_QUALITY,
+        handoff: bool = False,
+    ) -> TrellisResult: ...
+
+    def postprocess_raw_mesh(
+        self, data: bytes, *, variants: list[OutputVariant], hooks: StageHooks = NO_HOOKS
+    ) -> TrellisResult: ...
+
+
+class TrellisBackend:
+    name = "trellis"
+
+    def __init__(self, *, repo_root: str, model_id: str):
+        self.repo_root = repo_root
+        self.model_id = model_id
+
+    def plan(self, *, resolution: int, texture_size: int) -> VramPlan:
+        return get_planner().plan(resolution=resolution, texture_size=texture_size)
+
+    def warm_up(self) -> dict[str, float]:
+        """Boot: make the weight store complete (offline afterwards), then load the pipeline. Returns phase seconds."""
+        from solidgen_worker.weights import prefetch_weights
+
+        report = prefetch_weights()
+        phases = {"weights_verify": report.verify_seconds, "weights_download": report.download_seconds}
+        if settings.preload_pipeline:
+            from solidgen_worker.trellis_runner import load_pipeline
+
+            t0 = time.perf_counter()
+            load_pipeline(repo_root=self.repo_root, model_id=self.model_id)
+            phases["pipeline_load"] = time.perf_counter() - t0
+        return phases
+
+    def preprocess_key(self) -> str:
+        from solidgen_worker.trellis_runner import preprocess_key
+
+        return preprocess_key(repo_root=self.repo_root, model_id=self.model_id)
+
+    def preprocess(self, image):
+        from solidgen_worker.trellis_runner import preprocess_trellis_image
+
+        return preprocess_trellis_image(repo_root=self.repo_root, model_id=self.model_id, image=image)
+
+    def checkpoint_key(self, *, resolution: int, seed: int, quality: str = DEFAULT_QUALITY) -> str:
+        mode = f"optimized:{settings.inference_autocast_dtype}" if settings.inference_optimized else "default"
+        return f"trellis|{self.model_id}|{resolution}|{quality}|{seed}|{mode}"
+
+    def run(
+        self,
+        *,
+        image,
+        resolution,
+        seed,
+        decimation_target,
+        texture_size,
+        hooks=NO_HOOKS,
+        plan=None,
+        variants=None,
+        preprocessed=False,
+        checkpoints=None,
+        quality=DEFAULT_QUALITY,
+        handoff=False,
+    ) -> TrellisResult:
+        # Imported here so the fake backend works without torch / TRELLIS installed.
+        import torch
+
+        from solidgen_worker.trellis_runner import run_trellis_to_glb
+
+        plan = plan or self.plan(resolution=resolution, texture_size=texture_size)
+        variants = cap_texture_size(
+            default_variants(variants, decimation_target=decimation_target, texture_size=texture_size), plan.texture_size
+        )
+        planner = get_planner()
+        try:
+            out = run_trellis_to_glb(
+                repo_root=self.repo_root,
+                image=image,
+                model_id=self.model_id,
+                resolution=resolution,
+                seed=seed,
+                variants=variants,
+                hooks=hooks,
+                low_vram=plan.low_vram,
+                optimized=settings.inference_optimized,
+                preprocess_image=not preprocessed,
+                checkpoints=checkpoints,
+                quality=quality,
+                handoff=handoff,
+            )
+        except torch.cuda.OutOfMemoryError:
+            planner.record_oom(
+                resolution=resolution, texture_size=plan.texture_size, low_vram=plan.low_vram, budget_bytes=plan.budget_bytes
+            )
+            torch.cuda.empty_cache()
+            raise
+        planner.record_peak(
+            resolution=resolution, texture_size=plan.texture_size, low_vram=plan.low_vram, peak_bytes=out.gpu_peak_bytes
+        )
+        return out
+
+    def postprocess_raw_mesh(self, data, *, variants, hooks=NO_HOOKS) -> TrellisResult:
+        from solidgen_worker.trellis_runner import postprocess_raw_mesh
+
+        return postprocess_raw_mesh(repo_root=self.repo_root, data=data, variants=variants, hooks=hooks)
+
+
+def parse_stage_seconds(spec: str) -> dict[str, float]:
+    """"sparse_structure=1,shape_slat=3" -> {"sparse_structure": 1.0, "shape_slat": 3.0}"""
+    out: dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        stage, _, seconds = part.partition("=")
+        stage = stage.strip()
+        if stage not in INFERENCE_STAGES:
+            raise ValueError(f"Unknown stage {stage!r} in fake_stage_seconds")
+        out[stage] = float(seconds)
+    return out
+
+
+def synthetic_mesh(*, faces: int, seed: int) -> tuple[array, array]:
+    """A height-jittered grid with ~`faces` triangles: (float32 xyz positions, uint32 indices). Deterministic."""
+    n = max(1, int((max(faces, 2) / 2) ** 0.5))
+    rng = random.Random(seed)
+    positions = array("f")
+    for i in range(n + 1):
+        for j in range(n + 1):
+            positions.extend((i / n - 0.5, rng.uniform(-0.05, 0.05), j / n - 0.5))
+    indices = array("I")
+    for i in range(n):
+        for j in range(n):
+            a = i * (n + 1) + j
+            b = a + n + 1
+            indices.extend((a, b, a + 1, a + 1, b, b + 1))
+    return positions, indices
+
+
+def glb_bytes(positions: array, indices: array | None = None) -> bytes:
+    """Minimal valid glTF 2.0 binary with POSITION + indices (triangles), or POSITION only (points)."""
+    pos_bytes = positions.tobytes()
+    idx_bytes = indices.tobytes() if indices is not None else b""
+    primitive: dict = {"attributes": {"POSITION": 0}}
+    buffer_views = [{"buffer": 0, "byteOffset": 0, "byteLength": len(pos_bytes), "target": 34962}]
+    accessors = [
+        {
+            "bufferView": 0,
+            "componentType": 5126,
+            "count": len(positions) // 3,
+            "type": "VEC3",
+            "min": [min(positions[k::3], default=0.0) for k in range(3)],
+            "max": [max(positions[k::3], default=0.0) for k in range(3)],
+        }
+    ]
+    if indices is None:
+        primitive["mode"] = 0  # POINTS
+    else:
+        primitive["indices"] = 1
+        buffer_views.append({"buffer": 0, "byteOffset": len(pos_bytes), "byteLength": len(idx_bytes), "target": 34963})
+        accessors.append({"bufferView": 1, "componentType": 5125, "count": len(indices), "type": "SCALAR"})
+    gltf = {
+        "asset": {"version": "2.0", "generator": "solidgen-worker"},
+        "scene": 0,
+        "scenes": [{"nodes": [0]}],
+        "nodes": [{"mesh": 0}],
+        "meshes": [{"primitives": [primitive]}],
+        "buffers": [{"byteLength": len(pos_bytes) + len(idx_bytes)}],
+        "bufferViews": buffer_views,
+        "accessors": accessors,
+    }
+    json_chunk = json.dumps(gltf, separators=(",", ":")).encode("utf-8")
+    json_chunk += b" " * (-len(json_chunk) % 4)
+    bin_chunk = pos_bytes + idx_bytes
+    bin_chunk += b"\0" * (-len(bin_chunk) % 4)
+    total = 12 + 8 + len(json_chunk) + 8 + len(bin_chunk)
+    return b"".join(
+        [
+            struct.pack("<4sII", b"glTF", 2, total),
+            struct.pack("<I4s", len(json_chunk), b"JSON"),
+            json_chunk,
+            struct.pack("<I4s", len(bin_chunk), b"BIN\0"),
+            bin_chunk,
+        ]
+    )
+
+
+def synthetic_glb(*, faces: int, seed: int) -> bytes:
+    return glb_bytes(*synthetic_mesh(faces=faces, seed=seed))
+
+
+def _fake_sparse_structure(seconds: float, *, seed: int, grid: int = 32) -> list[tuple[int, int, int, int]]:
+    """Sleeps, then returns sparse-structure-like coords: (batch, x, y, z) rows of a jittered ball in a grid^3 volume."""
+    time.sleep(seconds)
+    rng = random.Random(seed)
+    c = (grid - 1) / 2.0
+    r2 = (grid * rng.uniform(0.3, 0.45)) ** 2
+    return [
+        (0, x, y, z)
+        for x in range(grid)
+        for y in range(grid)
+        for z in range(grid)
+        if r2 * 0.8 <= (x - c) ** 2 + (y - c) ** 2 + (z - c) ** 2 <= r2
+    ]
+
+
+def _fake_stage(stage: str, fn, *args, restored: dict, checkpoints: JobCheckpoints | None):
+    """Run a fake stage, or return its checkpointed output; saves a checkpoint for checkpointable stages."""
+    if stage in restored:
+        return restored[stage]
+    t0 = time.perf_counter()
+    out = fn(*args)
+    if checkpoints is not None and (stage in CHECKPOINT_STAGES or stage == "decode"):
+        # JSON, like everything the worker reads back from the shared bucket: no pickle.
+        checkpoints.save("mesh" if stage == "decode" else stage, json.dumps(out).encode("utf-8"), time.perf_counter() - t0)
+    return out
+
+
+def obj_text(positions: array, indices: array) -> bytes:
+    lines = [f"v {positions[i]:.6f} {positions[i + 1]:.6f} {positions[i + 2]:.6f}" for i in range(0, len(positions), 3)]
+    lines += [f"f {indices[i] + 1} {indices[i + 1] + 1} {indices[i + 2] + 1}" for i in range(0, len(indices), 3)]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _fake_postprocess(
+    positions: array, indices: array, *, variants: list[OutputVariant], stage_seconds: dict[str, float], hooks: StageHooks
+) -> tuple[list[OutputFile], int]:
+    """One variant group: the synthetic mesh is generated up front, so "postprocess" only sleeps."""
+    timed_stage(hooks, "postprocess", time.sleep, stage_seconds.get("postprocess", 0.0))
+
+    def _export() -> tuple[list[OutputFile], int]:
+        time.sleep(stage_seconds.get("export", 0.0))
+        return encode_group(
+            variants,
+            glb=glb_bytes(positions, indices),
+            export_obj=lambda: {"model.obj": obj_text(positions, indices)},
+        )
+
+    return timed_stage(hooks, "export", _export)
+
+
+def _fake_postprocess_task(
+    specs, *, variants: list[OutputVariant], stage_seconds: dict[str, float]
+) -> tuple[dict[str, float], list[OutputFile], int]:
+    """Pool child for the fake backend: same shared-memory handoff as the TRELLIS path."""
+    from solidgen_worker.postprocess_pool import attached
+    from solidgen_worker.stages import StageRecorder
+
+    positions, indices = array("f"), array("I")
+    with attached(specs) as bufs:
+        positions.frombytes(bufs["positions"])
+        indices.frombytes(bufs["indices"])
+    recorder = StageRecorder()
+    files, scratch_bytes = _fake_postprocess(positions, indices, variants=variants, stage_seconds=stage_seconds, hooks=recorder)
+    return recorder.seconds, files, scratch_bytes
+
+
+class FakeBackend:
+    """
+    CPU-only stand-in for TRELLIS: sleeps a configurable time per stage and encodes a synthetic mesh
+    (one per variant group, ~min(decimation_target, glb_faces) faces).
+    Lets process_job / queue orchestration be benchmarked on any Linux box.
+    """
+
+    name = "fake"
+
+    def __init__(self, *, stage_seconds: dict[str, float] | None = None, glb_faces: int | None = None):
+        self.stage_seconds = parse_stage_seconds(settings.fake_stage_seconds) if stage_seconds is None else stage_seconds
+        self.glb_faces = settings.fake_glb_faces if glb_faces is None else glb_faces
+
+    def plan(self, *, resolution: int, texture_size: int) -> VramPlan:
+        return VramPlan(fits=True, low_vram=False, texture_size=texture_size)
+
+    def warm_up(self) -> dict[str, float]:
+        return {}
+
+    def preprocess_key(self) -> str:
+        return "fake"
+
+    def preprocess(self, image):
+        time.sleep(self.stage_seconds.get("preprocess", 0.0))
+        return image.convert("RGBA")
+
+    def checkpoint_key(self, *, resolution: int, seed: int, quality: str = DEFAULT_QUALITY) -> str:
+        return f"fake|{resolution}|{quality}|{seed}"
+
+    def run(
+        self,
+        *,
+        image,
+        resolution,
+        seed,
+        decimation_target,
+        texture_size,
+        hooks=NO_HOOKS,
+        plan=None,
+        variants=None,
+        preprocessed=False,
+        checkpoints=None,
+        quality=DEFAULT_QUALITY,
+        handoff=False,
+    ) -> TrellisResult:
+        from solidgen_worker.postprocess_pool import get_pool
+
+        variants = default_variants(variants, decimation_target=decimation_target, texture_size=texture_size)
+        pool = None if handoff else get_pool()
+        restored = checkpoints.restore(lambda _stage, data: json.loads(data)) if checkpoints is not None else {}
+        with gpu_lock:
+            # The synthetic mesh is rebuilt from the seed, so a "mesh" checkpoint just skips the stages before it.
+            stages = () if "mesh" in restored else INFERENCE_STAGES[: INFERENCE_STAGES.index("postprocess")]
+            for stage in stages:
+                if stage == "preprocess" and preprocessed:
+                    continue
+                seconds = self.stage_seconds.get(stage, 0.0)
+                if stage in SAMPLERS:
+                    seconds *= QUALITY_TIERS[quality].steps_scale  # sampler time ~ step count
+                if stage == "sparse_structure":
+                    fn, args = functools.partial(_fake_sparse_structure, seed=seed), (seconds,)
+                else:
+                    fn, args = time.sleep, (seconds,)
+                timed_stage(hooks, stage, _fake_stage, stage, fn, *args, restored=restored, checkpoints=checkpoints)
+            if handoff:
+                # The full-size synthetic mesh; the post-processing side derives each group's LOD from it.
+                positions, indices = synthetic_mesh(faces=self.glb_faces, seed=seed)
+                raw = encode_raw_mesh(
+                    {
+                        "positions": raw_array(positions, dtype="<f4", shape=(len(positions) // 3, 3)),
+                        "indices": raw_array(indices, dtype="<u4", shape=(len(indices) // 3, 3)),
+                    },
+                    {"backend": self.name, "seed": seed, "faces": self.glb_faces},
+                )
+                return TrellisResult(outputs=[], raw_mesh=raw)
+            meshes = [
+                synthetic_mesh(faces=min(group[0].decimation_target, self.glb_faces), seed=seed)
+                for group in group_variants(variants)
+            ]
+            if pool is None:
+                return self._postprocess(meshes, variants=variants, hooks=hooks, pool=None)
+        return self._postprocess(meshes, variants=variants, hooks=hooks, pool=pool)
+
+    def postprocess_raw_mesh(self, data, *, variants, hooks=NO_HOOKS) -> TrellisResult:
+        from solidgen_worker.postprocess_pool import get_pool
+
+        meta, arrays = decode_raw_mesh(data)
+        positions, indices = array("f"), array("I")
+        positions.frombytes(arrays["positions"].data)
+        indices.frombytes(arrays["indices"].data)
+        # Synthetic "decimation": smaller LODs are regenerated from the seed, as run() does.
+        meshes = [
+            (positions, indices)
+            if group[0].decimation_target >= meta["faces"]
+            else synthetic_mesh(faces=group[0].decimation_target, seed=meta["seed"])
+            for group in group_variants(variants)
+        ]
+        return self._postprocess(meshes, variants=variants, hooks=hooks, pool=get_pool())
+
+    def _postprocess(
+        self, meshes: list[tuple[array, array]], *, variants: list[OutputVariant], hooks: StageHooks, pool
+    ) -> TrellisResult:
+        """Post-process + export each variant group's mesh (one per group), inline or in the pool."""
+        from solidgen_worker.postprocess_pool import SharedArrays
+
+        if pool is None:
+            files, scratch_bytes = [], 0
+            for group, (positions, indices) in zip(group_variants(variants), meshes):
+                group_files, written = _fake_postprocess(
+                    positions, indices, variants=group, stage_seconds=self.stage_seconds, hooks=hooks
+                )
+                files += group_files
+                scratch_bytes += written
+            return TrellisResult(outputs=in_variant_order(files, variants), scratch_bytes_written=scratch_bytes)
+
+        # One pool task per group, in parallel (the TRELLIS path shares one mesh; here each group has its own LOD).
+        with contextlib.ExitStack() as stack:
+            futures = []
+            for stage in ("postprocess", "export"):
+                hooks.stage_started(stage)  # may raise JobPreempted: before anything is submitted
+            for group, (positions, indices) in zip(group_variants(variants), meshes):
+                arrays = stack.enter_context(SharedArrays())
+                arrays.add_buffer("positions", positions, dtype="<f4", shape=(len(positions) // 3, 3))
+                arrays.add_buffer("indices", indices, dtype="<u4", shape=(len(indices) // 3, 3))
+                futures.append(pool.submit(_fake_postprocess_task, arrays.specs, variants=group, stage_seconds=self.stage_seconds))
+            results = [f.result() for f in futures]
+        seconds: dict[str, float] = {}
+        files, scratch_bytes = [], 0
+        for group_seconds, group_files, written in results:
+            for stage, s in group_seconds.items():
+                seconds[stage] = seconds.get(stage, 0.0) + s
+            files += group_files
+            scratch_bytes += written
+        for stage, s in seconds.items():
+            hooks.stage_finished(stage, s)
+        return TrellisResult(outputs=in_variant_order(files, variants), scratch_bytes_written=scratch_bytes)
+
+
+def get_backend() -> InferenceBackend:
+    kind = settings.inference_backend.strip().lower()
+    if kind == "fake":
+        return FakeBackend()
+    if kind == "trellis":
+        repo_root = os.environ.get("SOLIDGEN_REPO_ROOT") or os.getcwd()
+        return TrellisBackend(repo_root=repo_root, model_id=settings.trellis_model_id)
+    raise ValueError(f"Unknown inference_backend: {settings.inference_backend!r}")
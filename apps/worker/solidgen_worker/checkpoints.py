@@ -0,0 +1,238 @@
+"""
+Stage checkpoints for preemptible (Spot) workers.
+
+Backends save the output of each expensive stage as it finishes; a redelivered job resumes from the
+last one on whichever worker picks it up:
+
+    gs://<gcs_bucket>/<checkpoint_prefix>/<job_id>/<stage>.ckpt
+    gs://<gcs_bucket>/<checkpoint_prefix>/<job_id>/manifest.json  {"key": ..., "stages": {stage: {"seconds", "bytes"}}}
+
+Stages are sparse_structure, shape_slat, tex_slat (sampler outputs + RNG state, so the rest of the run
+samples exactly as it would have) and mesh (the decoded mesh, right before post-processing). The payload
+encoding belongs to the backend and is data only, never pickle (the bucket is shared); this module only
+stores bytes. Uploads run on a background thread and the manifest is rewritten after each one, so a
+checkpoint only counts once it is durable. The manifest's key (backend, model, resolution, seed, inference mode) must match, otherwise the job starts over.
+
+On SIGTERM (GCE preemption notice) the worker calls request_preemption(); at every stage boundary after
+that, JobCheckpoints either lets the job continue (it is expected to finish within the grace window,
+from recent stage timings) or flushes pending checkpoints and raises JobPreempted, which nacks the message.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from solidgen_worker import metrics
+from solidgen_worker.config import settings
+from solidgen_worker.gcs import delete_prefix_from_gcs, try_download_bytes_from_gcs, upload_bytes_to_gcs
+from solidgen_worker.stages import INFERENCE_STAGES, StageHooks
+
+
+logger = logging.getLogger("solidgen-worker.checkpoints")
+
+
+CHECKPOINT_STAGES = ("sparse_structure", "shape_slat", "tex_slat", "mesh")
+# A job's stages from the GPU lane on, for "will it finish in time" (preprocess runs before, and is cached).
+_JOB_STAGES = INFERENCE_STAGES[1:] + ("upload",)
+# POSTPROCESS_MODE=remote: the GPU worker's part ends with the raw mesh handed to the post-processing service.
+_HANDOFF_STAGES = INFERENCE_STAGES[1 : INFERENCE_STAGES.index("postprocess")] + ("handoff",)
+# "mesh" is saved at the end of the decode stage; restoring it skips everything up to post-processing.
+_RESTORED_STAGES = {"mesh": ("sparse_structure", "shape_slat", "tex_slat", "decode")}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")  # one stream: manifest after its stage
+
+
+class JobPreempted(Exception):
+    """The worker is shutting down and the job can't finish in the grace window; its checkpoints are flushed."""
+
+
+_preempt_lock = threading.Lock()
+_preempt_deadline: float | None = None  # time.monotonic() by which in-flight jobs must be done or checkpointed
+
+
+def request_preemption(grace_seconds: float | None = None):
+    global _preempt_deadline
+    grace = settings.preemption_grace_seconds if grace_seconds is None else grace_seconds
+    with _preempt_lock:
+        if _preempt_deadline is None:
+            _preempt_deadline = time.monotonic() + grace
+            logger.warning("Preemption requested; in-flight jobs finish or checkpoint within %.1fs", grace)
+
+
+def preemption_seconds_left() -> float | None:
+    """None when no preemption is pending."""
+    deadline = _preempt_deadline
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def reset_preemption():
+    """Simulations only: the "next worker" starts without a pending preemption."""
+    global _preempt_deadline
+    with _preempt_lock:
+        _preempt_deadline = None
+
+
+# Recent wall time per (workload, stage), to decide whether a job can finish before the deadline.
+_estimates: dict[tuple[str, str], float] = {}
+_EWMA = 0.3
+
+
+def _remaining_seconds(workload: str, stage: str, skipped: set[str], stages: tuple[str, ...] = _JOB_STAGES) -> float:
+    total = 0.0
+    for s in stages[stages.index(stage) :]:
+        if s in skipped:
+            continue
+        estimate = _estimates.get((workload, s))
+        if estimate is None:
+            return float("inf")  # never seen this workload: assume it won't make it
+        total += estimate
+    return total
+
+
+class JobCheckpoints(StageHooks):
+    """
+    Per-job checkpoint store + preemption check (a StageHooks listener on the job's stages).
+    With persist=False (CHECKPOINTS_ENABLED=false) nothing is saved or restored, but preemption still
+    stops the job at a stage boundary instead of letting it run into the kill.
+    With handoff=True (POSTPROCESS_MODE=remote) the job's remaining stages end at the raw mesh handoff.
+    """
+
+    def __init__(self, *, job_id: uuid.UUID, key: str, workload: str, persist: bool | None = None, handoff: bool = False):
+        self.job_id = job_id
+        self.key = key
+        self.workload = workload
+        self.stages = _HANDOFF_STAGES if handoff else _JOB_STAGES
+        self.persist = settings.checkpoints_enabled if persist is None else persist
+        self.prefix = f"{settings.checkpoint_prefix}/{job_id}"
+        self.restored: dict[str, Any] = {}
+        self.recovered_seconds = 0.0
+        self._skipped: set[str] = set()
+        self._manifest: dict[str, dict[str, float]] = {}
+        self._pending: list[Future] = []
+        self._lock = threading.Lock()
+
+    def _uri(self, name: str) -> str:
+        return f"gs://{settings.gcs_bucket}/{self.prefix}/{name}"
+
+    # -- storage -------------------------------------------------------------------------------
+
+    def restore(self, load: Callable[[str, bytes], Any]) -> dict[str, Any]:
+        """
+        Load the job's checkpoints ({stage: load(stage, payload)}); the latest "mesh" supersedes the rest.
+        Anything unreadable or for another key is ignored (the job starts over).
+        """
+        if not self.persist:
+            return {}
+        try:
+            raw = try_download_bytes_from_gcs(self._uri("manifest.json"))
+            manifest = json.loads(raw) if raw else None
+            if not manifest:
+                return {}
+            if manifest.get("key") != self.key:
+                logger.info("Ignoring checkpoints for another key (job_id=%s, key=%s)", self.job_id, manifest.get("key"))
+                return {}
+            stages = {s: meta for s, meta in manifest.get("stages", {}).items() if s in CHECKPOINT_STAGES}
+            wanted = ["mesh"] if "mesh" in stages else [s for s in CHECKPOINT_STAGES if s in stages]
+            restored = {}
+            for stage in wanted:
+                payload = try_download_bytes_from_gcs(self._uri(f"{stage}.ckpt"))
+                if payload is None:
+                    break  # manifest ahead of a deleted object: keep what precedes it
+                restored[stage] = load(stage, payload)
+        except Exception:
+            logger.warning("Could not restore checkpoints (job_id=%s); starting over", self.job_id, exc_info=True)
+            metrics.CHECKPOINTS.labels("any", "restore_failed").inc()
+            return {}
+
+        self.restored = restored
+        self._manifest = {s: stages[s] for s in stages if s in restored or "mesh" in restored}
+        self.recovered_seconds = sum(float(meta.get("seconds") or 0.0) for meta in self._manifest.values())
+        for stage in restored:
+            self._skipped.update(_RESTORED_STAGES.get(stage, (stage,)))
+            metrics.CHECKPOINTS.labels(stage, "restored").inc()
+        if restored:
+            metrics.CHECKPOINT_RECOVERED_SECONDS.inc(self.recovered_seconds)
+            logger.info(
+                "Resuming from checkpoints (job_id=%s, stages=%s, recovered=%.2fs)",
+                self.job_id,
+                list(restored),
+                self.recovered_seconds,
+            )
+        return restored
+
+    def save(self, stage: str, payload: bytes, seconds: float):
+        """Queue one stage's payload (already encoded, off the GPU) for upload; returns immediately."""
+        if not self.persist:
+            return
+        with self._lock:
+            self._pending.append(_executor.submit(self._upload, stage, payload, seconds))
+
+    def _upload(self, stage: str, payload: bytes, seconds: float):
+        try:
+            upload_bytes_to_gcs(data=payload, object_name=f"{self.prefix}/{stage}.ckpt", content_type="application/octet-stream")
+            self._manifest[stage] = {"seconds": seconds, "bytes": len(payload)}
+            manifest = {"key": self.key, "stages": self._manifest}
+            upload_bytes_to_gcs(
+                data=json.dumps(manifest).encode("utf-8"),
+                object_name=f"{self.prefix}/manifest.json",
+                content_type="application/json",
+            )
+        except Exception:
+            metrics.CHECKPOINTS.labels(stage, "failed").inc()
+            logger.warning("Checkpoint upload failed (job_id=%s, stage=%s)", self.job_id, stage, exc_info=True)
+            return
+        metrics.CHECKPOINTS.labels(stage, "saved").inc()
+        logger.info("Checkpointed %s (job_id=%s, bytes=%s)", stage, self.job_id, len(payload))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait for queued uploads; False if some are still running after `timeout`."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return True
+        _done, not_done = wait(pending, timeout=timeout)
+        return not not_done
+
+    def clear(self):
+        """Drop the job's checkpoints once it reached a final status."""
+        if not self.persist:
+            return
+        self.flush()
+        try:
+            delete_prefix_from_gcs(f"{self.prefix}/")
+        except Exception:
+            logger.warning("Could not delete checkpoints (job_id=%s)", self.job_id, exc_info=True)
+
+    # -- StageHooks: preemption at stage boundaries --------------------------------------------
+
+    def stage_started(self, stage: str):
+        left = preemption_seconds_left()
+        if left is None or stage not in self.stages:
+            return
+        needed = _remaining_seconds(self.workload, stage, self._skipped, self.stages)
+        if needed <= left:
+            logger.info("Preemption pending; finishing job (job_id=%s, stage=%s, needs ~%.1fs of %.1fs)", self.job_id, stage, needed, left)
+            return
+        flushed = self.flush(timeout=max(0.0, left))
+        logger.warning(
+            "Preempted before %s (job_id=%s, needs ~%.1fs, %.1fs left, checkpoints flushed=%s)",
+            stage,
+            self.job_id,
+            needed,
+            left,
+            flushed,
+        )
+        raise JobPreempted(f"preempted before {stage}")
+
+    def stage_finished(self, stage: str, seconds: float, output: Any = None):
+        if stage not in self.stages or stage in self._skipped:
+            return
+        key = (self.workload, stage)
+        previous = _estimates.get(key)
+        _estimates[key] = seconds if previous is None else (1 - _EWMA) * previous + _EWMA * seconds
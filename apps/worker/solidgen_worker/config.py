@@ -22,6 +22,88 @@ class Settings(BaseSettings):
     # Model
     trellis_model_id: str = "microsoft/TRELLIS.2-4B"
 
+    # Weight store (solidgen_worker.weights): HF_HOME / TORCH_HOME under weights_dir, prefetched + verified at boot
+    weights_dir: str | None = None  # e.g. a local SSD mount; unset = default hub caches, no prefetch
+    weights_verify: str = "size"  # size | sha256 | none
+    weights_offline: bool = False  # never download; fail at boot if the store is incomplete
+    preload_pipeline: bool = True  # load the pipeline before subscribing (boot-to-ready includes it)
+
+    # Optimized inference (opt-in): TF32 + autocast + torch.compile on the flow transformers only.
+    # Same seed => same output within a mode, but bf16 outputs differ slightly from the default mode.
+    inference_optimized: bool = False
+    inference_autocast_dtype: str = "bf16"  # bf16 | fp16 | none
+    inference_compile: bool = True
+    inference_compile_mode: str = "default"  # torch.compile mode; "reduce-overhead" adds CUDA graphs
+    inference_compile_cache_dir: str = "~/.cache/solidgen/inductor"  # persists compiled kernels across restarts
+
+    # Inference backend: "trellis" (GPU) or "fake" (CPU-only, timed stages + synthetic GLB; benchmarks / local runs)
+    inference_backend: str = "trellis"
+    fake_stage_seconds: str = "preprocess=0.2,sparse_structure=1,shape_slat=3,tex_slat=3,decode=1,postprocess=2,export=0.5"
+    fake_glb_faces: int = 20_000
+
+    # Concurrency: jobs pulled at once (Pub/Sub flow control). Inference is serialized on the GPU lane;
+    # post-processing + export run in a process pool so the next job's inference overlaps with them.
+    max_inflight_jobs: int = 2
+    postprocess_workers: int = 0  # 0 = auto (cpu_count // 8, 1..4); -1 = inline on the GPU thread
+
+    # Split pipeline (solidgen_worker.postprocess_worker): "local" post-processes on this worker (pool / inline);
+    # "remote" stops after decoding, stores the raw mesh at gs://<gcs_bucket>/<postprocess_prefix>/<job_id>/mesh.sgrm
+    # and publishes the job to postprocess_topic, served by `python -m solidgen_worker.postprocess_worker`.
+    postprocess_mode: str = "local"  # local | remote
+    postprocess_topic: str = "solidgen-postprocess"
+    postprocess_subscription: str = "solidgen-postprocess-sub"  # the post-processing service's subscription
+    postprocess_prefix: str = "raw-meshes"
+
+    # VRAM planner (solidgen_worker.vram)
+    vram_low_vram: str = "auto"  # auto (from profile + free memory) | always | never
+    vram_profile_path: str = "~/.cache/solidgen/vram_profile.json"  # per-(resolution, texture_size, mode) peaks
+    vram_headroom_fraction: float = 0.1  # keep this share of usable memory free (fragmentation, allocator slack)
+    vram_allow_texture_downgrade: bool = False  # halve texture_size (down to vram_min_texture_size) instead of deferring
+    vram_min_texture_size: int = 1024
+    vram_preprocess_reserve_mb: int = 1536  # held back for the preprocessing lane's own rembg model + activations
+    vram_postprocess_reserve_mb: int = 3072  # per post-processing pool worker (CUDA context + o_voxel remesh/bake)
+
+    # Scratch files (fallback only; outputs are normally streamed from memory)
+    scratch_dir: str | None = None  # default: system temp dir
+    scratch_max_age_hours: float = 6.0  # stale solidgen_* dirs are removed at startup
+    upload_chunk_bytes: int = 8 * 1024 * 1024  # resumable upload chunk size (multiple of 256 KiB)
+
+    # Early preview: point cloud of the sparse structure, uploaded as soon as that stage finishes
+    preview_enabled: bool = True
+    preview_max_points: int = 50_000
+
+    # Preprocessing (rembg + crop) cache: gs://<gcs_bucket>/<prefix>/<key>-<version>/<sha256 of input>.png
+    preprocess_cache_enabled: bool = True
+    preprocess_cache_prefix: str = "preprocess-cache"
+    preprocess_cache_version: str = "v1"  # bump when preprocessing changes in a way the key doesn't capture
+
+    # Preemption (Spot VMs): stage checkpoints at gs://<gcs_bucket>/<checkpoint_prefix>/<job_id>/, resumed on redelivery
+    checkpoints_enabled: bool = True
+    checkpoint_prefix: str = "checkpoints"
+    preemption_grace_seconds: float = 25.0  # of GCE's 30s notice: finish in-flight jobs or checkpoint + nack by then
+
+    # Output variants (solidgen_worker.outputs)
+    gltfpack_bin: str = "gltfpack"  # meshopt-compressed GLBs
+    gltf_transform_bin: str = "gltf-transform"  # draco-compressed GLBs
+    output_tool_timeout_seconds: float = 300.0
+    upload_concurrency: int = 4  # variants uploaded in parallel
+
+    # Object storage: "gcs", or "local" (gs://bucket/key -> <local_storage_root>/bucket/key)
+    storage_backend: str = "gcs"
+    local_storage_root: str = "/tmp/solidgen-storage"
+
+    # Deep profiling (solidgen_worker.profiling): torch.profiler + Python stack samples for jobs flagged via the API
+    # (POST /internal/jobs/{id}/profile) or a random fraction; artifacts at gs://<gcs_bucket>/<profile_prefix>/<job_id>/
+    profile_sample_rate: float = 0.0  # 0 = flagged jobs only
+    profile_prefix: str = "profiles"
+    profile_python_interval_ms: float = 10.0
+    profile_torch: bool = True  # torch.profiler (CPU + CUDA) when torch is importable
+    profile_torch_stacks: bool = True  # record Python stacks on torch ops (torch_*.folded); slower, more detail
+
+    # Prometheus metrics endpoint (GET /metrics); 0 disables.
+    metrics_port: int = 9100
+    metrics_addr: str = "0.0.0.0"
+
 
 settings = Settings()
 
@@ -37,15 +37,17 @@ def fetch_job(conn, job_id: uuid.UUID) -> dict[str, Any] | None:
         return dict(row) if row else None
 
 
-def try_advisory_lock_job(conn, job_id: uuid.UUID) -> bool:
+def try_advisory_lock_job(conn, job_id: uuid.UUID, *, stage: str = "2") -> bool:
     """
     Acquire a session-level advisory lock for this job_id.
 
     This prevents duplicate processing across multiple worker processes if Pub/Sub redelivers.
     Lock is released automatically when the DB connection closes.
+    `stage` separates the locks of the pipeline's halves (the post-processing service uses its own), so a
+    handed-off job isn't blocked by the GPU worker's session, which closes only after the handoff.
     """
     key1 = str(job_id)
-    key2 = f"{job_id}-2"
+    key2 = f"{job_id}-{stage}"
     with conn.cursor() as cur:
         cur.execute("SELECT pg_try_advisory_lock(hashtext(%s), hashtext(%s))", (key1, key2))
         return bool(cur.fetchone()[0])
@@ -59,14 +61,33 @@ def mark_job_running(conn, job_id: uuid.UUID):
         )
 
 
-def mark_job_succeeded(conn, job_id: uuid.UUID, output_gcs_uri: str):
+def mark_job_succeeded(conn, job_id: uuid.UUID, output_gcs_uri: str, outputs: list[dict[str, Any]] | None = None):
     with conn.cursor() as cur:
         cur.execute(
-            "UPDATE jobs SET status=%s, output_gcs_uri=%s, error_text=NULL, updated_at=%s WHERE id=%s",
-            ("SUCCEEDED", output_gcs_uri, datetime.utcnow(), str(job_id)),
+            "UPDATE jobs SET status=%s, output_gcs_uri=%s, outputs=%s, error_text=NULL, updated_at=%s WHERE id=%s",
+            ("SUCCEEDED", output_gcs_uri, psycopg2.extras.Json(outputs or []), datetime.utcnow(), str(job_id)),
         )
 
 
+def set_job_preview(conn, job_id: uuid.UUID, preview_gcs_uri: str):
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE jobs SET preview_gcs_uri=%s, updated_at=%s WHERE id=%s",
+            (preview_gcs_uri, datetime.utcnow(), str(job_id)),
+        )
+
+
+def set_job_profile(conn, job_id: uuid.UUID, profile_gcs_uri: str):
+    # Operator-facing only: updated_at (the API's ETag) is left alone.
+    with conn.cursor() as cur:
+        cur.execute("UPDATE jobs SET profile_gcs_uri=%s WHERE id=%s", (profile_gcs_uri, str(job_id)))
+
+
+# error_text prefix for jobs that failed on their input (download / decode); the API reports them
+# per day (python -m app.preflight report).
+INVALID_INPUT_PREFIX = "Invalid input: "
+
+
 def mark_job_failed(conn, job_id: uuid.UUID, error_text: str):
     with conn.cursor() as cur:
         cur.execute(
@@ -2,35 +2,67 @@ from __future__ import annotations
 
 import io
 
-from google.cloud import storage
-from PIL import Image
-
+from solidgen_worker import local
 from solidgen_worker.config import settings
 
 
-def storage_client() -> storage.Client:
+def _use_local() -> bool:
+    return settings.storage_backend.strip().lower() == "local"
+
+
+def storage_client():
+    from google.cloud import storage
+
     return storage.Client(project=settings.gcp_project_id)
 
 
-def download_image_from_gcs(gcs_uri: str) -> Image.Image:
+def download_bytes_from_gcs(gcs_uri: str) -> bytes:
     if not gcs_uri.startswith("gs://"):
         raise ValueError("Invalid gcs_uri")
+    if _use_local():
+        return local.read_object(gcs_uri)
+
     _, rest = gcs_uri.split("gs://", 1)
     bucket_name, object_name = rest.split("/", 1)
 
     client = storage_client()
     blob = client.bucket(bucket_name).blob(object_name)
-    data = blob.download_as_bytes()
-    return Image.open(io.BytesIO(data))
+    return blob.download_as_bytes()
+
 
+def try_download_bytes_from_gcs(gcs_uri: str) -> bytes | None:
+    """Like download_bytes_from_gcs, but None if the object doesn't exist."""
+    if _use_local():
+        try:
+            return local.read_object(gcs_uri)
+        except FileNotFoundError:
+            return None
+
+    from google.api_core.exceptions import NotFound
+
+    try:
+        return download_bytes_from_gcs(gcs_uri)
+    except NotFound:
+        return None
+
+
+def upload_bytes_to_gcs(*, data: bytes, object_name: str, content_type: str) -> str:
+    """Upload from memory. A chunk_size makes this a resumable upload (chunks are retried individually)."""
+    if _use_local():
+        return local.write_object_bytes(data=data, object_name=object_name)
 
-def upload_file_to_gcs(*, local_path: str, object_name: str, content_type: str) -> str:
     client = storage_client()
-    bucket = client.bucket(settings.gcs_bucket)
-    blob = bucket.blob(object_name)
-    blob.upload_from_filename(local_path, content_type=content_type)
+    blob = client.bucket(settings.gcs_bucket).blob(object_name, chunk_size=settings.upload_chunk_bytes)
+    blob.upload_from_file(io.BytesIO(data), size=len(data), content_type=content_type, rewind=True)
     return f"gs://{settings.gcs_bucket}/{object_name}"
 
 
+def delete_prefix_from_gcs(prefix: str):
+    """Delete every object under gs://<gcs_bucket>/<prefix>."""
+    if _use_local():
+        local.delete_prefix(prefix)
+        return
 
-
+    client = storage_client()
+    for blob in client.list_blobs(settings.gcs_bucket, prefix=prefix):
+        blob.delete()
@@ -0,0 +1,68 @@
+"""
+GPU worker -> post-processing service handoff (POSTPROCESS_MODE=remote).
+
+The raw mesh (solidgen_worker.rawmesh) goes to gs://<gcs_bucket>/<postprocess_prefix>/<job_id>/mesh.sgrm, then
+{"job_id": ...} is published to POSTPROCESS_TOPIC: the same message shape as the jobs topic, since the object
+path follows from the job id. Local runs swap the topic for a LocalQueue (use_local_queue).
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import uuid
+
+from solidgen_worker import metrics
+from solidgen_worker.config import settings
+from solidgen_worker.gcs import upload_bytes_to_gcs
+from solidgen_worker.local import LocalQueue
+
+
+logger = logging.getLogger("solidgen-worker.handoff")
+
+
+_local_queue: LocalQueue | None = None
+_publisher = None
+_publisher_lock = threading.Lock()
+
+
+def use_local_queue(q: LocalQueue | None):
+    """Publish post-process tasks to an in-process queue instead of Pub/Sub (benchmarks, local runs)."""
+    global _local_queue
+    _local_queue = q
+
+
+def raw_mesh_prefix(job_id: uuid.UUID) -> str:
+    return f"{settings.postprocess_prefix.strip('/')}/{job_id}/"
+
+
+def raw_mesh_uri(job_id: uuid.UUID) -> str:
+    return f"gs://{settings.gcs_bucket}/{raw_mesh_prefix(job_id)}mesh.sgrm"
+
+
+def _get_publisher():
+    global _publisher
+    with _publisher_lock:
+        if _publisher is None:
+            from google.cloud import pubsub_v1
+
+            _publisher = pubsub_v1.PublisherClient()
+    return _publisher
+
+
+def hand_off(job_id: uuid.UUID, raw_mesh: bytes) -> str:
+    """Store the raw mesh, then queue the job for post-processing. Returns the raw mesh's gs:// uri."""
+    uri = upload_bytes_to_gcs(
+        data=raw_mesh, object_name=f"{raw_mesh_prefix(job_id)}mesh.sgrm", content_type="application/octet-stream"
+    )
+    if _local_queue is not None:
+        _local_queue.publish(job_id)
+    else:
+        publisher = _get_publisher()
+        topic = publisher.topic_path(settings.gcp_project_id, settings.postprocess_topic)
+        # Block until Pub/Sub has it: the job message is acked right after this returns.
+        publisher.publish(topic, json.dumps({"job_id": str(job_id)}).encode("utf-8")).result(timeout=60)
+    metrics.RAW_MESH_BYTES.observe(len(raw_mesh))
+    logger.info("Handed off job_id=%s for post-processing (%s, %s bytes)", job_id, uri, len(raw_mesh))
+    return uri
@@ -0,0 +1,116 @@
+"""
+Local stand-ins for GCS and Pub/Sub, for running the worker (with the fake backend) on any Linux box.
+
+- Objects: gs://<bucket>/<key> maps to <local_storage_root>/<bucket>/<key> (STORAGE_BACKEND=local).
+- Queue: an in-process FIFO of job ids with enqueue timestamps, drained by `workers` consumer threads,
+  like a Pub/Sub subscriber with FlowControl(max_messages=workers).
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from typing import Callable
+
+from solidgen_worker.config import settings
+
+
+logger = logging.getLogger("solidgen-worker.local")
+
+
+def local_path_for_uri(gcs_uri: str) -> str:
+    if not gcs_uri.startswith("gs://"):
+        raise ValueError("Invalid gcs_uri")
+    bucket_name, object_name = gcs_uri[len("gs://") :].split("/", 1)
+    return os.path.join(settings.local_storage_root, bucket_name, object_name)
+
+
+def read_object(gcs_uri: str) -> bytes:
+    with open(local_path_for_uri(gcs_uri), "rb") as f:
+        return f.read()
+
+
+def write_object_bytes(*, data: bytes, object_name: str) -> str:
+    gcs_uri = f"gs://{settings.gcs_bucket}/{object_name}"
+    dest = local_path_for_uri(gcs_uri)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    # Atomic like a GCS object write: concurrent readers see the old object or the new one, never a prefix.
+    tmp = f"{dest}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dest)
+    return gcs_uri
+
+
+def delete_prefix(prefix: str):
+    """Objects under gs://<gcs_bucket>/<prefix>; a prefix ending in "/" is a whole directory here."""
+    root = local_path_for_uri(f"gs://{settings.gcs_bucket}/{prefix}")
+    if prefix.endswith("/"):
+        shutil.rmtree(root, ignore_errors=True)
+        return
+    parent, name = os.path.split(root)
+    for entry in os.listdir(parent) if os.path.isdir(parent) else []:
+        if entry.startswith(name):
+            path = os.path.join(parent, entry)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+
+class LocalQueue:
+    """
+    In-process job queue. `handler(job_id)` returns True to ack; False re-queues the message
+    after `redelivery_delay` seconds (like a Pub/Sub nack).
+    """
+
+    def __init__(self, *, redelivery_delay: float = 0.5):
+        self._q: queue.Queue[tuple[uuid.UUID, float] | None] = queue.Queue()
+        self._redelivery_delay = redelivery_delay
+        self._threads: list[threading.Thread] = []
+        self.queue_wait_seconds: list[float] = []
+
+    def publish(self, job_id: uuid.UUID):
+        self._q.put((job_id, time.monotonic()))
+
+    def pending(self) -> int:
+        return self._q.qsize()
+
+    def _redeliver(self, job_id: uuid.UUID):
+        time.sleep(self._redelivery_delay)
+        self.publish(job_id)
+
+    def _run(self, handler: Callable[[uuid.UUID], bool]):
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            job_id, enqueued_at = item
+            self.queue_wait_seconds.append(time.monotonic() - enqueued_at)
+            try:
+                acked = handler(job_id)
+            except Exception:
+                logger.exception("Local queue handler raised (job_id=%s)", job_id)
+                acked = False
+            if not acked:
+                threading.Thread(target=self._redeliver, args=(job_id,), daemon=True).start()
+
+    def start(self, handler: Callable[[uuid.UUID], bool], *, workers: int = 1):
+        if self._threads:
+            return
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._run, args=(handler,), name=f"local-queue-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        for _ in self._threads:
+            self._q.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
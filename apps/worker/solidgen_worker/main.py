@@ -5,26 +5,43 @@ import logging
 import os
 import signal
 import sys
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
 
-from google.cloud import pubsub_v1
-
+from solidgen_worker import metrics
+from solidgen_worker.backends import InferenceBackend, TrellisResult, get_backend
+from solidgen_worker.checkpoints import JobCheckpoints, JobPreempted, preemption_seconds_left, request_preemption
 from solidgen_worker.config import settings
 from solidgen_worker.db import (
+    INVALID_INPUT_PREFIX,
     db_conn,
     fetch_job,
     mark_job_failed,
     mark_job_running,
     mark_job_succeeded,
     refund_job_if_needed,
+    set_job_profile,
     try_advisory_lock_job,
 )
-from solidgen_worker.gcs import download_image_from_gcs, upload_file_to_gcs
-from solidgen_worker.trellis_runner import run_trellis_to_glb
+from solidgen_worker.gcs import download_bytes_from_gcs, upload_bytes_to_gcs
+from solidgen_worker.handoff import hand_off
+from solidgen_worker.outputs import OutputFile, parse_variants
+from solidgen_worker.preprocess import decode_input, preprocess_input
+from solidgen_worker.preview import PreviewPublisher
+from solidgen_worker.profiling import JobProfiler, start_job_profile
+from solidgen_worker.quality import parse_quality
+from solidgen_worker.scratch import sweep_stale_scratch
+from solidgen_worker.stages import NO_HOOKS, MultiHooks, StageHooks, timed_stage
+from solidgen_worker.weights import configure_weight_store
 
 
 _stop = False
 _future = None
+_inflight = 0  # callbacks currently processing a job
+_inflight_cond = threading.Condition()
 
 
 logger = logging.getLogger("solidgen-worker")
@@ -34,16 +51,101 @@ class JobLockedError(Exception):
     """Raised when another worker is already processing the same job_id."""
 
 
+class JobDeferredError(Exception):
+    """Raised when the job doesn't fit in the GPU memory available right now; retried later."""
+
+
 def _handle_sigterm(_signum, _frame):
     global _stop
     _stop = True
+    # GCE preemption / systemd stop: in-flight jobs finish or checkpoint within PREEMPTION_GRACE_SECONDS.
+    request_preemption()
     global _future
     if _future is not None:
         _future.cancel()
 
 
-def process_job(job_id: uuid.UUID):
+def _upload_outputs(files: list[OutputFile], *, user_id, job_id: uuid.UUID) -> dict[str, str]:
+    """Upload every variant (in parallel) under outputs/<user>/<job>/<name>.<ext>; returns {name: gs:// uri}."""
+
+    def _upload(f: OutputFile) -> str:
+        return upload_bytes_to_gcs(
+            data=f.data,
+            object_name=f"outputs/{user_id}/{job_id}/{f.name}.{f.variant.extension}",
+            content_type=f.variant.content_type,
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(settings.upload_concurrency, len(files)))) as ex:
+        uris = list(ex.map(_upload, files))
+    return {f.name: uri for f, uri in zip(files, uris)}
+
+
+def upload_job_outputs(out: TrellisResult, *, job: dict[str, Any], hooks: StageHooks) -> dict[str, str]:
+    """The "upload" stage of a finished job; returns {variant name: gs:// uri}."""
+    job_id = job["id"]
+    logger.info("Uploading %s output(s) to GCS (job_id=%s)", len(out.outputs), job_id)
+    metrics.JOB_SCRATCH_BYTES.observe(out.scratch_bytes_written)
+    metrics.JOB_OUTPUTS.observe(len(out.outputs))
+    uris = timed_stage(hooks, "upload", _upload_outputs, out.outputs, user_id=job["user_id"], job_id=job_id)
+    logger.info(
+        "Uploaded outputs to GCS (job_id=%s, outputs=%s, scratch_bytes_written=%s)",
+        job_id,
+        {f.name: (uris[f.name], len(f.data)) for f in out.outputs},
+        out.scratch_bytes_written,
+    )
+    return uris
+
+
+def record_job_succeeded(conn, job_id: uuid.UUID, out: TrellisResult, uris: dict[str, str]):
+    """Mark SUCCEEDED with every uploaded output, and commit."""
+    # The first variant is the job's primary output (output_gcs_uri); all are listed in jobs.outputs.
+    output_uri = uris[out.outputs[0].name]
+    mark_job_succeeded(
+        conn,
+        job_id,
+        output_uri,
+        outputs=[
+            {
+                "name": f.name,
+                "format": f.variant.format,
+                "compression": f.variant.compression,
+                "decimation_target": f.variant.decimation_target,
+                "texture_size": f.variant.texture_size,
+                "bytes": len(f.data),
+                "gcs_uri": uris[f.name],
+            }
+            for f in out.outputs
+        ],
+    )
+    conn.commit()
+    logger.info("Marked SUCCEEDED (job_id=%s, output=%s)", job_id, output_uri)
+
+
+def record_job_failed(conn, job_id: uuid.UUID, err: str):
+    """Mark FAILED, refund the credits if they were charged, and commit."""
+    mark_job_failed(conn, job_id, err)
+    job_row = fetch_job(conn, job_id)
+    if job_row:
+        refund_job_if_needed(conn, job_row)
+    conn.commit()
+
+
+def _save_profile(conn, profiler: JobProfiler, *, upload: bool):
+    """After the job's final status is committed: upload the profile and link it from the job row."""
+    uri = profiler.finish(upload=upload)
+    if uri is None:
+        return
+    try:
+        set_job_profile(conn, profiler.job_id, uri)
+        conn.commit()
+    except Exception:
+        logger.warning("Could not record profile_gcs_uri (job_id=%s, uri=%s)", profiler.job_id, uri, exc_info=True)
+        conn.rollback()
+
+
+def process_job(job_id: uuid.UUID, *, hooks: StageHooks = NO_HOOKS, backend: InferenceBackend | None = None):
     logger.info("Processing job_id=%s", job_id)
+    backend = backend or get_backend()
     with db_conn() as conn:
         conn.autocommit = False
 
@@ -56,79 +158,236 @@ def process_job(job_id: uuid.UUID):
         if not job:
             # Stale Pub/Sub message (or wrong DB). Return normally so the caller ACKs.
             logger.warning("Job not found in DB; acking message (job_id=%s).", job_id)
+            metrics.JOBS.labels("not_found").inc()
             conn.rollback()
             return
 
         status = str(job.get("status") or "")
         if status in {"SUCCEEDED"}:
             logger.info("Job already SUCCEEDED (job_id=%s); skipping.", job_id)
+            metrics.JOBS.labels("skipped").inc()
             conn.rollback()
             return
         if status in {"FAILED"}:
             logger.info("Job already FAILED (job_id=%s); skipping.", job_id)
+            metrics.JOBS.labels("skipped").inc()
             conn.rollback()
             return
 
         if status == "RUNNING":
-            # If Pub/Sub redelivered, the original attempt never ACKed. Re-process.
+            # If Pub/Sub redelivered, the original attempt never ACKed (crash, preemption). Re-process,
+            # resuming from the stage checkpoints it left behind.
             logger.warning("Job is RUNNING but message redelivered; re-processing (job_id=%s).", job_id)
 
+        params = job.get("params") or {}
+        resolution = int(params.get("resolution") or 1024)
+        seed = int(params.get("seed") or 0)
+        decimation_target = int(params.get("decimation_target") or 500_000)
+        texture_size = int(params.get("texture_size") or 2048)
+        try:
+            quality = parse_quality(params.get("quality"))
+            variants = parse_variants(params, decimation_target=decimation_target, texture_size=texture_size)
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error("Invalid quality / output variants (job_id=%s): %s", job_id, e)
+            mark_job_failed(conn, job_id, f"Invalid params: {e}")
+            refund_job_if_needed(conn, job)
+            conn.commit()
+            metrics.JOBS.labels("failed").inc()
+            return
+        # The largest texture bake bounds the job's GPU memory.
+        texture_size = max(v.texture_size for v in variants)
+
+        # Admission: decide low_vram / texture size from the VRAM profile, or defer before marking RUNNING.
+        plan = backend.plan(resolution=resolution, texture_size=texture_size)
+        if plan.never_fits:
+            logger.error(
+                "Job exceeds GPU memory even in low_vram mode (job_id=%s, resolution=%s, texture_size=%s, peak=%s)",
+                job_id,
+                resolution,
+                texture_size,
+                plan.estimated_peak_bytes,
+            )
+            metrics.VRAM_PLANS.labels("rejected").inc()
+            mark_job_failed(conn, job_id, "Job exceeds GPU memory for this resolution/texture size")
+            refund_job_if_needed(conn, job)
+            conn.commit()
+            metrics.JOBS.labels("failed").inc()
+            return
+        if not plan.fits:
+            metrics.VRAM_PLANS.labels("deferred").inc()
+            conn.rollback()
+            raise JobDeferredError(
+                f"needs ~{plan.estimated_peak_bytes} bytes, {plan.budget_bytes} usable (job_id={job_id})"
+            )
+        metrics.VRAM_PLANS.labels(plan.mode).inc()
+        if plan.texture_size != texture_size:
+            logger.warning(
+                "Reducing texture_size %s -> %s to fit GPU memory (job_id=%s)", texture_size, plan.texture_size, job_id
+            )
+        # POSTPROCESS_MODE=remote: stop after decoding; the post-processing service finishes the job.
+        handoff = settings.postprocess_mode.strip().lower() == "remote"
+
         mark_job_running(conn, job_id)
         conn.commit()
         logger.info("Marked RUNNING (job_id=%s)", job_id)
 
+        preview = None
+        if settings.preview_enabled:
+            preview = PreviewPublisher(job_id=job_id, user_id=job["user_id"])
+            hooks = MultiHooks(hooks, preview)
+        checkpoints = JobCheckpoints(
+            job_id=job_id,
+            key=backend.checkpoint_key(resolution=resolution, seed=seed, quality=quality),
+            workload=f"{backend.name}/{resolution}/{quality}",
+            handoff=handoff,
+        )
+        hooks = MultiHooks(hooks, checkpoints)
+        # Sampled / operator-flagged jobs only; everything else runs without profiler hooks.
+        profiler = start_job_profile(job_id=job_id, params=params)
+        if profiler is not None:
+            hooks = MultiHooks(hooks, profiler)
+        preempted = False
+
+        started_at = time.perf_counter()
+        input_ok = False
         try:
             logger.info("Downloading input image (job_id=%s, uri=%s)", job_id, job["input_gcs_uri"])
-            image = download_image_from_gcs(job["input_gcs_uri"])
-            logger.info("Downloaded input image (job_id=%s)", job_id)
-
-            params = job.get("params") or {}
-            resolution = int(params.get("resolution") or 1024)
-            seed = int(params.get("seed") or 0)
-            decimation_target = int(params.get("decimation_target") or 500_000)
-            texture_size = int(params.get("texture_size") or 2048)
-
-            repo_root = os.environ.get("SOLIDGEN_REPO_ROOT") or os.getcwd()
-            out = run_trellis_to_glb(
-                repo_root=repo_root,
+            data = timed_stage(hooks, "download", download_bytes_from_gcs, job["input_gcs_uri"])
+            logger.info("Downloaded input image (job_id=%s, bytes=%s)", job_id, len(data))
+            image = decode_input(data)
+            input_ok = True  # from here on, failures are ours (rembg, inference...), not the input's
+            # Outside the GPU lane (overlaps the previous job's inference), cached by input hash.
+            image = preprocess_input(data, image, backend=backend, hooks=hooks)
+
+            out = backend.run(
                 image=image,
-                model_id=settings.trellis_model_id,
                 resolution=resolution,
                 seed=seed,
                 decimation_target=decimation_target,
                 texture_size=texture_size,
+                hooks=hooks,
+                plan=plan,
+                variants=variants,
+                preprocessed=True,
+                checkpoints=checkpoints,
+                quality=quality,
+                handoff=handoff,
             )
 
-            object_name = f"outputs/{job['user_id']}/{job_id}/asset.glb"
-            logger.info("Uploading output to GCS (job_id=%s, object=%s)", job_id, object_name)
-            output_uri = upload_file_to_gcs(local_path=out.glb_path, object_name=object_name, content_type="model/gltf-binary")
-            logger.info("Uploaded output to GCS (job_id=%s, uri=%s)", job_id, output_uri)
-
-            mark_job_succeeded(conn, job_id, output_uri)
-            conn.commit()
-            logger.info("Marked SUCCEEDED (job_id=%s, output=%s)", job_id, output_uri)
+            if out.raw_mesh is not None:
+                # Stays RUNNING; the post-processing service marks it SUCCEEDED / FAILED (after the preview's update).
+                if preview is not None:
+                    preview.wait(timeout=30.0)
+                timed_stage(hooks, "handoff", hand_off, job_id, out.raw_mesh)
+                metrics.JOBS.labels("handed_off").inc()
+                checkpoints.clear()
+                return
+
+            uris = upload_job_outputs(out, job=job, hooks=hooks)
+            if preview is not None:
+                # Keep the final status update after the preview's, and don't leak its thread past the job.
+                preview.wait(timeout=30.0)
+                preview.finished(time.perf_counter() - preview.started_at)
+            record_job_succeeded(conn, job_id, out, uris)
+            metrics.JOBS.labels("succeeded").inc()
+            checkpoints.clear()
+        except JobPreempted:
+            # Stays RUNNING; the nacked message is redelivered and resumes from the checkpoints.
+            preempted = True
+            if preview is not None:
+                preview.wait(timeout=max(0.0, preemption_seconds_left() or 0.0))
+            conn.rollback()
+            raise
         except Exception as e:
             err = f"{type(e).__name__}: {e}"
+            if not input_ok:
+                # Download / decode: the API's input pre-flight should have caught it (app.preflight report).
+                err = f"{INVALID_INPUT_PREFIX}{err}"
+            metrics.FAILED_JOB_SECONDS.labels("input" if not input_ok else "processing").inc(time.perf_counter() - started_at)
             logger.exception("Job failed (job_id=%s): %s", job_id, err)
-            mark_job_failed(conn, job_id, err)
-            job_row = fetch_job(conn, job_id)
-            if job_row:
-                refund_job_if_needed(conn, job_row)
-            conn.commit()
+            if preview is not None:
+                preview.wait(timeout=30.0)
+            record_job_failed(conn, job_id, err)
+            metrics.JOBS.labels("failed").inc()
+            checkpoints.clear()
+        finally:
+            if profiler is not None:
+                # A preempted job's profile is partial and the grace window is short: dropped.
+                _save_profile(conn, profiler, upload=not preempted)
+
+
+def handle_job_message(job_id: uuid.UUID, *, hooks: StageHooks = NO_HOOKS, backend: InferenceBackend | None = None) -> bool:
+    """Process one queue message. Returns True to ACK, False to NACK (retry later)."""
+    try:
+        with metrics.JOBS_IN_FLIGHT.track_inprogress(), metrics.JOB_SECONDS.time():
+            process_job(job_id, hooks=MultiHooks(metrics.METRICS_HOOKS, hooks), backend=backend)
+        return True
+    except JobLockedError:
+        logger.info("Job is locked by another worker; nacking for retry. job_id=%s", job_id)
+        metrics.JOBS.labels("locked").inc()
+        return False
+    except JobDeferredError as e:
+        logger.info("Not enough free GPU memory; nacking for retry. %s", e)
+        metrics.JOBS.labels("deferred").inc()
+        return False
+    except JobPreempted:
+        logger.info("Job checkpointed for preemption; nacking for redelivery. job_id=%s", job_id)
+        metrics.JOBS.labels("preempted").inc()
+        return False
+    except Exception:
+        # NACK so it retries (DB down, proxy misconfigured, transient GCS, etc.)
+        logger.exception("Error processing job_id=%s; nacking for retry.", job_id)
+        metrics.JOBS.labels("error").inc()
+        return False
+
+
+def _wait_for_inflight():
+    """After the subscription stops: give in-flight jobs the preemption grace window to finish or checkpoint."""
+    with _inflight_cond:
+        while _inflight:
+            left = preemption_seconds_left()
+            if left is not None and left <= 0:
+                logger.warning("Grace window over with %s job(s) still running; exiting", _inflight)
+                return
+            logger.info("Waiting for %s in-flight job(s) to finish or checkpoint", _inflight)
+            _inflight_cond.wait(timeout=left if left is not None else 1.0)
+
+
+def _warm_up(backend: InferenceBackend):
+    """Everything before the subscription starts: weights verified (or fetched), pipeline loaded."""
+    phases = backend.warm_up()
+    for phase, seconds in phases.items():
+        metrics.BOOT_PHASE_SECONDS.labels(phase).set(seconds)
+    ready = metrics.process_uptime_seconds()
+    if ready is not None:
+        metrics.BOOT_TO_READY_SECONDS.set(ready)
+    logger.info(
+        "Worker ready (backend=%s, boot_to_ready=%s, phases=%s)",
+        backend.name,
+        f"{ready:.2f}s" if ready is not None else "n/a",
+        {k: round(v, 2) for k, v in phases.items()},
+    )
 
 
-def main():
+def setup_process():
+    """Logging, SIGTERM handling, metrics server, stale scratch cleanup: the start of every worker process."""
     logging.basicConfig(
         level=os.environ.get("LOG_LEVEL", "INFO").upper(),
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
     signal.signal(signal.SIGTERM, _handle_sigterm)
     signal.signal(signal.SIGINT, _handle_sigterm)
+    metrics.start_metrics_server()
+    sweep_stale_scratch()
 
-    subscriber = pubsub_v1.SubscriberClient()
-    sub_path = subscriber.subscription_path(settings.gcp_project_id, settings.pubsub_subscription)
 
-    flow = pubsub_v1.types.FlowControl(max_messages=1)
+def serve(*, subscription: str, handle: Callable[[uuid.UUID], bool], max_messages: int):
+    """Pull {"job_id": ...} messages from `subscription` until SIGTERM; handle() returns True to ack."""
+    from google.cloud import pubsub_v1
+
+    subscriber = pubsub_v1.SubscriberClient()
+    sub_path = subscriber.subscription_path(settings.gcp_project_id, subscription)
+    flow = pubsub_v1.types.FlowControl(max_messages=max(1, max_messages))
 
     def callback(message: pubsub_v1.subscriber.message.Message):
         if _stop:
@@ -143,17 +402,21 @@ def main():
             message.ack()
             return
 
+        logger.info("Received Pub/Sub message job_id=%s", job_id)
+        metrics.observe_queue_wait(message.publish_time)
+        global _inflight
+        with _inflight_cond:
+            _inflight += 1
         try:
-            logger.info("Received Pub/Sub message job_id=%s", job_id)
-            process_job(job_id)
+            acked = handle(job_id)
+        finally:
+            with _inflight_cond:
+                _inflight -= 1
+                _inflight_cond.notify_all()
+        if acked:
             message.ack()
             logger.info("Acked Pub/Sub message job_id=%s", job_id)
-        except JobLockedError:
-            logger.info("Job is locked by another worker; nacking for retry. job_id=%s", job_id)
-            message.nack()
-        except Exception:
-            # NACK so it retries (DB down, proxy misconfigured, transient GCS, etc.)
-            logger.exception("Error processing job_id=%s; nacking for retry.", job_id)
+        else:
             message.nack()
 
     global _future
@@ -163,10 +426,21 @@ def main():
     finally:
         if _future:
             _future.cancel()
+        _wait_for_inflight()
         subscriber.close()
 
 
-if __name__ == "__main__":
-    main()
+def main():
+    configure_weight_store()  # before anything imports huggingface_hub / torch.hub
+    setup_process()
+    backend = get_backend()
+    _warm_up(backend)
+    serve(
+        subscription=settings.pubsub_subscription,
+        handle=lambda job_id: handle_job_message(job_id, backend=backend),
+        max_messages=settings.max_inflight_jobs,
+    )
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Prometheus/OpenMetrics instrumentation for the worker.
+
+The HTTP server runs on its own daemon thread (prometheus_client.start_http_server), so scrapes
+are answered while a job is running. GPU memory gauges are read at scrape time, not on the job
+path; the hot path only pays for counter/histogram updates at stage boundaries.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any
+
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+
+from solidgen_worker.config import settings
+from solidgen_worker.stages import StageHooks
+
+
+logger = logging.getLogger("solidgen-worker.metrics")
+
+
+# Stages range from ~100ms (download) to many minutes (tex_slat on large resolutions).
+_STAGE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+
+JOBS = Counter(
+    "solidgen_worker_jobs_total",
+    "Jobs handled, by outcome (succeeded, failed, skipped, not_found, locked, deferred, preempted, handed_off, error).",
+    ["outcome"],
+)
+POSTPROCESS_TASKS = Counter(
+    "solidgen_worker_postprocess_tasks_total",
+    "Post-process tasks handled by the post-processing service, by outcome "
+    "(succeeded, failed, skipped, not_found, locked, error).",
+    ["outcome"],
+)
+RAW_MESH_BYTES = Histogram(
+    "solidgen_worker_raw_mesh_bytes",
+    "Size of the raw meshes handed from the GPU workers to the post-processing service.",
+    buckets=(1 << 20, 4 << 20, 16 << 20, 64 << 20, 256 << 20, 1 << 30),
+)
+FAILED_JOB_SECONDS = Counter(
+    "solidgen_worker_failed_job_seconds_total",
+    "Worker wall time spent on jobs that then failed, by reason (input: download / preprocessing, processing).",
+    ["reason"],
+)
+STAGE_SECONDS = Histogram("solidgen_worker_stage_seconds", "Wall time per job stage.", ["stage"], buckets=_STAGE_BUCKETS)
+JOB_SECONDS = Histogram("solidgen_worker_job_seconds", "Wall time of process_job.", buckets=_STAGE_BUCKETS)
+QUEUE_WAIT_SECONDS = Histogram(
+    "solidgen_worker_queue_wait_seconds",
+    "Time from Pub/Sub publish to the worker picking the message up.",
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600, 7200),
+)
+VRAM_PLANS = Counter(
+    "solidgen_worker_vram_plans_total",
+    "Admission decisions (resident, low_vram, deferred, rejected).",
+    ["decision"],
+)
+POSTPROCESS_POOL_WAIT_SECONDS = Histogram(
+    "solidgen_worker_postprocess_pool_wait_seconds",
+    "Time a job waited for a post-processing pool worker (plus handoff).",
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300),
+)
+JOB_SCRATCH_BYTES = Histogram(
+    "solidgen_worker_job_scratch_bytes_written",
+    "Bytes written to local scratch per job (0 when the output is streamed from memory).",
+    buckets=(0, 1 << 20, 16 << 20, 64 << 20, 256 << 20, 1 << 30),
+)
+JOB_OUTPUTS = Histogram(
+    "solidgen_worker_job_outputs",
+    "Output variants produced per job (all from one inference pass).",
+    buckets=(1, 2, 3, 4, 6, 8),
+)
+PREPROCESS_CACHE = Counter(
+    "solidgen_worker_preprocess_cache_total",
+    "Preprocessing cache lookups, by result (hit, miss, error).",
+    ["result"],
+)
+PREVIEWS = Counter("solidgen_worker_previews_total", "Early previews, by outcome (published, failed).", ["outcome"])
+TIME_TO_PREVIEW_SECONDS = Histogram(
+    "solidgen_worker_time_to_preview_seconds",
+    "Time from job start (RUNNING) to the preview being recorded on the job (time to first visual).",
+    buckets=_STAGE_BUCKETS,
+)
+PREVIEW_FRACTION = Histogram(
+    "solidgen_worker_preview_fraction",
+    "Time to preview as a fraction of the job's wall time.",
+    buckets=(0.05, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75, 1.0),
+)
+CHECKPOINTS = Counter(
+    "solidgen_worker_checkpoints_total",
+    "Stage checkpoints, by stage and outcome (saved, failed, restored, restore_failed).",
+    ["stage", "outcome"],
+)
+CHECKPOINT_RECOVERED_SECONDS = Counter(
+    "solidgen_worker_checkpoint_recovered_seconds_total",
+    "Inference seconds skipped by resuming redelivered jobs from their checkpoints.",
+)
+PROFILES = Counter(
+    "solidgen_worker_profiles_total",
+    "Deep-profiled jobs, by reason (flagged, sampled) and outcome (uploaded, failed, busy, discarded).",
+    ["reason", "outcome"],
+)
+BOOT_PHASE_SECONDS = Gauge(
+    "solidgen_worker_boot_phase_seconds",
+    "Time spent in each boot phase (weights_verify, weights_download, pipeline_load).",
+    ["phase"],
+)
+BOOT_TO_READY_SECONDS = Gauge(
+    "solidgen_worker_boot_to_ready_seconds", "Process start to subscribing (weights ready, pipeline loaded)."
+)
+PIPELINE_LOADS = Counter("solidgen_worker_pipeline_loads_total", "TRELLIS pipeline loads (from_pretrained).")
+JOBS_IN_FLIGHT = Gauge("solidgen_worker_jobs_in_flight", "Jobs currently being processed.")
+
+_GPU_ALLOCATED = Gauge("solidgen_worker_gpu_memory_allocated_bytes", "torch.cuda.memory_allocated().")
+_GPU_RESERVED = Gauge("solidgen_worker_gpu_memory_reserved_bytes", "torch.cuda.memory_reserved().")
+_GPU_PEAK = Gauge(
+    "solidgen_worker_gpu_memory_peak_bytes",
+    "torch.cuda.max_memory_allocated() since the current/last job started.",
+)
+
+
+def _cuda_stat(name: str) -> float:
+    # Never import torch (or initialize CUDA) from a scrape: the fake backend runs without it.
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_initialized():
+        return 0.0
+    return float(getattr(torch.cuda, name)())
+
+
+_GPU_ALLOCATED.set_function(lambda: _cuda_stat("memory_allocated"))
+_GPU_RESERVED.set_function(lambda: _cuda_stat("memory_reserved"))
+_GPU_PEAK.set_function(lambda: _cuda_stat("max_memory_allocated"))
+
+
+class MetricsHooks(StageHooks):
+    def stage_finished(self, stage: str, seconds: float, output: Any = None):
+        STAGE_SECONDS.labels(stage).observe(seconds)
+
+
+METRICS_HOOKS = MetricsHooks()
+
+
+def observe_queue_wait(published_at: datetime | None):
+    if published_at is None:
+        return
+    if published_at.tzinfo is None:
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    QUEUE_WAIT_SECONDS.observe(max(0.0, (datetime.now(timezone.utc) - published_at).total_seconds()))
+
+
+def process_uptime_seconds() -> float | None:
+    """Seconds since this process started (Linux /proc), including interpreter start and imports."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])  # field 22: starttime
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def start_metrics_server():
+    if settings.metrics_port <= 0:
+        return
+    start_http_server(settings.metrics_port, addr=settings.metrics_addr)
+    logger.info("Metrics server listening on %s:%s", settings.metrics_addr, settings.metrics_port)
@@ -0,0 +1,164 @@
+"""
+Output variants: several deliverables (LODs, texture sizes, compressed GLBs, OBJ) from one inference pass.
+
+params["outputs"] (validated by the API) lists variants; jobs without it get the single
+"asset" GLB at the job's decimation_target / texture_size. Variants that share
+(decimation_target, texture_size) share one remesh + texture bake; only the encoding differs.
+Groups are post-processed in parallel (one pool task each), encodings run inside the group's task.
+
+Compression uses the standard CLI tools, which work on files (in a self-cleaning scratch dir):
+  meshopt -> gltfpack -cc          (GLTFPACK_BIN)
+  draco   -> gltf-transform draco  (GLTF_TRANSFORM_BIN)
+"""
+
+from __future__ import annotations
+
+import io
+import logging
+import os
+import subprocess
+import zipfile
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from solidgen_worker.config import settings
+from solidgen_worker.scratch import scratch_dir
+
+
+logger = logging.getLogger("solidgen-worker.outputs")
+
+
+PRIMARY_NAME = "asset"
+
+_CONTENT_TYPES = {"glb": "model/gltf-binary", "obj": "application/zip"}
+_EXTENSIONS = {"glb": "glb", "obj": "obj.zip"}  # OBJ ships with its .mtl + texture maps
+
+
+@dataclass(frozen=True)
+class OutputVariant:
+    name: str
+    format: str = "glb"  # glb | obj
+    compression: str = "none"  # none | draco | meshopt (glb only)
+    decimation_target: int = 500_000
+    texture_size: int = 2048
+
+    @property
+    def group_key(self) -> tuple[int, int]:
+        return self.decimation_target, self.texture_size
+
+    @property
+    def extension(self) -> str:
+        return _EXTENSIONS[self.format]
+
+    @property
+    def content_type(self) -> str:
+        return _CONTENT_TYPES[self.format]
+
+
+@dataclass(frozen=True)
+class OutputFile:
+    variant: OutputVariant
+    data: bytes = field(repr=False)
+
+    @property
+    def name(self) -> str:
+        return self.variant.name
+
+
+def parse_variants(params: dict[str, Any], *, decimation_target: int, texture_size: int) -> list[OutputVariant]:
+    """Variants from job params; fields a variant leaves out fall back to the job-level values."""
+    specs = params.get("outputs") or [{"name": PRIMARY_NAME}]
+    variants = []
+    for spec in specs:
+        variant = OutputVariant(
+            name=str(spec["name"]),
+            format=str(spec.get("format") or "glb"),
+            compression=str(spec.get("compression") or "none"),
+            decimation_target=int(spec.get("decimation_target") or decimation_target),
+            texture_size=int(spec.get("texture_size") or texture_size),
+        )
+        if variant.format not in _CONTENT_TYPES:
+            raise ValueError(f"Unsupported output format {variant.format!r} (variant {variant.name!r})")
+        if variant.compression not in {"none", "draco", "meshopt"} or (
+            variant.compression != "none" and variant.format != "glb"
+        ):
+            raise ValueError(f"Unsupported compression {variant.compression!r} for {variant.format} (variant {variant.name!r})")
+        variants.append(variant)
+    return variants
+
+
+def group_variants(variants: list[OutputVariant]) -> list[list[OutputVariant]]:
+    """Variants sharing one post-processing run, in first-seen order."""
+    groups: dict[tuple[int, int], list[OutputVariant]] = {}
+    for variant in variants:
+        groups.setdefault(variant.group_key, []).append(variant)
+    return list(groups.values())
+
+
+def in_variant_order(files: list[OutputFile], variants: list[OutputVariant]) -> list[OutputFile]:
+    by_name = {f.name: f for f in files}
+    return [by_name[v.name] for v in variants]
+
+
+def cap_texture_size(variants: list[OutputVariant], texture_size: int) -> list[OutputVariant]:
+    """Apply an admission-time texture downgrade (see vram.py) to every variant."""
+    return [
+        v if v.texture_size <= texture_size else OutputVariant(v.name, v.format, v.compression, v.decimation_target, texture_size)
+        for v in variants
+    ]
+
+
+def _run_tool(argv: list[str], *, data: bytes) -> tuple[bytes, int]:
+    """Run a file-to-file CLI on `data` ({src}/{dst} placeholders in argv). Returns (output, scratch bytes)."""
+    with scratch_dir() as tmp:
+        src = os.path.join(tmp, "in.glb")
+        dst = os.path.join(tmp, "out.glb")
+        with open(src, "wb") as f:
+            f.write(data)
+        argv = [a.format(src=src, dst=dst) for a in argv]
+        try:
+            proc = subprocess.run(argv, capture_output=True, timeout=settings.output_tool_timeout_seconds)
+        except FileNotFoundError:
+            raise RuntimeError(f"{argv[0]} not found (install it or set its *_BIN setting)") from None
+        if proc.returncode != 0:
+            tail = proc.stderr.decode("utf-8", "replace")[-2000:]
+            raise RuntimeError(f"{os.path.basename(argv[0])} exited with {proc.returncode}: {tail}")
+        with open(dst, "rb") as f:
+            out = f.read()
+    return out, len(data) + len(out)
+
+
+def compress_glb(data: bytes, compression: str) -> tuple[bytes, int]:
+    if compression == "meshopt":
+        return _run_tool([settings.gltfpack_bin, "-i", "{src}", "-o", "{dst}", "-cc"], data=data)
+    if compression == "draco":
+        return _run_tool([settings.gltf_transform_bin, "draco", "{src}", "{dst}"], data=data)
+    return data, 0
+
+
+def zip_files(files: dict[str, bytes]) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def encode_group(
+    variants: list[OutputVariant], *, glb: bytes, export_obj: Callable[[], dict[str, bytes]]
+) -> tuple[list[OutputFile], int]:
+    """
+    Encode one post-processed mesh into each of its variants.
+    `glb` is the plain export; `export_obj` returns {filename: bytes} (obj/mtl/textures), only called if needed.
+    Returns (files, scratch bytes written).
+    """
+    files = []
+    scratch_bytes = 0
+    for variant in variants:
+        if variant.format == "obj":
+            data = zip_files(export_obj())
+        else:
+            data, written = compress_glb(glb, variant.compression)
+            scratch_bytes += written
+        files.append(OutputFile(variant, data))
+    return files, scratch_bytes
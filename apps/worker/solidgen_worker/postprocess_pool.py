@@ -0,0 +1,190 @@
+"""
+Process pool for post-processing + GLB export, off the thread that owns the GPU lane.
+
+Mesh arrays are handed to the child through multiprocessing.shared_memory: the parent copies
+each tensor once (device -> shared host buffer), the child maps the same pages; only the
+segment names/shapes/dtypes are pickled. The pool uses the "spawn" start method because the
+parent holds a CUDA context (o_voxel's remesh/bake also runs on the GPU, in the child's own
+context). POSTPROCESS_WORKERS=-1 keeps everything inline.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable
+
+
+logger = logging.getLogger("solidgen-worker.postprocess")
+
+
+@dataclass(frozen=True)
+class SharedArray:
+    name: str
+    shape: tuple[int, ...]
+    dtype: str  # numpy dtype string, e.g. "<f4"
+    nbytes: int
+
+
+_NUMPY_DTYPES = {
+    "torch.float32": "<f4",
+    "torch.float16": "<f2",
+    "torch.float64": "<f8",
+    "torch.int64": "<i8",
+    "torch.int32": "<i4",
+    "torch.int16": "<i2",
+    "torch.uint8": "|u1",
+    "torch.bool": "|b1",
+}
+
+
+class SharedArrays:
+    """Parent side: owns the segments for one job and unlinks them on exit."""
+
+    def __init__(self):
+        self.specs: dict[str, SharedArray] = {}
+        self._segments: list[shared_memory.SharedMemory] = []
+
+    def _create(self, nbytes: int) -> shared_memory.SharedMemory:
+        shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+        self._segments.append(shm)
+        return shm
+
+    def add_buffer(self, key: str, data, *, dtype: str, shape: tuple[int, ...]):
+        view = memoryview(data).cast("B")
+        shm = self._create(view.nbytes)
+        shm.buf[: view.nbytes] = view
+        self.specs[key] = SharedArray(shm.name, tuple(shape), dtype, view.nbytes)
+
+    def add_tensor(self, key: str, tensor):
+        import numpy as np
+        import torch
+
+        tensor = tensor.detach()
+        if tensor.dtype == torch.bfloat16:  # no numpy equivalent
+            tensor = tensor.float()
+        dtype = np.dtype(_NUMPY_DTYPES[str(tensor.dtype)])
+        nbytes = tensor.numel() * tensor.element_size()
+        shm = self._create(nbytes)
+        dst = np.ndarray(tuple(tensor.shape), dtype=dtype, buffer=shm.buf)
+        torch.from_numpy(dst).copy_(tensor)  # single D2H copy straight into shared memory
+        self.specs[key] = SharedArray(shm.name, tuple(tensor.shape), dtype.str, nbytes)
+
+    def __enter__(self) -> SharedArrays:
+        return self
+
+    def __exit__(self, *exc):
+        for shm in self._segments:
+            try:
+                shm.close()
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._segments.clear()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    # Spawned children share the parent's resource tracker, so this registration is a duplicate
+    # of the parent's and goes away with the parent's unlink().
+    return shared_memory.SharedMemory(name=name)
+
+
+@contextlib.contextmanager
+def attached(specs: dict[str, SharedArray]):
+    """
+    Child side: {key: memoryview} over the parent's segments, valid inside the block.
+    Copy out (e.g. to the GPU) and drop numpy views before leaving it.
+    """
+    segments = {key: _attach(spec.name) for key, spec in specs.items()}
+    views = {key: shm.buf[: specs[key].nbytes] for key, shm in segments.items()}
+    try:
+        yield views
+    finally:
+        for key, shm in segments.items():
+            try:
+                views[key].release()
+                shm.close()
+            except BufferError:
+                # A numpy view is still alive; the mapping is released when it is collected.
+                pass
+
+
+def as_numpy(spec: SharedArray, buf):
+    import numpy as np
+
+    return np.ndarray(spec.shape, dtype=np.dtype(spec.dtype), buffer=buf)
+
+
+def _init_child(repo_root: str | None):
+    os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+    os.environ.setdefault("OPENCV_IO_ENABLE_OPENEXR", "1")
+    if repo_root:
+        upstream = os.path.join(repo_root, "vendor", "trellis2_upstream")
+        if upstream not in sys.path:
+            sys.path.insert(0, upstream)
+
+
+def pool_size() -> int:
+    """POSTPROCESS_WORKERS, or (0 = auto) one worker per 8 CPUs, 1..4: each job's bake/WebP encode is multi-threaded."""
+    from solidgen_worker.config import settings
+
+    if settings.postprocess_workers != 0:
+        return settings.postprocess_workers
+    return max(1, min(4, (os.cpu_count() or 1) // 8))
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor | None:
+    """The shared pool, or None when post-processing runs inline (POSTPROCESS_WORKERS=-1)."""
+    global _pool
+    n = pool_size()
+    if n < 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                repo_root = os.environ.get("SOLIDGEN_REPO_ROOT") or os.getcwd()
+                _pool = ProcessPoolExecutor(
+                    max_workers=n,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_child,
+                    initargs=(repo_root,),
+                )
+                logger.info("Started post-processing pool (workers=%s)", n)
+    return _pool
+
+
+def run_many_in_pool(fn: Callable[..., Any], arrays: SharedArrays, kwargs_list: list[dict[str, Any]]) -> list[Any]:
+    """
+    Run fn(arrays.specs, **kwargs) in the pool once per kwargs, all reading the same segments, and wait;
+    the segments stay alive until every task returns. Results in order.
+    """
+    pool = get_pool()
+    if pool is None:
+        raise RuntimeError("Post-processing pool is disabled")
+    futures = [pool.submit(fn, arrays.specs, **kwargs) for kwargs in kwargs_list]
+    try:
+        return [f.result() for f in futures]
+    finally:
+        for f in futures:
+            f.cancel()
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
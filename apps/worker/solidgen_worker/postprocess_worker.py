@@ -0,0 +1,123 @@
+"""
+Post-processing service: the second half of the split pipeline (POSTPROCESS_MODE=remote on the GPU workers).
+
+GPU workers stop after decoding and hand the raw mesh over (solidgen_worker.handoff); the job stays RUNNING.
+This service, subscribed to POSTPROCESS_SUBSCRIPTION, builds every output variant of the job from that mesh
+(InferenceBackend.postprocess_raw_mesh: remesh, bake and export, inline or in the post-processing pool),
+uploads the outputs and marks the job SUCCEEDED, or FAILED and refunded, then deletes the raw mesh.
+
+    python -m solidgen_worker.postprocess_worker
+
+It loads no pipeline weights and has no GPU lane, so each fleet is sized for its own bottleneck: GPU workers
+for inference, this one for the post-processing backlog (undelivered messages on POSTPROCESS_SUBSCRIPTION).
+o_voxel's remesh and bake kernels (CuMesh, nvdiffrast) use CUDA, so TRELLIS post-processing nodes still want
+a GPU, but a small one: nothing else is resident. The fake backend runs on CPU-only nodes.
+A redelivered task starts over from the raw mesh, which stays until the job's status is final.
+"""
+
+from __future__ import annotations
+
+import logging
+import uuid
+
+from solidgen_worker import metrics
+from solidgen_worker.backends import InferenceBackend, get_backend
+from solidgen_worker.config import settings
+from solidgen_worker.db import db_conn, fetch_job, try_advisory_lock_job
+from solidgen_worker.gcs import delete_prefix_from_gcs, download_bytes_from_gcs
+from solidgen_worker.handoff import raw_mesh_prefix, raw_mesh_uri
+from solidgen_worker.main import JobLockedError, record_job_failed, record_job_succeeded, serve, setup_process, upload_job_outputs
+from solidgen_worker.outputs import parse_variants
+from solidgen_worker.stages import NO_HOOKS, MultiHooks, StageHooks, timed_stage
+
+
+logger = logging.getLogger("solidgen-worker.postprocess-service")
+
+
+def _drop_raw_mesh(job_id: uuid.UUID):
+    try:
+        delete_prefix_from_gcs(raw_mesh_prefix(job_id))
+    except Exception:
+        logger.warning("Could not delete the raw mesh (job_id=%s)", job_id, exc_info=True)
+
+
+def process_postprocess_task(job_id: uuid.UUID, *, hooks: StageHooks = NO_HOOKS, backend: InferenceBackend | None = None):
+    logger.info("Post-processing job_id=%s", job_id)
+    backend = backend or get_backend()
+    with db_conn() as conn:
+        conn.autocommit = False
+
+        if not try_advisory_lock_job(conn, job_id, stage="postprocess"):
+            conn.rollback()
+            raise JobLockedError(str(job_id))
+
+        job = fetch_job(conn, job_id)
+        if not job:
+            logger.warning("Job not found in DB; acking post-process task (job_id=%s).", job_id)
+            metrics.POSTPROCESS_TASKS.labels("not_found").inc()
+            conn.rollback()
+            _drop_raw_mesh(job_id)
+            return
+
+        status = str(job.get("status") or "")
+        if status in {"SUCCEEDED", "FAILED"}:
+            logger.info("Job already %s (job_id=%s); skipping post-process task.", status, job_id)
+            metrics.POSTPROCESS_TASKS.labels("skipped").inc()
+            conn.rollback()
+            _drop_raw_mesh(job_id)
+            return
+
+        try:
+            # Validated by the GPU worker before it ran the job.
+            params = job.get("params") or {}
+            variants = parse_variants(
+                params,
+                decimation_target=int(params.get("decimation_target") or 500_000),
+                texture_size=int(params.get("texture_size") or 2048),
+            )
+            data = timed_stage(hooks, "download", download_bytes_from_gcs, raw_mesh_uri(job_id))
+            out = backend.postprocess_raw_mesh(data, variants=variants, hooks=hooks)
+            del data
+            uris = upload_job_outputs(out, job=job, hooks=hooks)
+            record_job_succeeded(conn, job_id, out, uris)
+            metrics.POSTPROCESS_TASKS.labels("succeeded").inc()
+        except Exception as e:
+            err = f"{type(e).__name__}: {e}"
+            logger.exception("Post-processing failed (job_id=%s): %s", job_id, err)
+            conn.rollback()
+            record_job_failed(conn, job_id, err)
+            metrics.POSTPROCESS_TASKS.labels("failed").inc()
+        _drop_raw_mesh(job_id)
+
+
+def handle_postprocess_message(
+    job_id: uuid.UUID, *, hooks: StageHooks = NO_HOOKS, backend: InferenceBackend | None = None
+) -> bool:
+    """Process one post-process task. Returns True to ACK, False to NACK (retry later)."""
+    try:
+        with metrics.JOBS_IN_FLIGHT.track_inprogress():
+            process_postprocess_task(job_id, hooks=MultiHooks(metrics.METRICS_HOOKS, hooks), backend=backend)
+        return True
+    except JobLockedError:
+        logger.info("Post-process task is locked by another worker; nacking for retry. job_id=%s", job_id)
+        metrics.POSTPROCESS_TASKS.labels("locked").inc()
+        return False
+    except Exception:
+        logger.exception("Error post-processing job_id=%s; nacking for retry.", job_id)
+        metrics.POSTPROCESS_TASKS.labels("error").inc()
+        return False
+
+
+def main():
+    setup_process()
+    backend = get_backend()
+    logger.info("Post-processing service ready (backend=%s, subscription=%s)", backend.name, settings.postprocess_subscription)
+    serve(
+        subscription=settings.postprocess_subscription,
+        handle=lambda job_id: handle_postprocess_message(job_id, backend=backend),
+        max_messages=settings.max_inflight_jobs,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Input preprocessing (background removal + crop) as its own stage, ahead of the GPU lane.
+
+process_job runs it on the job's thread before backend.run, so with MAX_INFLIGHT_JOBS > 1 it overlaps
+with the previous job's inference instead of sitting inside it (the pipeline is then run with
+preprocess_image=False). Results are cached in object storage, keyed by the SHA-256 of the input
+bytes and the backend's preprocessing key (model + rembg model + PREPROCESS_CACHE_VERSION):
+
+    gs://<bucket>/<preprocess_cache_prefix>/<key>/<sha256>.png
+
+so re-runs of the same image (new seed, resolution, outputs...) skip rembg entirely.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import re
+
+from PIL import Image
+
+from solidgen_worker import metrics
+from solidgen_worker.config import settings
+from solidgen_worker.gcs import try_download_bytes_from_gcs, upload_bytes_to_gcs
+from solidgen_worker.stages import StageHooks, timed_stage
+
+
+logger = logging.getLogger("solidgen-worker.preprocess")
+
+
+def _safe(key: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", key).strip("_") or "default"
+
+
+def cache_object_name(data: bytes, preprocess_key: str) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{settings.preprocess_cache_prefix}/{_safe(preprocess_key)}-{_safe(settings.preprocess_cache_version)}/{digest}.png"
+
+
+def _encode_png(image: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")  # lossless, keeps alpha
+    return buf.getvalue()
+
+
+def decode_input(data: bytes) -> Image.Image:
+    """Decode the input image (raises on anything that isn't one). Failures here are the input's fault."""
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def _preprocess(data: bytes, image: Image.Image, backend) -> Image.Image:
+    if not settings.preprocess_cache_enabled:
+        return backend.preprocess(image)
+
+    object_name = cache_object_name(data, backend.preprocess_key())
+    uri = f"gs://{settings.gcs_bucket}/{object_name}"
+    try:
+        cached = try_download_bytes_from_gcs(uri)
+    except Exception:
+        logger.warning("Preprocess cache lookup failed (uri=%s); preprocessing", uri, exc_info=True)
+        metrics.PREPROCESS_CACHE.labels("error").inc()
+        cached = None
+    if cached is not None:
+        metrics.PREPROCESS_CACHE.labels("hit").inc()
+        out = Image.open(io.BytesIO(cached))
+        out.load()
+        return out
+
+    metrics.PREPROCESS_CACHE.labels("miss").inc()
+    out = backend.preprocess(image)
+    try:
+        upload_bytes_to_gcs(data=_encode_png(out), object_name=object_name, content_type="image/png")
+    except Exception:
+        # The job doesn't need the cache entry; the next run of this image just misses again.
+        logger.warning("Preprocess cache write failed (uri=%s)", uri, exc_info=True)
+    return out
+
+
+def preprocess_input(data: bytes, image: Image.Image, *, backend, hooks: StageHooks) -> Image.Image:
+    """The "preprocess" stage: cached (by the raw input bytes) background removal + crop of the decoded image."""
+    return timed_stage(hooks, "preprocess", _preprocess, data, image, backend)
@@ -0,0 +1,134 @@
+"""
+Early preview: a point-cloud GLB of the sparse structure, published while the rest of the job runs.
+
+The sparse-structure stage (the first sampler) yields the occupied voxels of the coarse grid long
+before the shape/texture cascades and post-processing finish. PreviewPublisher watches for that
+stage's output (a StageHooks listener), copies the coordinates off the GPU (a few thousand ints),
+and hands GLB encoding + upload + the jobs.preview_gcs_uri update to a background thread, so the
+GPU lane only pays for the copy.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+import uuid
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+from solidgen_worker import metrics
+from solidgen_worker.config import settings
+from solidgen_worker.stages import StageHooks
+
+
+logger = logging.getLogger("solidgen-worker.preview")
+
+
+PREVIEW_STAGE = "sparse_structure"
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="preview")
+
+
+def _flat_xyz(coords) -> array:
+    """Voxel coordinates as a flat int array (x, y, z, ...). coords: tensor [N, 4] (batch, x, y, z) or rows of the same."""
+    out = array("i")
+    if hasattr(coords, "detach"):
+        out.frombytes(coords[:, -3:].detach().cpu().int().contiguous().numpy().tobytes())
+    else:
+        for row in coords:
+            out.extend(row[-3:])
+    return out
+
+
+def sparse_points(xyz: array, *, max_points: int) -> array:
+    """
+    Voxel centers in the [-0.5, 0.5]^3 box the GLB export uses, z-up -> y-up like the final asset.
+    Evenly strided down to max_points.
+    """
+    n = len(xyz) // 3
+    grid = 1
+    while grid <= max(xyz, default=0):
+        grid *= 2
+    stride = max(1, -(-n // max_points)) if max_points > 0 else 1
+    positions = array("f")
+    for i in range(0, n, stride):
+        x, y, z = xyz[3 * i : 3 * i + 3]
+        positions.extend(((x + 0.5) / grid - 0.5, (z + 0.5) / grid - 0.5, 0.5 - (y + 0.5) / grid))
+    return positions
+
+
+def preview_glb(xyz: array, *, max_points: int) -> bytes:
+    from solidgen_worker.backends import glb_bytes
+
+    return glb_bytes(sparse_points(xyz, max_points=max_points))
+
+
+class PreviewPublisher(StageHooks):
+    """Per-job listener; publishes at most one preview. wait() before the job's final status update."""
+
+    def __init__(self, *, job_id: uuid.UUID, user_id: Any, started_at: float | None = None):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self.preview_seconds: float | None = None  # job start -> preview recorded on the job
+        self._future: Future | None = None
+        self._lock = threading.Lock()
+
+    def stage_finished(self, stage: str, seconds: float, output: Any = None):
+        if stage != PREVIEW_STAGE or output is None:
+            return
+        with self._lock:
+            if self._future is not None:
+                return
+            try:
+                xyz = _flat_xyz(output)
+            except Exception:
+                logger.warning("Preview skipped: unexpected sparse structure output (job_id=%s)", self.job_id, exc_info=True)
+                return
+            self._future = _executor.submit(self._publish, xyz)
+
+    def _publish(self, xyz: array):
+        from solidgen_worker.db import db_conn, set_job_preview
+        from solidgen_worker.gcs import upload_bytes_to_gcs
+
+        try:
+            data = preview_glb(xyz, max_points=settings.preview_max_points)
+            uri = upload_bytes_to_gcs(
+                data=data,
+                object_name=f"outputs/{self.user_id}/{self.job_id}/preview.glb",
+                content_type="model/gltf-binary",
+            )
+            # Own connection: the job's connection belongs to the thread running process_job.
+            with db_conn() as conn:
+                set_job_preview(conn, self.job_id, uri)
+                conn.commit()
+        except Exception:
+            metrics.PREVIEWS.labels("failed").inc()
+            logger.exception("Preview publish failed (job_id=%s)", self.job_id)
+            return
+        self.preview_seconds = time.perf_counter() - self.started_at
+        metrics.PREVIEWS.labels("published").inc()
+        metrics.TIME_TO_PREVIEW_SECONDS.observe(self.preview_seconds)
+        logger.info(
+            "Published preview (job_id=%s, uri=%s, points=%s, bytes=%s, after=%.2fs)",
+            self.job_id,
+            uri,
+            len(xyz) // 3,
+            len(data),
+            self.preview_seconds,
+        )
+
+    def wait(self, timeout: float | None = None):
+        future = self._future
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                logger.warning("Preview still publishing after %ss (job_id=%s)", timeout, self.job_id)
+
+    def finished(self, job_seconds: float):
+        """Record the preview's share of the job's wall time (time-to-first-visual / time-to-result)."""
+        if self.preview_seconds is not None and job_seconds > 0:
+            metrics.PREVIEW_FRACTION.observe(self.preview_seconds / job_seconds)
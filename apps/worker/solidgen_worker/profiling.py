@@ -0,0 +1,220 @@
+"""
+Sampled deep profiling of jobs: torch.profiler (CPU + CUDA) plus a Python stack sampler.
+
+A job is profiled when an operator flagged it (params.profile, set by the API's
+POST /internal/jobs/{job_id}/profile) or, with PROFILE_SAMPLE_RATE > 0, at random. Artifacts are uploaded
+to gs://<gcs_bucket>/<profile_prefix>/<job_id>/ once the job's status is final, and that prefix is
+recorded in jobs.profile_gcs_uri:
+  - trace.json.gz: torch.profiler Chrome trace (Perfetto / chrome://tracing), one "stage:<name>" range per stage;
+  - torch_cpu.folded, torch_cuda.folded: collapsed stacks weighted by self CPU / CUDA time;
+  - python.folded: collapsed Python stacks of the job's thread every PROFILE_PYTHON_INTERVAL_MS, rooted at
+    the running stage;
+  - summary.txt: stage seconds and the top torch ops.
+The .folded files are flame-graph input (flamegraph.pl, speedscope).
+
+Unprofiled jobs pay nothing: no hooks are installed, torch.profiler isn't imported and no sampler thread
+runs. torch.profiler is process-wide, so one job per worker is profiled at a time; a job selected while
+another is being profiled runs unprofiled (outcome "busy"). Pool post-processing runs in other processes
+and shows up as the job thread waiting on it.
+"""
+
+from __future__ import annotations
+
+import collections
+import gzip
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Any
+
+from solidgen_worker import metrics
+from solidgen_worker.config import settings
+from solidgen_worker.gcs import upload_bytes_to_gcs
+from solidgen_worker.scratch import scratch_dir
+from solidgen_worker.stages import StageHooks
+
+
+logger = logging.getLogger("solidgen-worker.profiling")
+
+
+_active = threading.Lock()
+
+
+def profile_reason(params: dict[str, Any]) -> str | None:
+    """Why this job should be profiled (flagged, sampled), or None."""
+    if params.get("profile"):
+        return "flagged"
+    if settings.profile_sample_rate > 0 and random.random() < settings.profile_sample_rate:
+        return "sampled"
+    return None
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class _StackSampler:
+    """Samples one thread's Python stack on a daemon thread; counts collapsed stacks (root first)."""
+
+    def __init__(self, *, thread_id: int, interval: float, root):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root  # () -> label of the outermost frame (the running stage)
+        self.counts: collections.Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if labels:
+                labels.append(self.root())
+                self.counts[";".join(reversed(labels))] += 1
+
+    def folded(self) -> bytes:
+        return "".join(f"{stack} {n}\n" for stack, n in self.counts.most_common()).encode("utf-8")
+
+
+class JobProfiler(StageHooks):
+    """
+    Per-job profiling session (a StageHooks listener for the stage ranges). Created and finished on the
+    job's thread by start_job_profile() / finish(); finish() always releases the per-worker slot.
+    """
+
+    def __init__(self, *, job_id: uuid.UUID, reason: str):
+        self.job_id = job_id
+        self.reason = reason
+        self.stage_seconds: dict[str, float] = {}
+        self._stages: list[str] = []
+        self._ranges: dict[str, Any] = {}
+        self._torch_profile = None
+        self._cuda = False
+        self._sampler = _StackSampler(
+            thread_id=threading.get_ident(),
+            interval=settings.profile_python_interval_ms / 1000.0,
+            root=lambda: self._stages[-1] if self._stages else "job",
+        )
+        self._started_at = time.perf_counter()
+        self._finished = False
+
+    def _start(self):
+        if settings.profile_torch:
+            try:
+                import torch
+                from torch.profiler import ProfilerActivity, profile
+            except ImportError:
+                torch = None
+            if torch is not None:
+                self._cuda = torch.cuda.is_available()
+                activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if self._cuda else [])
+                self._torch_profile = profile(activities=activities, with_stack=settings.profile_torch_stacks)
+                self._torch_profile.start()
+        self._sampler.start()
+
+    def stage_started(self, stage: str):
+        self._stages.append(stage)
+        if self._torch_profile is not None:
+            from torch.profiler import record_function
+
+            self._ranges[stage] = record_function(f"stage:{stage}").__enter__()
+
+    def stage_finished(self, stage: str, seconds: float, output: Any = None):
+        if stage in self._stages:
+            self._stages.remove(stage)
+        rng = self._ranges.pop(stage, None)
+        if rng is not None:
+            rng.__exit__(None, None, None)
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    def _stop(self) -> dict[str, bytes]:
+        self._sampler.stop()
+        for rng in reversed(list(self._ranges.values())):
+            rng.__exit__(None, None, None)
+        self._ranges.clear()
+        wall = time.perf_counter() - self._started_at
+        summary = [f"job {self.job_id} ({self.reason}) wall {wall:.3f}s", "", f"{'stage':<18} {'seconds':>9}"]
+        summary += [f"{stage:<18} {s:>9.3f}" for stage, s in self.stage_seconds.items()]
+        artifacts = {"python.folded": self._sampler.folded()}
+
+        prof = self._torch_profile
+        if prof is not None:
+            prof.stop()
+            with scratch_dir() as path:
+                trace = os.path.join(path, "trace.json")
+                prof.export_chrome_trace(trace)
+                with open(trace, "rb") as f:
+                    artifacts["trace.json.gz"] = gzip.compress(f.read(), compresslevel=6)
+                if settings.profile_torch_stacks:
+                    for name, metric in (("torch_cpu.folded", "self_cpu_time_total"), ("torch_cuda.folded", "self_cuda_time_total")):
+                        if metric == "self_cuda_time_total" and not self._cuda:
+                            continue
+                        stacks = os.path.join(path, name)
+                        prof.export_stacks(stacks, metric)
+                        with open(stacks, "rb") as f:
+                            data = f.read()
+                        if data:
+                            artifacts[name] = data
+            sort_by = "self_cuda_time_total" if self._cuda else "self_cpu_time_total"
+            summary += ["", prof.key_averages().table(sort_by=sort_by, row_limit=40)]
+        artifacts["summary.txt"] = ("\n".join(summary) + "\n").encode("utf-8")
+        return artifacts
+
+    def finish(self, *, upload: bool = True) -> str | None:
+        """Stop profiling; with upload, store the artifacts and return their gs:// prefix (None on failure)."""
+        if self._finished:
+            return None
+        self._finished = True
+        try:
+            artifacts = self._stop()
+            if not upload:
+                metrics.PROFILES.labels(self.reason, "discarded").inc()
+                return None
+            prefix = f"{settings.profile_prefix.strip('/')}/{self.job_id}"
+            for name, data in artifacts.items():
+                content_type = "application/gzip" if name.endswith(".gz") else "text/plain"
+                upload_bytes_to_gcs(data=data, object_name=f"{prefix}/{name}", content_type=content_type)
+        except Exception:
+            logger.warning("Could not save the profile of job_id=%s", self.job_id, exc_info=True)
+            metrics.PROFILES.labels(self.reason, "failed").inc()
+            return None
+        finally:
+            _active.release()
+        metrics.PROFILES.labels(self.reason, "uploaded").inc()
+        uri = f"gs://{settings.gcs_bucket}/{prefix}/"
+        logger.info("Saved profile of job_id=%s (%s): %s %s", self.job_id, self.reason, uri, sorted(artifacts))
+        return uri
+
+
+def start_job_profile(*, job_id: uuid.UUID, params: dict[str, Any]) -> JobProfiler | None:
+    """A running JobProfiler if this job is selected for profiling (see module docstring), else None."""
+    reason = profile_reason(params)
+    if reason is None:
+        return None
+    if not _active.acquire(blocking=False):
+        metrics.PROFILES.labels(reason, "busy").inc()
+        return None
+    profiler = JobProfiler(job_id=job_id, reason=reason)
+    try:
+        profiler._start()
+    except Exception:
+        logger.warning("Could not start profiling job_id=%s; running unprofiled", job_id, exc_info=True)
+        metrics.PROFILES.labels(reason, "failed").inc()
+        _active.release()
+        return None
+    logger.info("Profiling job_id=%s (%s)", job_id, reason)
+    return profiler
@@ -0,0 +1,67 @@
+"""
+Quality tiers (params.quality): sampler step counts and classifier-free guidance, relative to the
+pretrained sampler params (pipeline.json), so "standard" is exactly the pretrained behavior.
+
+Each tier scales the step count of all three samplers (sparse structure, shape SLat, texture SLat) and
+the guidance the CFG term adds over the conditional prediction. The API prices tiers
+(app.main._job_cost) and may publish drafts to their own topic (PUBSUB_DRAFT_TOPIC), served by workers
+subscribed to it. `python -m bench.quality_tiers` measures seconds per job and mesh metrics per tier;
+re-run it before changing the numbers below.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+
+DEFAULT_QUALITY = "standard"
+
+# Trellis2ImageTo3DPipeline attributes / run() kwargs <sampler>_sampler_params; also the stage names.
+SAMPLERS = ("sparse_structure", "shape_slat", "tex_slat")
+
+
+@dataclass(frozen=True)
+class QualityTier:
+    steps_scale: float = 1.0  # x the pretrained step count
+    min_steps: int = 1
+    guidance_scale: float = 1.0  # x (guidance_strength - 1); 0 = conditional prediction only
+
+
+QUALITY_TIERS: dict[str, QualityTier] = {
+    "draft": QualityTier(steps_scale=0.5, min_steps=4),
+    "standard": QualityTier(),
+    "high": QualityTier(steps_scale=1.5),
+}
+
+
+def parse_quality(value: Any) -> str:
+    quality = str(value or DEFAULT_QUALITY)
+    if quality not in QUALITY_TIERS:
+        raise ValueError(f"unknown quality {quality!r} (expected one of {', '.join(QUALITY_TIERS)})")
+    return quality
+
+
+def tier_steps(quality: str, pretrained_steps: int) -> int:
+    tier = QUALITY_TIERS[quality]
+    return max(tier.min_steps, round(pretrained_steps * tier.steps_scale))
+
+
+def sampler_overrides(quality: str, pretrained: dict[str, dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """
+    run() kwargs for a tier: {"<sampler>_sampler_params": {"steps": ..., "guidance_strength": ...}} for the
+    params the tier changes. `pretrained` maps each sampler in SAMPLERS to its pretrained params.
+    Empty for "standard".
+    """
+    tier = QUALITY_TIERS[quality]
+    out: dict[str, dict[str, Any]] = {}
+    for sampler in SAMPLERS:
+        params = pretrained.get(sampler) or {}
+        overrides: dict[str, Any] = {}
+        if tier.steps_scale != 1.0 and "steps" in params:
+            overrides["steps"] = tier_steps(quality, int(params["steps"]))
+        if tier.guidance_scale != 1.0 and "guidance_strength" in params:
+            overrides["guidance_strength"] = 1.0 + (float(params["guidance_strength"]) - 1.0) * tier.guidance_scale
+        if overrides:
+            out[f"{sampler}_sampler_params"] = overrides
+    return out
@@ -0,0 +1,82 @@
+"""
+Raw mesh handoff format: the decoded mesh a GPU worker passes to the post-processing service
+(POSTPROCESS_MODE=remote, see solidgen_worker.postprocess_worker).
+
+One object per job, gs://<gcs_bucket>/<postprocess_prefix>/<job_id>/mesh.sgrm:
+
+    b"SGRM" | u32 version | u32 header length | header (JSON) | array bytes
+
+The header is {"meta": {...}, "arrays": {name: {"dtype": "<f4", "shape": [...], "offset": ..., "nbytes": ...}}};
+offsets are relative to the first array byte, which (like every array) starts on a 64-byte boundary.
+Arrays are stored raw and little-endian in numpy dtype notation, so a reader needs neither torch nor
+pickle (the file never executes code), and can map the arrays in place. `meta` belongs to the backend
+(resolution, attribute layout, ...). TRELLIS stage checkpoints use the same container (trellis_runner).
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+from dataclasses import dataclass
+from typing import Any
+
+
+MAGIC = b"SGRM"
+VERSION = 1
+_PREAMBLE = struct.Struct("<4sII")
+_ALIGN = 64
+
+
+@dataclass(frozen=True)
+class RawArray:
+    data: memoryview  # C-contiguous bytes
+    dtype: str  # numpy dtype string, e.g. "<f4"
+    shape: tuple[int, ...]
+
+
+def raw_array(data, *, dtype: str, shape: tuple[int, ...]) -> RawArray:
+    """From anything with the buffer protocol (bytes, array.array, a contiguous numpy array)."""
+    return RawArray(memoryview(data).cast("B"), dtype, tuple(int(n) for n in shape))
+
+
+def _pad(n: int) -> int:
+    return -n % _ALIGN
+
+
+def encode_raw_mesh(arrays: dict[str, RawArray], meta: dict[str, Any]) -> bytes:
+    index: dict[str, dict[str, Any]] = {}
+    offset = 0
+    for name, a in arrays.items():
+        index[name] = {"dtype": a.dtype, "shape": list(a.shape), "offset": offset, "nbytes": a.data.nbytes}
+        offset += a.data.nbytes + _pad(a.data.nbytes)
+    header = json.dumps({"meta": meta, "arrays": index}, separators=(",", ":")).encode("utf-8")
+    header += b" " * _pad(_PREAMBLE.size + len(header))
+    parts = [_PREAMBLE.pack(MAGIC, VERSION, len(header)), header]
+    for a in arrays.values():
+        parts += [a.data, b"\0" * _pad(a.data.nbytes)]
+    return b"".join(parts)
+
+
+def decode_raw_mesh(data: bytes) -> tuple[dict[str, Any], dict[str, RawArray]]:
+    """(meta, {name: RawArray}); the arrays are views into `data`. ValueError if it isn't a raw mesh we can read."""
+    view = memoryview(data).cast("B")
+    if view.nbytes < _PREAMBLE.size:
+        raise ValueError("raw mesh: truncated")
+    magic, version, header_len = _PREAMBLE.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError("raw mesh: bad magic")
+    if version != VERSION:
+        raise ValueError(f"raw mesh: unsupported version {version}")
+    start = _PREAMBLE.size + header_len
+    try:
+        header = json.loads(bytes(view[_PREAMBLE.size : start]))
+    except ValueError as e:
+        raise ValueError(f"raw mesh: bad header ({e})") from None
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        begin = start + int(spec["offset"])
+        end = begin + int(spec["nbytes"])
+        if end > view.nbytes:
+            raise ValueError(f"raw mesh: array {name!r} is truncated")
+        arrays[name] = RawArray(view[begin:end], spec["dtype"], tuple(spec["shape"]))
+    return header["meta"], arrays
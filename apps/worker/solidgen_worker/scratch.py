@@ -0,0 +1,58 @@
+"""
+Local scratch space. Outputs are normally exported to memory and streamed to object storage;
+scratch files are only a fallback, always created under a TemporaryDirectory so they are
+removed even when the job fails.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from solidgen_worker.config import settings
+
+
+logger = logging.getLogger("solidgen-worker.scratch")
+
+
+SCRATCH_PREFIX = "solidgen_"
+
+
+def _scratch_root() -> str:
+    return settings.scratch_dir or tempfile.gettempdir()
+
+
+@contextlib.contextmanager
+def scratch_dir():
+    os.makedirs(_scratch_root(), exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix=SCRATCH_PREFIX, dir=_scratch_root()) as path:
+        yield path
+
+
+def sweep_stale_scratch(*, max_age_hours: float | None = None) -> int:
+    """Remove solidgen_* scratch dirs left by crashed runs (or older builds that never cleaned up)."""
+    max_age = (settings.scratch_max_age_hours if max_age_hours is None else max_age_hours) * 3600.0
+    root = _scratch_root()
+    removed = 0
+    now = time.time()
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if not entry.name.startswith(SCRATCH_PREFIX) or not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            if now - entry.stat(follow_symlinks=False).st_mtime < max_age:
+                continue
+            shutil.rmtree(entry.path)
+            removed += 1
+        except OSError:
+            logger.warning("Failed to remove stale scratch dir %s", entry.path, exc_info=True)
+    if removed:
+        logger.info("Removed %s stale scratch dirs under %s", removed, root)
+    return removed
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import time
+from typing import Any, Callable
+
+
+# Inference backend stages, in execution order.
+INFERENCE_STAGES = ("preprocess", "sparse_structure", "shape_slat", "tex_slat", "decode", "postprocess", "export")
+# Worker-level stages around the backend run (see main.process_job).
+WORKER_STAGES = ("download", "upload", "handoff")
+
+
+class StageHooks:
+    """
+    Observer for stage boundaries of a job. Backends and process_job call these; the default is a no-op.
+    """
+
+    def stage_started(self, stage: str):
+        pass
+
+    def stage_finished(self, stage: str, seconds: float, output: Any = None):
+        pass
+
+
+class StageRecorder(StageHooks):
+    """Collects per-stage wall time (seconds) for one job."""
+
+    def __init__(self):
+        self.seconds: dict[str, float] = {}
+
+    def stage_finished(self, stage: str, seconds: float, output: Any = None):
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+
+NO_HOOKS = StageHooks()
+
+
+def timed_stage(hooks: StageHooks, stage: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+    hooks.stage_started(stage)
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    hooks.stage_finished(stage, time.perf_counter() - t0, out)
+    return out
+
+
+class MultiHooks(StageHooks):
+    """Fan stage events out to several listeners (e.g. metrics + a per-job recorder)."""
+
+    def __init__(self, *hooks: StageHooks):
+        self.hooks = [h for h in hooks if h is not NO_HOOKS]
+
+    def stage_started(self, stage: str):
+        for h in self.hooks:
+            h.stage_started(stage)
+
+    def stage_finished(self, stage: str, seconds: float, output: Any = None):
+        for h in self.hooks:
+            h.stage_finished(stage, seconds, output)
@@ -1,23 +1,30 @@
 from __future__ import annotations
 
+import contextlib
+import functools
 import logging
 import os
 import sys
-import tempfile
+import threading
 import time
-from dataclasses import dataclass
 from typing import Any, Literal
 
 import torch
 from PIL import Image
 
-
-logger = logging.getLogger("solidgen-worker.trellis")
+from solidgen_worker import metrics
+from solidgen_worker.backends import TrellisResult, gpu_lock
+from solidgen_worker.checkpoints import CHECKPOINT_STAGES, JobCheckpoints
+from solidgen_worker.config import settings
+from solidgen_worker.outputs import OutputFile, OutputVariant, encode_group, group_variants, in_variant_order
+from solidgen_worker.postprocess_pool import SharedArrays, as_numpy, attached, get_pool, run_many_in_pool
+from solidgen_worker.quality import DEFAULT_QUALITY, SAMPLERS, sampler_overrides
+from solidgen_worker.rawmesh import decode_raw_mesh, encode_raw_mesh, raw_array
+from solidgen_worker.scratch import scratch_dir
+from solidgen_worker.stages import NO_HOOKS, MultiHooks, StageHooks, StageRecorder, timed_stage
 
 
-@dataclass(frozen=True)
-class TrellisResult:
-    glb_path: str
+logger = logging.getLogger("solidgen-worker.trellis")
 
 
 def _ensure_vendor_on_path(repo_root: str):
@@ -45,6 +52,7 @@ def _load_trellis_pipeline(model_id: str):
     from trellis2.modules import image_feature_extractor
 
     pipeline = Pipeline.from_pretrained(model_id)
+    metrics.PIPELINE_LOADS.inc()
     new_pipeline = Trellis2ImageTo3DPipeline()
     new_pipeline.__dict__ = pipeline.__dict__
     args = pipeline._pretrained_args
@@ -127,6 +135,495 @@ def _load_trellis_pipeline(model_id: str):
     return new_pipeline
 
 
+# Loaded pipelines, kept across jobs (weights stay in host memory, or on the GPU when resident).
+_pipelines: dict[str, Any] = {}
+_pipelines_lock = threading.Lock()  # preprocessing (side lane) and the GPU lane both load on demand
+
+
+def _get_pipeline(model_id: str):
+    with _pipelines_lock:
+        pipeline = _pipelines.get(model_id)
+        if pipeline is None:
+            t0 = time.time()
+            pipeline = _load_trellis_pipeline(model_id)
+            logger.info("Loaded Trellis pipeline in %.2fs", time.time() - t0)
+            _pipelines[model_id] = pipeline
+    return pipeline
+
+
+def _place_pipeline(pipeline, *, low_vram: bool):
+    """
+    low_vram=False keeps every submodule on the GPU across stages (and across jobs);
+    low_vram=True lets the pipeline move each submodule to the GPU only while it runs.
+    """
+    if low_vram and not getattr(pipeline, "low_vram", False):
+        for model in list(getattr(pipeline, "models", {}).values()) + [
+            getattr(pipeline, "image_cond_model", None),
+            getattr(pipeline, "rembg_model", None),
+        ]:
+            if model is not None and hasattr(model, "cpu"):
+                model.cpu()
+        torch.cuda.empty_cache()
+    pipeline.low_vram = low_vram
+    t0 = time.time()
+    pipeline.cuda()
+    logger.info("Placed pipeline on CUDA (low_vram=%s) in %.2fs", low_vram, time.time() - t0)
+
+
+# Optimized inference mode (INFERENCE_OPTIMIZED). Only the flow transformers (the sampler steps, where
+# nearly all inference time goes) run under autocast/torch.compile; VAE decoders, the image
+# conditioner and o_voxel post-processing keep the default precision.
+_AUTOCAST_DTYPES = {"bf16": torch.bfloat16, "fp16": torch.float16}
+
+
+def _is_flow_model(name: str) -> bool:
+    return "flow" in name
+
+
+def _to_float32(out):
+    # Sampler arithmetic (x_t - dt * v, CFG mixing) stays in fp32.
+    if isinstance(out, torch.Tensor):
+        return out.float() if out.is_floating_point() else out
+    feats = getattr(out, "feats", None)
+    if isinstance(feats, torch.Tensor) and feats.is_floating_point() and hasattr(out, "replace"):
+        return out.replace(feats.float())
+    return out
+
+
+def _enable_compile_cache():
+    # FX graph + autotuning caches on local disk, so restarts reuse compiled kernels instead of recompiling.
+    os.environ.setdefault("TORCHINDUCTOR_CACHE_DIR", os.path.expanduser(settings.inference_compile_cache_dir))
+    import torch._dynamo
+    import torch._inductor.config as inductor_config
+
+    inductor_config.fx_graph_cache = True
+    # Anything dynamo can't trace (custom sparse ops) falls back to eager instead of failing the job.
+    torch._dynamo.config.suppress_errors = True
+
+
+def _optimized_forward(model, *, dtype, compile_model: bool):
+    forward = model.forward
+    if compile_model:
+        forward = torch.compile(forward, mode=settings.inference_compile_mode, dynamic=True)
+
+    @functools.wraps(model.forward)
+    def wrapper(*args, **kwargs):
+        device_type = "cuda" if next(model.parameters()).is_cuda else "cpu"
+        with torch.autocast(device_type=device_type, dtype=dtype, enabled=dtype is not None):
+            return _to_float32(forward(*args, **kwargs))
+
+    return wrapper
+
+
+def _set_inference_mode(pipeline, *, optimized: bool):
+    """Install (or remove) the optimized forward on every flow model; idempotent per pipeline."""
+    installed: dict[str, Any] = pipeline.__dict__.setdefault("_solidgen_optimized", {})
+    if optimized == bool(installed):
+        return
+
+    models = getattr(pipeline, "models", {})
+    if not optimized:
+        torch.backends.cuda.matmul.allow_tf32, torch.backends.cudnn.allow_tf32 = installed.pop("__tf32__")
+        for name in installed:
+            del models[name].forward  # drop the instance attribute; the class forward is back
+        installed.clear()
+        logger.info("Inference mode: default")
+        return
+
+    installed["__tf32__"] = (torch.backends.cuda.matmul.allow_tf32, torch.backends.cudnn.allow_tf32)
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+
+    dtype = _AUTOCAST_DTYPES.get(settings.inference_autocast_dtype.strip().lower())
+    if settings.inference_compile:
+        _enable_compile_cache()
+    for name, model in models.items():
+        if _is_flow_model(name):
+            model.forward = _optimized_forward(model, dtype=dtype, compile_model=settings.inference_compile)
+            installed[name] = True
+    logger.info(
+        "Inference mode: optimized (autocast=%s, compile=%s, flow_models=%s)",
+        dtype,
+        settings.inference_compile,
+        [n for n in installed if n != "__tf32__"],
+    )
+
+
+# Trellis2ImageTo3DPipeline methods that delimit inference stages.
+_PIPELINE_STAGE_METHODS = {
+    "preprocess_image": "preprocess",
+    "sample_sparse_structure": "sparse_structure",
+    "sample_shape_slat": "shape_slat",
+    "sample_shape_slat_cascade": "shape_slat",
+    "sample_tex_slat": "tex_slat",
+    "decode_latent": "decode",
+}
+
+
+# Stage checkpoints (see checkpoints.py): outputs are stored on the CPU with the RNG state at the end of the
+# stage; restoring one puts the RNG back there, so later stages sample exactly as in the original run.
+# They live in the shared bucket, so they are stored as data only, never pickled: the rawmesh container,
+# with the output's structure (containers, sparse tensors, scalars) as JSON in `meta` and one array per tensor.
+_MESH_KEYS = ("vertices", "faces", "attrs", "coords")
+
+
+def _rng_state() -> dict[str, Any]:
+    return {
+        "cpu": torch.get_rng_state(),
+        "cuda": torch.cuda.get_rng_state_all() if torch.cuda.is_available() else [],
+    }
+
+
+def _set_rng_state(state: dict[str, Any]):
+    torch.set_rng_state(state["cpu"])
+    if state["cuda"] and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def _pack(obj, arrays: dict[str, Any]):
+    """Stage output -> JSON-able tree; each tensor's bytes go to `arrays` and the tree refers to it by name."""
+    if isinstance(obj, torch.Tensor):
+        tensor = obj.detach().cpu().contiguous()
+        node: dict[str, Any] = {"__tensor__": str(len(arrays))}
+        if tensor.dtype == torch.bfloat16:  # no numpy equivalent: stored as its bits
+            tensor, node["bf16"] = tensor.view(torch.int16), True
+        a = tensor.numpy()
+        arrays[node["__tensor__"]] = raw_array(a, dtype=a.dtype.str, shape=a.shape)
+        return node
+    if isinstance(obj, (list, tuple)):
+        items = [_pack(o, arrays) for o in obj]
+        return {"__tuple__": items} if isinstance(obj, tuple) else items
+    if isinstance(obj, dict) and all(isinstance(k, str) for k in obj):
+        return {"__dict__": {k: _pack(v, arrays) for k, v in obj.items()}}
+    if hasattr(obj, "feats") and hasattr(obj, "coords"):
+        return {"__sparse__": {"feats": _pack(obj.feats, arrays), "coords": _pack(obj.coords, arrays)}}
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    raise TypeError(f"can't checkpoint {type(obj).__name__}")
+
+
+def _unpack(node, arrays: dict[str, Any]):
+    """_pack's tree -> CPU tensors in plain containers; sparse tensors become {"__sparse__", feats, coords}."""
+    import numpy as np
+
+    if isinstance(node, list):
+        return [_unpack(n, arrays) for n in node]
+    if not isinstance(node, dict):
+        return node
+    if "__tensor__" in node:
+        a = arrays[node["__tensor__"]]
+        tensor = torch.from_numpy(np.frombuffer(a.data, dtype=a.dtype).reshape(a.shape).copy())
+        return tensor.view(torch.bfloat16) if node.get("bf16") else tensor
+    if "__tuple__" in node:
+        return tuple(_unpack(n, arrays) for n in node["__tuple__"])
+    if "__sparse__" in node:
+        return {"__sparse__": True, **{k: _unpack(v, arrays) for k, v in node["__sparse__"].items()}}
+    return {k: _unpack(v, arrays) for k, v in node["__dict__"].items()}
+
+
+def _to_device(obj, device: str):
+    if isinstance(obj, torch.Tensor):
+        return obj.to(device)
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_to_device(o, device) for o in obj)
+    if isinstance(obj, dict):
+        if obj.get("__sparse__"):
+            from trellis2.modules.sparse import SparseTensor
+
+            return SparseTensor(feats=obj["feats"].to(device), coords=obj["coords"].to(device))
+        return {k: _to_device(v, device) for k, v in obj.items()}
+    return obj
+
+
+def _dump_checkpoint(output) -> bytes:
+    arrays: dict[str, Any] = {}
+    tree = {"output": _pack(output, arrays), "rng": _pack(_rng_state(), arrays)}
+    return encode_raw_mesh(arrays, {"backend": "trellis", "checkpoint": tree})
+
+
+def _load_checkpoint(_stage: str, data: bytes) -> dict[str, Any]:
+    # Sparse tensors are rebuilt on the GPU lane when used.
+    meta, arrays = decode_raw_mesh(data)
+    if meta.get("backend") != "trellis" or "checkpoint" not in meta:
+        raise ValueError("not a TRELLIS checkpoint")
+    return {k: _unpack(v, arrays) for k, v in meta["checkpoint"].items()}
+
+
+def _checkpointed_stage(stage: str, fn, checkpoints: JobCheckpoints, restored: dict[str, Any], *args, **kwargs):
+    saved = restored.get(stage)
+    if saved is not None:
+        _set_rng_state(saved["rng"])
+        return _to_device(saved["output"], "cuda")
+    t0 = time.perf_counter()
+    out = fn(*args, **kwargs)
+    try:
+        payload = _dump_checkpoint(out)
+    except TypeError:
+        logger.warning("Not checkpointing %s: unsupported output", stage, exc_info=True)
+        return out
+    checkpoints.save(stage, payload, time.perf_counter() - t0)
+    return out
+
+
+@contextlib.contextmanager
+def _stage_hooks_installed(
+    pipeline, hooks: StageHooks, checkpoints: JobCheckpoints | None = None, restored: dict[str, Any] | None = None
+):
+    """
+    Wrap the pipeline's stage methods (instance attributes) so pipeline.run reports stage boundaries,
+    and, with `checkpoints`, saves each sampler's output (or returns the restored one instead of sampling).
+    """
+    installed = []
+    active: set[str] = set()  # e.g. a cascade sampler calling sample_shape_slat counts once
+
+    for method_name, stage in _PIPELINE_STAGE_METHODS.items():
+        original = getattr(pipeline, method_name, None)
+        if original is None:
+            continue
+
+        @functools.wraps(original)
+        def wrapper(*args, _original=original, _stage=stage, **kwargs):
+            if _stage in active:
+                return _original(*args, **kwargs)
+            active.add(_stage)
+            run = _original
+            if checkpoints is not None and _stage in CHECKPOINT_STAGES:
+                run = functools.partial(_checkpointed_stage, _stage, _original, checkpoints, restored or {})
+            try:
+                return timed_stage(hooks, _stage, run, *args, **kwargs)
+            finally:
+                active.discard(_stage)
+
+        setattr(pipeline, method_name, wrapper)
+        installed.append(method_name)
+    try:
+        yield
+    finally:
+        for method_name in installed:
+            delattr(pipeline, method_name)
+
+
+def load_pipeline(*, repo_root: str, model_id: str):
+    """Load (and cache) the pipeline ahead of the first job."""
+    os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+    _ensure_vendor_on_path(repo_root)
+    return _get_pipeline(model_id)
+
+
+# One preprocessing at a time: rembg runs outside gpu_lock, next to another job's inference.
+_preprocess_lock = threading.Lock()
+# Preprocessing's own rembg model, resident on the GPU. The pipeline's rembg_model is moved between devices by
+# _place_pipeline (under gpu_lock) and follows its low_vram flag, so the side lane must not touch it. The
+# planner keeps VRAM_PREPROCESS_RESERVE_MB free for this model (solidgen_worker.vram).
+_preprocessors: dict[str, Any] = {}
+
+
+def _get_preprocessor(model_id: str):
+    """Called under _preprocess_lock."""
+    preprocessor = _preprocessors.get(model_id)
+    if preprocessor is None:
+        from trellis2.pipelines.trellis2_image_to_3d import Trellis2ImageTo3DPipeline, rembg
+
+        args = _get_pipeline(model_id)._pretrained_args
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        preprocessor = Trellis2ImageTo3DPipeline()
+        preprocessor.models = {}
+        preprocessor.rembg_model = getattr(rembg, args["rembg_model"]["name"])(**args["rembg_model"]["args"])
+        preprocessor.rembg_model.to(device)
+        preprocessor.low_vram = False
+        preprocessor._device = device
+        _preprocessors[model_id] = preprocessor
+    return preprocessor
+
+
+def preprocess_key(*, repo_root: str, model_id: str) -> str:
+    """What preprocess_trellis_image's output depends on besides the input bytes (cache key part)."""
+    _ensure_vendor_on_path(repo_root)
+    args = _get_pipeline(model_id)._pretrained_args
+    return f"{model_id}/{args['rembg_model']['name']}"
+
+
+def preprocess_trellis_image(*, repo_root: str, model_id: str, image: Image.Image) -> Image.Image:
+    """Background removal + crop, as pipeline.run(preprocess_image=True) would do it, outside the GPU lane."""
+    os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+    _ensure_vendor_on_path(repo_root)
+    with _preprocess_lock, torch.inference_mode():
+        return _get_preprocessor(model_id).preprocess_image(image)
+
+
+_GLB_AABB = [[-0.5, -0.5, -0.5], [0.5, 0.5, 0.5]]
+
+
+def _export_glb_bytes(glb_mesh) -> tuple[bytes, int]:
+    """GLB as bytes without touching disk; falls back to a self-cleaning scratch file. Returns (data, scratch bytes)."""
+    try:
+        data = glb_mesh.export(file_type="glb", extension_webp=True)
+        if isinstance(data, (bytes, bytearray)):
+            return bytes(data), 0
+    except Exception:
+        logger.warning("In-memory GLB export failed; falling back to a scratch file", exc_info=True)
+    with scratch_dir() as tmp:
+        path = os.path.join(tmp, "asset.glb")
+        glb_mesh.export(path, extension_webp=True)
+        with open(path, "rb") as f:
+            data = f.read()
+    return data, len(data)
+
+
+def _export_obj_files(glb_mesh) -> dict[str, bytes]:
+    from trimesh.exchange.obj import export_obj
+
+    text, textures = export_obj(glb_mesh, include_texture=True, return_texture=True, mtl_name="material.mtl")
+    return {"model.obj": text.encode("utf-8"), **textures}
+
+
+def _postprocess_group(
+    *, vertices, faces, attrs, coords, attr_layout, resolution, variants: list[OutputVariant], hooks
+) -> tuple[list[OutputFile], int]:
+    """One remesh + bake at the group's (decimation_target, texture_size), encoded into each of its variants."""
+    import o_voxel
+
+    decimation_target, texture_size = variants[0].group_key
+    glb_mesh = timed_stage(
+        hooks,
+        "postprocess",
+        o_voxel.postprocess.to_glb,
+        vertices=vertices,
+        faces=faces,
+        attr_volume=attrs,
+        coords=coords,
+        attr_layout=attr_layout,
+        grid_size=resolution,
+        aabb=_GLB_AABB,
+        decimation_target=decimation_target,
+        texture_size=texture_size,
+        remesh=True,
+        remesh_band=1,
+        remesh_project=0,
+        use_tqdm=True,
+    )
+
+    def _export() -> tuple[list[OutputFile], int]:
+        data, scratch_bytes = _export_glb_bytes(glb_mesh)
+        files, written = encode_group(variants, glb=data, export_obj=lambda: _export_obj_files(glb_mesh))
+        return files, scratch_bytes + written
+
+    return timed_stage(hooks, "export", _export)
+
+
+def _postprocess_task(specs, **kwargs) -> tuple[dict[str, float], list[OutputFile], int]:
+    """
+    Pool child: rebuild the mesh tensors from shared memory, post-process + export one variant group.
+    Returns (stage seconds, output files, scratch bytes written); the files come back over the pool's pipe.
+    """
+    from solidgen_worker.stages import StageRecorder
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    with attached(specs) as bufs:
+        tensors = {key: torch.from_numpy(as_numpy(specs[key], buf)).to(device) for key, buf in bufs.items()}
+    recorder = StageRecorder()
+    files, scratch_bytes = _postprocess_group(**tensors, hooks=recorder, **kwargs)
+    del tensors
+    torch.cuda.empty_cache()
+    return recorder.seconds, files, scratch_bytes
+
+
+def _postprocess_inline(tensors, *, groups, hooks: StageHooks, post_kwargs) -> tuple[list[OutputFile], int]:
+    t3 = time.time()
+    files, scratch_bytes = [], 0
+    for group in groups:
+        group_files, written = _postprocess_group(**tensors, variants=group, hooks=hooks, **post_kwargs)
+        files += group_files
+        scratch_bytes += written
+    logger.info("Postprocess + export completed in %.2fs", time.time() - t3)
+    return files, scratch_bytes
+
+
+def _postprocess_in_pool(arrays: SharedArrays, *, groups, hooks: StageHooks, post_kwargs) -> tuple[list[OutputFile], int]:
+    """Variant groups are independent: one pool task each, all mapping the same shared mesh. Releases `arrays`."""
+    t3 = time.time()
+    with arrays:
+        for stage in ("postprocess", "export"):
+            hooks.stage_started(stage)  # may raise JobPreempted; the segments are released either way
+        results = run_many_in_pool(_postprocess_task, arrays, [dict(variants=g, **post_kwargs) for g in groups])
+    seconds: dict[str, float] = {}
+    files, scratch_bytes = [], 0
+    for group_seconds, group_files, written in results:
+        for stage, s in group_seconds.items():
+            seconds[stage] = seconds.get(stage, 0.0) + s
+        files += group_files
+        scratch_bytes += written
+    for stage, s in seconds.items():
+        hooks.stage_finished(stage, s)
+    wall = time.time() - t3
+    metrics.POSTPROCESS_POOL_WAIT_SECONDS.observe(max(0.0, wall - max(sum(r[0].values()) for r in results)))
+    logger.info("Postprocess + export (pool, groups=%s) completed in %.2fs", len(groups), wall)
+    return files, scratch_bytes
+
+
+# Raw mesh handoff (POSTPROCESS_MODE=remote, see solidgen_worker.rawmesh): the _MESH_KEYS arrays plus what
+# post-processing needs besides them. The attribute layout's slices are stored as [start, stop].
+def _host_array(tensor):
+    tensor = tensor.detach()
+    if tensor.dtype == torch.bfloat16:  # no numpy equivalent
+        tensor = tensor.float()
+    return tensor.cpu().contiguous().numpy()
+
+
+def _encode_raw_mesh(arrays: dict[str, Any], *, resolution: int, attr_layout: dict[str, slice]) -> bytes:
+    return encode_raw_mesh(
+        {key: raw_array(a, dtype=a.dtype.str, shape=a.shape) for key, a in arrays.items()},
+        {
+            "backend": "trellis",
+            "resolution": resolution,
+            "attr_layout": {name: [s.start, s.stop] for name, s in attr_layout.items()},
+        },
+    )
+
+
+def postprocess_raw_mesh(
+    *, repo_root: str, data: bytes, variants: list[OutputVariant], hooks: StageHooks = NO_HOOKS
+) -> TrellisResult:
+    """
+    The post-processing half of run_trellis_to_glb(handoff=True), from its raw mesh: remesh + bake + export
+    per variant group, inline or in the pool. Needs o_voxel, not the pipeline; uses CUDA when available.
+    """
+    import numpy as np
+
+    os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+    os.environ.setdefault("OPENCV_IO_ENABLE_OPENEXR", "1")
+    _ensure_vendor_on_path(repo_root)
+
+    meta, arrays = decode_raw_mesh(data)
+    if meta.get("backend") != "trellis" or set(arrays) != set(_MESH_KEYS):
+        raise ValueError(f"not a TRELLIS raw mesh (backend={meta.get('backend')!r}, arrays={sorted(arrays)})")
+    post_kwargs: dict[str, Any] = dict(
+        resolution=int(meta["resolution"]),
+        attr_layout={name: slice(start, stop) for name, (start, stop) in meta["attr_layout"].items()},
+    )
+    groups = group_variants(variants)
+    pool = get_pool()
+    if pool is None:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        tensors = {
+            key: torch.from_numpy(np.frombuffer(a.data, dtype=a.dtype).reshape(a.shape).copy()).to(device)
+            for key, a in arrays.items()
+        }
+        files, scratch_bytes = _postprocess_inline(tensors, groups=groups, hooks=hooks, post_kwargs=post_kwargs)
+        del tensors
+        torch.cuda.empty_cache()
+    else:
+        shared = SharedArrays()
+        try:
+            for key, a in arrays.items():
+                shared.add_buffer(key, a.data, dtype=a.dtype, shape=a.shape)
+        except BaseException:
+            shared.__exit__(None, None, None)
+            raise
+        files, scratch_bytes = _postprocess_in_pool(shared, groups=groups, hooks=hooks, post_kwargs=post_kwargs)
+    return TrellisResult(outputs=in_variant_order(files, variants), scratch_bytes_written=scratch_bytes)
+
+
 def run_trellis_to_glb(
     *,
     repo_root: str,
@@ -134,23 +631,32 @@ def run_trellis_to_glb(
     model_id: str,
     resolution: int,
     seed: int,
-    decimation_target: int,
-    texture_size: int,
+    variants: list[OutputVariant],
+    hooks: StageHooks = NO_HOOKS,
+    low_vram: bool = True,
+    optimized: bool = False,
+    preprocess_image: bool = True,
+    checkpoints: JobCheckpoints | None = None,
+    quality: str = DEFAULT_QUALITY,
+    handoff: bool = False,
 ) -> TrellisResult:
+    """
+    Image -> output variants. With handoff, stops after decoding instead and returns the mesh as
+    TrellisResult.raw_mesh, for postprocess_raw_mesh() on the post-processing service.
+    """
     os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
     os.environ.setdefault("OPENCV_IO_ENABLE_OPENEXR", "1")
 
     _ensure_vendor_on_path(repo_root)
 
-    import o_voxel
-
     logger.info(
-        "Starting Trellis run (model_id=%s, resolution=%s, seed=%s, decimation_target=%s, texture_size=%s)",
+        "Starting Trellis run (model_id=%s, resolution=%s, quality=%s, seed=%s, variants=%s, low_vram=%s)",
         model_id,
         resolution,
+        quality,
         seed,
-        decimation_target,
-        texture_size,
+        [f"{v.name}:{v.format}/{v.compression}@{v.decimation_target}/{v.texture_size}" for v in variants],
+        low_vram,
     )
     logger.info(
         "Torch CUDA available=%s, torch_cuda=%s, device_count=%s",
@@ -166,53 +672,91 @@ def run_trellis_to_glb(
         except Exception:
             logger.exception("Failed to query CUDA device info")
 
-    t0 = time.time()
-    pipeline = _load_trellis_pipeline(model_id)
-    logger.info("Loaded Trellis pipeline in %.2fs", time.time() - t0)
-
-    t1 = time.time()
-    pipeline.cuda()
-    logger.info("Moved pipeline to CUDA in %.2fs", time.time() - t1)
-
     pipeline_type = {512: "512", 1024: "1024_cascade", 1536: "1536_cascade"}[resolution]
-
-    t2 = time.time()
-    outputs = pipeline.run(
-        image,
-        seed=seed,
-        preprocess_image=True,
-        pipeline_type=pipeline_type,
-        return_latent=False,
-    )
-    logger.info("Pipeline inference completed in %.2fs", time.time() - t2)
-    mesh = outputs[0]
-    mesh.simplify(16777216)  # nvdiffrast limit
-
-    t3 = time.time()
-    glb_mesh = o_voxel.postprocess.to_glb(
-        vertices=mesh.vertices,
-        faces=mesh.faces,
-        attr_volume=mesh.attrs,
-        coords=mesh.coords,
-        attr_layout=pipeline.pbr_attr_layout,
-        grid_size=resolution,
-        aabb=[[-0.5, -0.5, -0.5], [0.5, 0.5, 0.5]],
-        decimation_target=decimation_target,
-        texture_size=texture_size,
-        remesh=True,
-        remesh_band=1,
-        remesh_project=0,
-        use_tqdm=True,
+    groups = group_variants(variants)
+    post_kwargs: dict[str, Any] = dict(resolution=resolution)
+    pool = None if handoff else get_pool()
+    restored = checkpoints.restore(_load_checkpoint) if checkpoints is not None else {}
+
+    # One job at a time on the GPU lane; with the pool, post-processing happens after the lane is released.
+    with gpu_lock:
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()  # solidgen_worker_gpu_memory_peak_bytes is per job
+
+        pipeline = _get_pipeline(model_id)
+        post_kwargs["attr_layout"] = pipeline.pbr_attr_layout
+        if "mesh" in restored:
+            # Preempted after decoding: straight to post-processing.
+            device = "cpu" if handoff or pool is not None else "cuda"
+            tensors = {key: _to_device(restored["mesh"]["output"][key], device) for key in _MESH_KEYS}
+            logger.info("Resuming from the mesh checkpoint; skipping inference")
+        else:
+            _place_pipeline(pipeline, low_vram=low_vram)
+            _set_inference_mode(pipeline, optimized=optimized)
+
+            # Partial params; the pipeline merges them over its pretrained sampler params.
+            sampler_params = sampler_overrides(
+                quality, {s: getattr(pipeline, f"{s}_sampler_params", None) or {} for s in SAMPLERS}
+            )
+            if sampler_params:
+                logger.info("Sampler overrides for quality=%s: %s", quality, sampler_params)
+
+            t2 = time.time()
+            recorder = StageRecorder()
+            with _stage_hooks_installed(pipeline, MultiHooks(hooks, recorder), checkpoints, restored):
+                outputs = pipeline.run(
+                    image,
+                    seed=seed,
+                    preprocess_image=preprocess_image,
+                    pipeline_type=pipeline_type,
+                    return_latent=False,
+                    **sampler_params,
+                )
+            logger.info("Pipeline inference completed in %.2fs", time.time() - t2)
+            t_simplify = time.perf_counter()
+            mesh = outputs[0]
+            mesh.simplify(16777216)  # nvdiffrast limit
+            tensors = {key: getattr(mesh, key) for key in _MESH_KEYS}
+            del outputs, mesh
+            if checkpoints is not None:
+                checkpoints.save(
+                    "mesh",
+                    _dump_checkpoint(tensors),
+                    recorder.seconds.get("decode", 0.0) + time.perf_counter() - t_simplify,
+                )
+
+        host, arrays = None, None
+        if handoff:
+            host = {key: _host_array(tensors[key]) for key in _MESH_KEYS}
+        elif pool is None:
+            files, scratch_bytes = _postprocess_inline(tensors, groups=groups, hooks=hooks, post_kwargs=post_kwargs)
+        else:
+            arrays = SharedArrays()
+            try:
+                for key in _MESH_KEYS:
+                    arrays.add_tensor(key, tensors[key])
+            except BaseException:
+                arrays.__exit__(None, None, None)
+                raise
+        gpu_peak_bytes = torch.cuda.max_memory_allocated() if torch.cuda.is_available() else None
+        del tensors
+        torch.cuda.empty_cache()
+
+    if host is not None:
+        raw_mesh = _encode_raw_mesh(host, **post_kwargs)
+        logger.info("Raw mesh for handoff: %s bytes (%s)", len(raw_mesh), {k: tuple(a.shape) for k, a in host.items()})
+        return TrellisResult(outputs=[], raw_mesh=raw_mesh, gpu_peak_bytes=gpu_peak_bytes)
+    if arrays is not None:
+        files, scratch_bytes = _postprocess_in_pool(arrays, groups=groups, hooks=hooks, post_kwargs=post_kwargs)
+
+    files = in_variant_order(files, variants)
+    logger.info(
+        "Exported outputs (%s, scratch_bytes_written=%s)",
+        ", ".join(f"{f.name}={len(f.data)}B" for f in files),
+        scratch_bytes,
     )
-    logger.info("Postprocess to GLB completed in %.2fs", time.time() - t3)
-
-    tmpdir = tempfile.mkdtemp(prefix="solidgen_")
-    glb_path = os.path.join(tmpdir, "asset.glb")
-    glb_mesh.export(glb_path, extension_webp=True)
-    torch.cuda.empty_cache()
-    logger.info("Wrote output GLB: %s", glb_path)
 
-    return TrellisResult(glb_path=glb_path)
+    return TrellisResult(outputs=files, scratch_bytes_written=scratch_bytes, gpu_peak_bytes=gpu_peak_bytes)
 
 
 
@@ -0,0 +1,165 @@
+"""
+GPU memory-aware admission.
+
+Keeps a per-(resolution, texture_size, mode) peak-memory profile built from past runs
+(torch.cuda.max_memory_allocated, which includes weights already resident from a cached
+pipeline) and compares it with the memory this process can use right now:
+free device memory + what our caching allocator already holds, minus VRAM_PREPROCESS_RESERVE_MB for the
+preprocessing lane (its rembg model runs next to inference, outside gpu_lock) and VRAM_POSTPROCESS_RESERVE_MB
+per post-processing pool worker (o_voxel runs on CUDA in those processes while the next job infers).
+
+plan() then picks, in order:
+  - resident (low_vram=False): all submodules stay on the GPU, no CPU<->GPU shuffling;
+  - low_vram: submodules are moved to the GPU only while in use;
+  - (opt-in) the same at a smaller texture size;
+  - defer (nack, retry later / on another worker) if it would fit on an idle GPU;
+  - reject if it can't fit even on an idle GPU.
+Unknown configurations are admitted in low_vram mode; their first run seeds the profile.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+from solidgen_worker.config import settings
+
+
+logger = logging.getLogger("solidgen-worker.vram")
+
+
+MODE_RESIDENT = "resident"
+MODE_LOW_VRAM = "low_vram"
+
+
+@dataclass(frozen=True)
+class VramPlan:
+    fits: bool  # run now
+    low_vram: bool
+    texture_size: int
+    estimated_peak_bytes: int | None = None
+    budget_bytes: int | None = None
+    never_fits: bool = False  # exceeds total device memory even in low_vram mode
+
+    @property
+    def mode(self) -> str:
+        return MODE_LOW_VRAM if self.low_vram else MODE_RESIDENT
+
+
+def _key(resolution: int, texture_size: int, mode: str) -> str:
+    return f"{resolution}/{texture_size}/{mode}"
+
+
+class VramProfile:
+    """Peak bytes per (resolution, texture_size, mode), persisted as JSON across restarts."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+        self._peaks: dict[str, int] = {}
+        try:
+            with open(self.path) as f:
+                self._peaks = {k: int(v) for k, v in json.load(f).get("peak_bytes", {}).items()}
+        except FileNotFoundError:
+            pass
+        except Exception:
+            logger.exception("Ignoring unreadable VRAM profile %s", self.path)
+
+    def peak(self, resolution: int, texture_size: int, mode: str) -> int | None:
+        return self._peaks.get(_key(resolution, texture_size, mode))
+
+    def record(self, resolution: int, texture_size: int, mode: str, peak_bytes: int):
+        key = _key(resolution, texture_size, mode)
+        with self._lock:
+            if peak_bytes <= self._peaks.get(key, 0):
+                return
+            self._peaks[key] = int(peak_bytes)
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"peak_bytes": self._peaks}, f, indent=2, sort_keys=True)
+                os.replace(tmp, self.path)
+            except Exception:
+                logger.exception("Failed to persist VRAM profile %s", self.path)
+
+
+def _postprocess_workers() -> int:
+    """Pool workers post-processing on this GPU next to the lane (none inline, or with the split pipeline)."""
+    from solidgen_worker.postprocess_pool import pool_size
+
+    if settings.postprocess_mode == "remote":
+        return 0
+    return max(0, pool_size())
+
+
+def _device_memory() -> tuple[int, int] | None:
+    """(usable_bytes, total_bytes) for this process, or None without CUDA."""
+    import torch
+
+    if not torch.cuda.is_available():
+        return None
+    free, total = torch.cuda.mem_get_info()
+    # Blocks our caching allocator reserved (cached pipeline, freed activations) are reusable by us, except
+    # what the preprocessing lane and the post-processing pool may be holding at any moment.
+    reserve_mb = settings.vram_preprocess_reserve_mb + _postprocess_workers() * settings.vram_postprocess_reserve_mb
+    reserve = reserve_mb * 1024 * 1024
+    return max(0, free + torch.cuda.memory_reserved() - reserve), total - reserve
+
+
+class VramPlanner:
+    def __init__(self, profile: VramProfile | None = None):
+        self.profile = profile or VramProfile(settings.vram_profile_path)
+
+    def _fits(self, peak: int | None, budget: int) -> bool:
+        return peak is not None and peak <= budget * (1.0 - settings.vram_headroom_fraction)
+
+    def plan(self, *, resolution: int, texture_size: int) -> VramPlan:
+        forced = settings.vram_low_vram.strip().lower()
+        mem = _device_memory()
+        if mem is None or forced in {"always", "never"}:
+            return VramPlan(fits=True, low_vram=forced != "never", texture_size=texture_size)
+        budget, total = mem
+
+        texture_sizes = [texture_size]
+        if settings.vram_allow_texture_downgrade:
+            t = texture_size // 2
+            while t >= settings.vram_min_texture_size:
+                texture_sizes.append(t)
+                t //= 2
+
+        for tex in texture_sizes:
+            resident = self.profile.peak(resolution, tex, MODE_RESIDENT)
+            if self._fits(resident, budget):
+                return VramPlan(True, False, tex, resident, budget)
+            low = self.profile.peak(resolution, tex, MODE_LOW_VRAM)
+            if low is None or self._fits(low, budget):
+                return VramPlan(True, True, tex, low, budget)
+
+        low = self.profile.peak(resolution, texture_sizes[-1], MODE_LOW_VRAM)
+        never = not self._fits(low, total)
+        return VramPlan(False, True, texture_sizes[-1], low, budget, never_fits=never)
+
+    def record_peak(self, *, resolution: int, texture_size: int, low_vram: bool, peak_bytes: int | None):
+        if peak_bytes:
+            mode = MODE_LOW_VRAM if low_vram else MODE_RESIDENT
+            self.profile.record(resolution, texture_size, mode, peak_bytes)
+
+    def record_oom(self, *, resolution: int, texture_size: int, low_vram: bool, budget_bytes: int | None):
+        # The run needed more than what was usable at admission; make sure plan() won't pick this again.
+        if budget_bytes:
+            mode = MODE_LOW_VRAM if low_vram else MODE_RESIDENT
+            self.profile.record(resolution, texture_size, mode, int(budget_bytes * 1.05))
+
+
+_planner: VramPlanner | None = None
+
+
+def get_planner() -> VramPlanner:
+    global _planner
+    if _planner is None:
+        _planner = VramPlanner()
+    return _planner
@@ -0,0 +1,296 @@
+"""
+Worker-managed model weight store (WEIGHTS_DIR, ideally on local SSD).
+
+    <weights_dir>/hf/      HF_HOME    (TRELLIS checkpoints, DINOv3, rembg model)
+    <weights_dir>/torch/   TORCH_HOME (torch.hub: DINOv2 repo + checkpoint)
+    <weights_dir>/manifest.json  {relative path: {"size": n, "sha256": ...}} of the last complete prefetch
+
+At boot, before the subscription starts:
+  1. configure_weight_store() points the HF / torch.hub caches at the store (before anything imports them);
+  2. prefetch_weights() verifies the files against the manifest (size, or sha256 with WEIGHTS_VERIFY=sha256).
+     If the store is complete, the hubs are switched to offline mode and nothing touches the network;
+     otherwise the missing weights are downloaded (unless WEIGHTS_OFFLINE) and the manifest rewritten;
+  3. the checkpoint files get a readahead hint, so the pipeline load that follows reads from page cache.
+
+TRELLIS loads its .safetensors through safetensors' mmap-backed loader, so with the store on local SSD a cold
+load is bound by the SSD, not by network or persistent-disk throughput.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from solidgen_worker.config import settings
+
+
+logger = logging.getLogger("solidgen-worker.weights")
+
+
+_MANIFEST = "manifest.json"
+_CHECKPOINT_SUFFIXES = (".safetensors", ".pt", ".pth", ".bin", ".ckpt")
+
+
+class WeightStoreError(Exception):
+    """The store is incomplete and may not be (re)populated (WEIGHTS_OFFLINE)."""
+
+
+@dataclass
+class PrefetchReport:
+    offline: bool = False  # served entirely from the store, no network
+    downloaded: list[str] = field(default_factory=list)  # repos / hub models fetched this boot
+    files: int = 0
+    bytes: int = 0
+    verify_seconds: float = 0.0
+    download_seconds: float = 0.0
+
+
+def _root() -> str | None:
+    return os.path.expanduser(settings.weights_dir) if settings.weights_dir else None
+
+
+def configure_weight_store():
+    """Point the HF / torch.hub caches at the store. Call before huggingface_hub / transformers / torch.hub load."""
+    root = _root()
+    if not root:
+        return
+    os.makedirs(root, exist_ok=True)
+    os.environ.setdefault("HF_HOME", os.path.join(root, "hf"))
+    os.environ.setdefault("TORCH_HOME", os.path.join(root, "torch"))
+
+
+def _set_offline():
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+    # huggingface_hub reads HF_HUB_OFFLINE at import; if a download already imported it, flip the constant too.
+    constants = sys.modules.get("huggingface_hub.constants")
+    if constants is not None:
+        constants.HF_HUB_OFFLINE = True
+
+
+def _walk(root: str) -> list[str]:
+    out = []
+    for dirpath, _dirnames, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            rel = os.path.relpath(path, root)
+            # hf "blobs" are the real files; "snapshots" symlink to them. Skip temp / lock files.
+            if rel == _MANIFEST or name.endswith((".lock", ".incomplete", ".tmp")) or os.path.islink(path):
+                continue
+            out.append(rel)
+    return sorted(out)
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(8 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _load_manifest(root: str) -> dict[str, dict[str, Any]] | None:
+    try:
+        with open(os.path.join(root, _MANIFEST)) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Ignoring unreadable weight manifest in %s", root, exc_info=True)
+        return None
+    if data.get("key") != _store_key():
+        logger.info("Weight manifest is for %s; re-verifying for %s", data.get("key"), _store_key())
+        return None
+    return data.get("files")
+
+
+def _write_manifest(root: str, files: list[str]):
+    entries = {}
+    for rel in files:
+        path = os.path.join(root, rel)
+        entries[rel] = {"size": os.path.getsize(path)}
+        if settings.weights_verify == "sha256":
+            entries[rel]["sha256"] = _sha256(path)
+    tmp = os.path.join(root, f"{_MANIFEST}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"key": _store_key(), "written_at": time.time(), "files": entries}, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(root, _MANIFEST))
+
+
+def _verify(root: str, files: dict[str, dict[str, Any]]) -> list[str]:
+    """Relative paths that are missing or don't match the manifest."""
+    if settings.weights_verify == "none":
+        return []
+    bad = []
+    for rel, meta in files.items():
+        path = os.path.join(root, rel)
+        try:
+            if os.path.getsize(path) != meta["size"]:
+                bad.append(rel)
+            elif settings.weights_verify == "sha256" and meta.get("sha256") and _sha256(path) != meta["sha256"]:
+                bad.append(rel)
+        except OSError:
+            bad.append(rel)
+    return bad
+
+
+def _readahead(root: str, files: list[str]):
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for rel in files:
+        if rel.endswith(_CHECKPOINT_SUFFIXES):
+            try:
+                fd = os.open(os.path.join(root, rel), os.O_RDONLY)
+                try:
+                    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+
+
+def _image_model_plan() -> tuple[str | None, str | None]:
+    """(DINOv3 HF repo or None, DINOv2 hub model or None) the pipeline loader will ask for (see trellis_runner)."""
+    kind = (os.environ.get("TRELLIS_IMAGE_MODEL_KIND") or "").strip().lower()
+    override = (os.environ.get("TRELLIS_IMAGE_MODEL_ID") or "").strip() or None
+    has_token = bool((os.environ.get("HF_TOKEN") or os.environ.get("HUGGINGFACE_HUB_TOKEN") or "").strip())
+    dinov2 = override if kind in {"dinov2", "dino2"} and override else os.environ.get("TRELLIS_DINOV2_MODEL", "dinov2_vitg14")
+    if kind in {"dinov2", "dino2"}:
+        return None, dinov2
+    if kind in {"dinov3", "dino3"} or has_token:
+        return override or "", dinov2  # "" = take it from pipeline.json; dinov2 is the gated-repo fallback
+    return None, dinov2
+
+
+def _store_key() -> str:
+    dinov3, dinov2 = _image_model_plan()
+    return f"{settings.trellis_model_id}|{dinov3}|{dinov2}"
+
+
+def _pipeline_args(snapshot_dir: str) -> dict[str, Any]:
+    with open(os.path.join(snapshot_dir, "pipeline.json")) as f:
+        return json.load(f).get("args", {})
+
+
+def _pipeline_repos(snapshot_dir: str, args: dict[str, Any]) -> list[tuple[str, list[str] | None]]:
+    """Other HF repos the TRELLIS pipeline.json references (checkpoints, rembg model): (repo_id, allow_patterns)."""
+    repos: list[tuple[str, list[str] | None]] = []
+    for path in args.get("models", {}).values():
+        parts = str(path).split("/")
+        # Like the TRELLIS loader: a path inside the model repo first, else "<org>/<repo>/<path in repo>".
+        if len(parts) > 2 and not os.path.exists(os.path.join(snapshot_dir, f"{path}.json")):
+            repos.append((f"{parts[0]}/{parts[1]}", [f"{'/'.join(parts[2:])}.*"]))
+    rembg = (args.get("rembg_model") or {}).get("args", {}).get("model_name")
+    if rembg:
+        repos.append((rembg, None))
+    return repos
+
+
+def _download(report: PrefetchReport):
+    from huggingface_hub import snapshot_download
+
+    t0 = time.perf_counter()
+    snapshot = snapshot_download(settings.trellis_model_id)
+    args = _pipeline_args(snapshot)
+    report.downloaded.append(settings.trellis_model_id)
+    for repo_id, patterns in _pipeline_repos(snapshot, args):
+        snapshot_download(repo_id, allow_patterns=patterns)
+        report.downloaded.append(repo_id)
+
+    dinov3, dinov2 = _image_model_plan()
+    need_dinov2 = dinov3 is None
+    if dinov3 is not None:
+        dinov3 = dinov3 or (args.get("image_cond_model") or {}).get("args", {}).get("model_name")
+        try:
+            snapshot_download(dinov3)
+            report.downloaded.append(dinov3)
+        except Exception as e:
+            # Gated repo without access: the loader falls back to DINOv2, so that's what has to be in the store.
+            logger.warning("Could not prefetch %s (%s); prefetching the DINOv2 fallback", dinov3, e)
+            need_dinov2 = True
+    if need_dinov2 and dinov2:
+        import torch
+
+        torch.hub.load("facebookresearch/dinov2", dinov2)  # caches the repo + checkpoint under TORCH_HOME
+        report.downloaded.append(f"torch.hub:facebookresearch/dinov2:{dinov2}")
+    report.download_seconds = time.perf_counter() - t0
+
+
+def prefetch_weights() -> PrefetchReport:
+    """Make sure every weight the TRELLIS backend loads is in the store; go offline if it is. See module docstring."""
+    report = PrefetchReport()
+    root = _root()
+    if not root:
+        return report
+
+    t0 = time.perf_counter()
+    manifest = _load_manifest(root)
+    bad = _verify(root, manifest) if manifest else None
+    report.verify_seconds = time.perf_counter() - t0
+    if manifest and not bad:
+        _set_offline()
+        report.offline = True
+    else:
+        if bad:
+            logger.warning("Weight store has %s missing/corrupt file(s), e.g. %s", len(bad), bad[:3])
+            for rel in bad:
+                # Let the hub re-fetch them instead of trusting a truncated blob.
+                try:
+                    os.remove(os.path.join(root, rel))
+                except OSError:
+                    pass
+        if settings.weights_offline:
+            raise WeightStoreError(f"Weight store {root} is incomplete and WEIGHTS_OFFLINE is set")
+        _download(report)
+        _write_manifest(root, _walk(root))
+        _set_offline()
+
+    files = _walk(root)
+    report.files = len(files)
+    report.bytes = sum(os.path.getsize(os.path.join(root, rel)) for rel in files)
+    _readahead(root, files)
+    logger.info(
+        "Weight store ready (dir=%s, offline=%s, files=%s, bytes=%s, verify=%.2fs, download=%.2fs, downloaded=%s)",
+        root,
+        report.offline,
+        report.files,
+        report.bytes,
+        report.verify_seconds,
+        report.download_seconds,
+        report.downloaded,
+    )
+    return report
+
+
+def main() -> int:
+    """Populate / verify the store ahead of time (image bake, setup script): python -m solidgen_worker.weights"""
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dir", default=None, help="override WEIGHTS_DIR")
+    parser.add_argument("--verify", choices=["size", "sha256", "none"], default=None, help="override WEIGHTS_VERIFY")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if args.dir:
+        settings.weights_dir = args.dir
+    if args.verify:
+        settings.weights_verify = args.verify
+    if not settings.weights_dir:
+        parser.error("WEIGHTS_DIR (or --dir) is required")
+    configure_weight_store()
+    try:
+        prefetch_weights()
+    except WeightStoreError as e:
+        logger.error("%s", e)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,14 @@ export CLOUD_RUN_WEB_SERVICE="${CLOUD_RUN_WEB_SERVICE:-solidgen-web}"
 
 export PUBSUB_TOPIC="${PUBSUB_TOPIC:-solidgen-jobs}"
 export PUBSUB_SUBSCRIPTION="${PUBSUB_SUBSCRIPTION:-solidgen-jobs-sub}"
+# Draft-quality lane: the API publishes draft jobs to PUBSUB_DRAFT_TOPIC (empty = the main topic),
+# served by worker VMs set up with WORKER_LANE=draft.
+export PUBSUB_DRAFT_TOPIC="${PUBSUB_DRAFT_TOPIC:-}"
+export PUBSUB_DRAFT_SUBSCRIPTION="${PUBSUB_DRAFT_SUBSCRIPTION:-solidgen-jobs-draft-sub}"
+# Split pipeline: non-empty = GPU workers stop after decoding and hand the raw mesh to a post-processing fleet
+# through this topic (POSTPROCESS_MODE=remote); those VMs are set up with WORKER_ROLE=postprocess.
+export POSTPROCESS_TOPIC="${POSTPROCESS_TOPIC:-}"
+export POSTPROCESS_SUBSCRIPTION="${POSTPROCESS_SUBSCRIPTION:-solidgen-postprocess-sub}"
 
 # Buckets are globally unique; include project id to avoid collisions
 export GCS_BUCKET="${GCS_BUCKET:-${PROJECT_ID}-assets}"
@@ -32,6 +40,10 @@ export WORKER_VM="${WORKER_VM:-solidgen-worker}"
 export WORKER_MACHINE_TYPE="${WORKER_MACHINE_TYPE:-n2-standard-8}"
 export WORKER_GPU_TYPE="${WORKER_GPU_TYPE:-nvidia-tesla-a10}"
 export WORKER_GPU_COUNT="${WORKER_GPU_COUNT:-1}"
+# 1 = attach a local NVMe SSD (375GB) for the model weight store (WEIGHTS_DIR); wiped on stop, re-prefetched at boot.
+export WORKER_LOCAL_SSD="${WORKER_LOCAL_SSD:-1}"
+# 1 = Spot VM (preemptible, 30s notice); in-flight jobs checkpoint to GCS and resume on another worker.
+export WORKER_SPOT="${WORKER_SPOT:-0}"
 
 echo "PROJECT_ID=$PROJECT_ID"
 echo "REGION=$REGION"
@@ -31,6 +31,20 @@ gcloud pubsub topics describe "$PUBSUB_TOPIC" >/dev/null 2>&1 || \
 gcloud pubsub subscriptions describe "$PUBSUB_SUBSCRIPTION" >/dev/null 2>&1 || \
   gcloud pubsub subscriptions create "$PUBSUB_SUBSCRIPTION" --topic="$PUBSUB_TOPIC" >/dev/null
 
+if [ -n "$PUBSUB_DRAFT_TOPIC" ]; then
+  gcloud pubsub topics describe "$PUBSUB_DRAFT_TOPIC" >/dev/null 2>&1 || \
+    gcloud pubsub topics create "$PUBSUB_DRAFT_TOPIC" >/dev/null
+  gcloud pubsub subscriptions describe "$PUBSUB_DRAFT_SUBSCRIPTION" >/dev/null 2>&1 || \
+    gcloud pubsub subscriptions create "$PUBSUB_DRAFT_SUBSCRIPTION" --topic="$PUBSUB_DRAFT_TOPIC" >/dev/null
+fi
+
+if [ -n "$POSTPROCESS_TOPIC" ]; then
+  gcloud pubsub topics describe "$POSTPROCESS_TOPIC" >/dev/null 2>&1 || \
+    gcloud pubsub topics create "$POSTPROCESS_TOPIC" >/dev/null
+  gcloud pubsub subscriptions describe "$POSTPROCESS_SUBSCRIPTION" >/dev/null 2>&1 || \
+    gcloud pubsub subscriptions create "$POSTPROCESS_SUBSCRIPTION" --topic="$POSTPROCESS_TOPIC" >/dev/null
+fi
+
 echo "Creating service accounts (if needed)..."
 gcloud iam service-accounts describe "${API_SA}@${PROJECT_ID}.iam.gserviceaccount.com" >/dev/null 2>&1 || \
   gcloud iam service-accounts create "$API_SA" --display-name="Solidgen API" >/dev/null
@@ -62,6 +76,13 @@ gcloud projects add-iam-policy-binding "$PROJECT_ID" \
   --member="serviceAccount:${WORKER_SA_EMAIL}" \
   --role="roles/storage.objectAdmin" >/dev/null
 
+if [ -n "$POSTPROCESS_TOPIC" ]; then
+  # GPU workers publish handed-off jobs to the post-processing topic.
+  gcloud pubsub topics add-iam-policy-binding "$POSTPROCESS_TOPIC" \
+    --member="serviceAccount:${WORKER_SA_EMAIL}" \
+    --role="roles/pubsub.publisher" >/dev/null
+fi
+
 gcloud projects add-iam-policy-binding "$PROJECT_ID" \
   --member="serviceAccount:${WORKER_SA_EMAIL}" \
   --role="roles/cloudsql.client" >/dev/null
@@ -93,6 +114,14 @@ else
   echo "Secret $DB_PASSWORD_SECRET already exists."
 fi
 
+echo "Ensuring internal API token secret exists..."
+INTERNAL_TOKEN_SECRET="solidgen-internal-api-token"
+if ! gcloud secrets describe "$INTERNAL_TOKEN_SECRET" >/dev/null 2>&1; then
+  openssl rand -hex 32 | tr -d '\n' | gcloud secrets create "$INTERNAL_TOKEN_SECRET" --data-file=- >/dev/null
+else
+  echo "Secret $INTERNAL_TOKEN_SECRET already exists."
+fi
+
 echo "Creating DB user (if needed)..."
 DB_PASS="$(gcloud secrets versions access latest --secret="$DB_PASSWORD_SECRET")"
 gcloud sql users create "$DB_USER" \
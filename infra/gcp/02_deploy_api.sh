@@ -14,9 +14,27 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 REPO_ROOT="$(cd "${SCRIPT_DIR}/../.." && pwd)"
 gcloud builds submit --tag "$IMAGE" "${REPO_ROOT}/apps/api"
 
-echo "Deploying Cloud Run API service: $CLOUD_RUN_API_SERVICE"
 CLOUDSQL_CONN_NAME="$(gcloud sql instances describe "$CLOUDSQL_INSTANCE" --format='value(connectionName)')"
 
+echo "Running schema migrations (Cloud Run job: ${CLOUD_RUN_API_SERVICE}-migrate)"
+gcloud run jobs deploy "${CLOUD_RUN_API_SERVICE}-migrate" \
+  --image "$IMAGE" \
+  --region "$REGION" \
+  --service-account "$API_SA_EMAIL" \
+  --command "alembic" \
+  --args "upgrade,head" \
+  --max-retries 0 \
+  --set-env-vars "CLOUDSQL_INSTANCE_CONNECTION_NAME=$CLOUDSQL_CONN_NAME" \
+  --set-env-vars "DB_NAME=$DB_NAME" \
+  --set-env-vars "DB_USER=$DB_USER" \
+  --set-secrets "DB_PASSWORD=solidgen-db-password:latest" \
+  --set-cloudsql-instances "$CLOUDSQL_CONN_NAME"
+gcloud run jobs execute "${CLOUD_RUN_API_SERVICE}-migrate" --region "$REGION" --wait
+
+echo "Deploying Cloud Run API service: $CLOUD_RUN_API_SERVICE"
+
+# --no-cpu-throttling: the webhook consumer (WEBHOOK_CONSUMER_ENABLED, on by default) is a thread that
+# drains the queue between requests; with request-only CPU it would stall until the next request.
 gcloud run deploy "$CLOUD_RUN_API_SERVICE" \
   --image "$IMAGE" \
   --region "$REGION" \
@@ -24,15 +42,19 @@ gcloud run deploy "$CLOUD_RUN_API_SERVICE" \
   --service-account "$API_SA_EMAIL" \
   --cpu 2 \
   --memory 2Gi \
+  --cpu-boost \
+  --no-cpu-throttling \
   --set-env-vars "GCP_PROJECT_ID=$PROJECT_ID" \
   --set-env-vars "GCS_BUCKET=$GCS_BUCKET" \
   --set-env-vars "PUBSUB_TOPIC=$PUBSUB_TOPIC" \
+  --set-env-vars "PUBSUB_DRAFT_TOPIC=$PUBSUB_DRAFT_TOPIC" \
   --set-env-vars "GCS_SIGNER_SERVICE_ACCOUNT_EMAIL=$API_SA_EMAIL" \
   --set-env-vars "CLOUDSQL_INSTANCE_CONNECTION_NAME=$CLOUDSQL_CONN_NAME" \
   --set-env-vars "DB_NAME=$DB_NAME" \
   --set-env-vars "DB_USER=$DB_USER" \
   --set-secrets "DB_PASSWORD=solidgen-db-password:latest" \
   --set-secrets "JWT_SECRET=solidgen-jwt-secret:latest" \
+  --set-secrets "INTERNAL_API_TOKEN=solidgen-internal-api-token:latest" \
   --set-secrets "STRIPE_SECRET_KEY=solidgen-stripe-secret-key:latest" \
   --set-secrets "STRIPE_WEBHOOK_SECRET=solidgen-stripe-webhook-secret:latest" \
   --set-secrets "NOWPAYMENTS_API_KEY=solidgen-nowpayments-api-key:latest" \
@@ -7,7 +7,7 @@ gcloud config set project "$PROJECT_ID" >/dev/null
 
 WORKER_SA_EMAIL="${WORKER_SA}@${PROJECT_ID}.iam.gserviceaccount.com"
 
-echo "Creating GPU VM ($WORKER_VM) in $ZONE ..."
+echo "Creating worker VM ($WORKER_VM) in $ZONE ..."
 
 # Prefer Deep Learning VM image family if available (CUDA + conda)
 DL_PROJECT="deeplearning-platform-release"
@@ -21,14 +21,32 @@ else
   IMAGE_ARGS+=(--image-family="ubuntu-2204-lts" --image-project="ubuntu-os-cloud")
 fi
 
+SPOT_ARGS=()
+if [ "${WORKER_SPOT}" = "1" ]; then
+  SPOT_ARGS+=(--provisioning-model=SPOT --instance-termination-action=STOP)
+fi
+
+# WORKER_GPU_COUNT=0: no accelerator (e.g. a post-processing VM for the fake backend).
+GPU_ARGS=()
+if [ "${WORKER_GPU_COUNT}" != "0" ]; then
+  GPU_ARGS+=(--accelerator="type=$WORKER_GPU_TYPE,count=$WORKER_GPU_COUNT")
+fi
+
+DISK_ARGS=()
+if [ "${WORKER_LOCAL_SSD}" = "1" ]; then
+  DISK_ARGS+=(--local-ssd=interface=NVME)
+fi
+
 gcloud compute instances create "$WORKER_VM" \
   --zone="$ZONE" \
   --machine-type="$WORKER_MACHINE_TYPE" \
   --maintenance-policy=TERMINATE \
   --service-account="$WORKER_SA_EMAIL" \
   --scopes="https://www.googleapis.com/auth/cloud-platform" \
-  --accelerator="type=$WORKER_GPU_TYPE,count=$WORKER_GPU_COUNT" \
   --boot-disk-size=200GB \
+  "${GPU_ARGS[@]}" \
+  "${DISK_ARGS[@]}" \
+  "${SPOT_ARGS[@]}" \
   "${IMAGE_ARGS[@]}"
 
 echo